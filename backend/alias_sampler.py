@@ -0,0 +1,85 @@
+"""
+Weighted random sampling with alias tables
+
+Vose's alias method: O(n) to build a table from n weights, then O(1)
+per draw, so picking k items costs O(k) no matter how large the pool.
+"""
+
+import random
+from typing import List, Optional, Sequence
+
+
+class AliasTable:
+    """Draws index i with probability weights[i] / sum(weights)"""
+
+    __slots__ = ('prob', 'alias')
+
+    def __init__(self, weights: Sequence[float]):
+        total = float(sum(weights))
+        if not weights or total <= 0:
+            raise ValueError("AliasTable needs at least one positive weight")
+
+        size = len(weights)
+        scaled = [weight * size / total for weight in weights]
+        self.prob: List[float] = [1.0] * size
+        self.alias: List[int] = list(range(size))
+
+        small = [i for i, value in enumerate(scaled) if value < 1.0]
+        large = [i for i, value in enumerate(scaled) if value >= 1.0]
+        while small and large:
+            less, more = small.pop(), large.pop()
+            self.prob[less] = scaled[less]
+            self.alias[less] = more
+            scaled[more] += scaled[less] - 1.0
+            (small if scaled[more] < 1.0 else large).append(more)
+        # Whatever is left is 1.0 up to rounding error, so prob stays 1.0
+
+    def __len__(self) -> int:
+        return len(self.prob)
+
+    def draw(self, rng: Optional[random.Random] = None) -> int:
+        rng = rng or random
+        column = rng.randrange(len(self.prob))
+        return column if rng.random() < self.prob[column] else self.alias[column]
+
+
+class PopularityPool:
+    """
+    Sampler over the rows of one catalog category.
+
+    A share of draws comes from the popular rows (weighted by their
+    popularity through an alias table); the rest are uniform over every
+    row, so discovery still surfaces names nobody is tracking yet.
+    """
+
+    __slots__ = ('size', 'row_ids', 'table', 'popular_share')
+
+    def __init__(self, size: int, row_ids: Sequence[int] = (), weights: Sequence[float] = (),
+                 popular_share: float = 0.5):
+        self.size = size
+        self.row_ids = list(row_ids)
+        self.table = AliasTable(weights) if self.row_ids else None
+        self.popular_share = popular_share if self.row_ids else 0.0
+
+    def draw(self, rng: Optional[random.Random] = None) -> int:
+        rng = rng or random
+        if rng.random() < self.popular_share:
+            return self.row_ids[self.table.draw(rng)]
+        return rng.randrange(self.size)
+
+    def sample(self, count: int, rng: Optional[random.Random] = None) -> List[int]:
+        """Up to `count` distinct row ids, in draw order"""
+        rng = rng or random
+        if count >= self.size:
+            return rng.sample(range(self.size), self.size)
+
+        # Rejecting duplicates keeps this O(count) while count is well below size
+        chosen = {}
+        attempts = 0
+        while len(chosen) < count and attempts < count * 20:
+            chosen.setdefault(self.draw(rng), None)
+            attempts += 1
+        if len(chosen) < count:
+            remaining = [row_id for row_id in range(self.size) if row_id not in chosen]
+            chosen.update(dict.fromkeys(rng.sample(remaining, count - len(chosen))))
+        return list(chosen)
@@ -1,7 +1,13 @@
 import asyncio
 import logging
 from datetime import datetime
-from google_trends_service import GoogleTrendsService
+from typing import Dict
+from chart_cache import chart_cache
+from google_trends_service import TRENDS_BATCH_MODE, TRENDS_BATCH_SIZE, GoogleTrendsService
+from refresh_scheduler import RefreshScheduler
+from trends_cache import explore_token_cache, trends_response_cache
+from trends_pool import TrendsFetchPool
+from trends_rate_limiter import TRENDS_RATE_PER_MINUTE, Priority, get_rate_limiter_stats
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -13,9 +19,64 @@ _updater_status = {
     "cycle_count": 0,
     "errors": 0,
     "targets_updated": 0,
-    "websocket_enabled": False
+    "websocket_enabled": False,
+    "last_cycle": None,
+    "pool": None,
+    "scheduler": None
 }
 
+SCHEDULER_TICK = 30             # Seconds between scheduling rounds
+
+# Catalog category for each target type
+CATEGORY_BY_TYPE = {
+    "politician": "politicians",
+    "celebrity": "celebrities",
+    "country": "countries",
+    "game": "games",
+    "stock": "stocks",
+    "crypto": "crypto",
+}
+
+def _load_target_popularity() -> Dict[str, Dict[str, float]]:
+    """Latest attention score of every active target, grouped by catalog category"""
+    from database import SessionLocal
+    from models import AttentionTarget
+    
+    db = SessionLocal()
+    try:
+        rows = db.query(
+            AttentionTarget.type, AttentionTarget.name, AttentionTarget.current_attention_score
+        ).filter(AttentionTarget.is_active == True).all()
+    finally:
+        db.close()
+    
+    popularity: Dict[str, Dict[str, float]] = {}
+    for target_type, name, score in rows:
+        category = CATEGORY_BY_TYPE.get(target_type.value)
+        if category:
+            popularity.setdefault(category, {})[name] = float(score or 0)
+    return popularity
+
+async def refresh_suggestion_pools():
+    """Re-weight the random suggestion pools with the scores from the latest cycle"""
+    from csv_loader import csv_loader
+    
+    try:
+        popularity = await asyncio.to_thread(_load_target_popularity)
+        await asyncio.to_thread(csv_loader.update_popularity, popularity)
+        tracked = sum(len(scores) for scores in popularity.values())
+        logger.info(f"🎲 Refreshed suggestion pools with {tracked} tracked targets")
+    except Exception as e:
+        logger.error(f"❌ Failed to refresh suggestion pools: {e}")
+
+def _tick_budget(pool: TrendsFetchPool) -> int:
+    """How many targets the Trends request budget covers in one scheduler tick"""
+    routes = len({health.proxy for health in pool.health})  # One rate limiter bucket per egress route
+    requests = TRENDS_RATE_PER_MINUTE * SCHEDULER_TICK / 60 * routes
+    targets_per_request = TRENDS_BATCH_SIZE if TRENDS_BATCH_MODE else 1
+    # Explore + multiline per fetch; cached explore tokens make this conservative
+    return max(1, int(requests / 2 * targets_per_request))
+
 # FIX: Accept websocket_manager as parameter to avoid circular imports
 async def start_background_updates(websocket_manager=None, use_tor=False):
     """Start background updates with WebSocket support - function name that main.py expects"""
@@ -32,26 +93,47 @@ async def start_background_updates(websocket_manager=None, use_tor=False):
     else:
         logger.warning("⚠️ No WebSocket manager provided - updates will be database-only")
     
+    # Weight discovery by the scores already in the database until the first cycle ends
+    await refresh_suggestion_pools()
+    
+    # Independent Trends sessions pulling from one queue (TRENDS_POOL_SIZE)
+    pool = TrendsFetchPool(websocket_manager=websocket_manager, use_tor=use_tor)
+    _updater_status["pool"] = pool
+    logger.info(f"🧵 Trends fetch pool with {pool.size} session(s)")
+    
+    # Refresh the targets that matter most first (stake, viewers, volatility, staleness)
+    scheduler = RefreshScheduler(websocket_manager=websocket_manager)
+    _updater_status["scheduler"] = scheduler
+    
     while _updater_status["running"]:
         try:
-            update_count += 1
-            _updater_status["cycle_count"] = update_count
+            await asyncio.to_thread(scheduler.reload)
+            target_ids = scheduler.next_due(_tick_budget(pool))
             
-            logger.info(f"🔄 Starting update cycle #{update_count}")
+            if target_ids:
+                update_count += 1
+                _updater_status["cycle_count"] = update_count
+                logger.info(f"🔄 Starting update cycle #{update_count} for {len(target_ids)} due targets")
+                
+                summary = await pool.run_cycle(target_ids)
+                _updater_status["targets_updated"] += summary["updated"]
+                _updater_status["last_cycle"] = {key: value for key, value in summary.items() if key != "sessions"}
+                
+                await asyncio.to_thread(scheduler.reload)
+                scheduler.record_results(target_ids)
+                _updater_status["last_update"] = datetime.utcnow()
+                logger.info(f"✅ Cycle #{update_count} completed successfully")
+                
+                # Re-weight discovery as soon as a cycle has stored new scores
+                if summary["updated"]:
+                    await refresh_suggestion_pools()
+                
+                if websocket_manager:
+                    logger.info("📡 Real-time WebSocket notifications sent to connected clients")
             
-            # FIX: Pass WebSocket manager to GoogleTrendsService constructor
-            async with GoogleTrendsService(websocket_manager=websocket_manager, use_tor=use_tor) as service:
-                await service.update_all_targets()
-            
-            _updater_status["last_update"] = datetime.utcnow()
-            logger.info(f"✅ Cycle #{update_count} completed successfully")
-            
-            if websocket_manager:
-                logger.info("📡 Real-time WebSocket notifications sent to connected clients")
-            
-            # Wait 5 minutes before next update
-            logger.info("⏰ Waiting 5 minutes until next update...")
-            await asyncio.sleep(300)  # 5 minutes
+            # Sleep until the next target is due, checking in at least every tick
+            next_due = scheduler.seconds_until_next()
+            await asyncio.sleep(SCHEDULER_TICK if next_due is None else min(SCHEDULER_TICK, max(1.0, next_due)))
             
         except Exception as e:
             _updater_status["errors"] += 1
@@ -77,9 +159,29 @@ def get_updater_status():
         "cycle_count": _updater_status["cycle_count"],
         "error_count": _updater_status["errors"],
         "targets_updated": _updater_status["targets_updated"],
-        "websocket_enabled": _updater_status["websocket_enabled"]
+        "websocket_enabled": _updater_status["websocket_enabled"],
+        "last_cycle": _updater_status["last_cycle"],
+        "sessions": _updater_status["pool"].status() if _updater_status["pool"] else [],
+        "rate_limiters": get_rate_limiter_stats(),
+        "explore_tokens": explore_token_cache.stats(),
+        "trends_responses": trends_response_cache.stats(),
+        "chart_cache": chart_cache.stats(),
+        "scheduler": _scheduler_summary()
     }
 
+def _scheduler_summary():
+    scheduler = _updater_status["scheduler"]
+    if not scheduler:
+        return None
+    status = scheduler.status(limit=0)
+    del status["schedule"]
+    return status
+
+def get_refresh_schedule(limit: int = 50):
+    """Per-target refresh intervals, most important targets first"""
+    scheduler = _updater_status["scheduler"]
+    return scheduler.status(limit=limit) if scheduler else None
+
 # Single target update function for testing with WebSocket notifications
 async def update_single_target(target_name: str, websocket_manager=None, use_tor=False):
     """Update a single target by name with WebSocket notification - useful for testing"""
@@ -97,7 +199,8 @@ async def update_single_target(target_name: str, websocket_manager=None, use_tor
             return False
         
         # FIX: Pass WebSocket manager to service constructor
-        async with GoogleTrendsService(websocket_manager=websocket_manager) as service:
+        async with GoogleTrendsService(websocket_manager=websocket_manager,
+                                        priority=Priority.INTERACTIVE) as service:
             success = await service.update_target_data(target, db)
             
         db.close()
@@ -0,0 +1,148 @@
+#!/usr/bin/env python3
+"""
+Memory benchmark for the CSV catalog representation
+
+Compares the old list-of-dicts cache (csv.DictReader rows, with the
+search_term key that autocomplete used to write into every row it
+returned) against the columnar CatalogTable loaded from the snapshot.
+Each representation is measured in its own subprocess so one does not
+inflate the other's numbers. Memory is read twice: right after loading,
+and after a search workload that also reads every page of the mapped
+snapshot, so lazily faulted pages are counted too. PSS splits
+shared page-cache pages between the processes mapping them.
+
+Usage: python benchmark_catalog_memory.py
+"""
+
+import csv
+import gc
+import json
+import subprocess
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+
+DATA_DIR = Path(__file__).parent / "data"
+CATEGORIES = ['politicians', 'celebrities', 'countries', 'games', 'stocks', 'crypto']
+
+
+PAGE_SIZE = 4096
+QUERIES = ['an', 'joe', 'united', 'bit', 'mar', 'the', 'ch', 'st']
+
+
+def _memory_kb() -> dict:
+    """Resident and proportional set size of this process in KB (Linux only, else 0)"""
+    memory = {"rss": 0, "pss": 0}
+    for path, field, key in (('/proc/self/status', 'VmRSS:', 'rss'), ('/proc/self/smaps_rollup', 'Pss:', 'pss')):
+        try:
+            with open(path) as status:
+                for line in status:
+                    if line.startswith(field):
+                        memory[key] = int(line.split()[1])
+                        break
+        except OSError:
+            pass
+    return memory
+
+
+def load_dicts():
+    """The previous representation: one dict per CSV row, search_term added"""
+    cache = {}
+    for category in CATEGORIES:
+        with open(DATA_DIR / f"{category}.csv", 'r', encoding='utf-8') as file:
+            rows = [row for row in csv.DictReader(file)]
+        for row in rows:
+            if 'search_term' not in row:
+                row['search_term'] = row.get('Name') or row.get('name', '')
+        cache[category] = rows
+    return cache
+
+
+def load_columnar():
+    """The current representation: columnar tables mapped from the snapshot"""
+    from catalog_snapshot import load_catalog
+    return load_catalog()
+
+
+def search_dicts(cache) -> int:
+    """The previous autocomplete: scan every row's name for each query"""
+    hits = 0
+    for query in QUERIES:
+        for rows in cache.values():
+            hits += sum(1 for row in rows if query in row['search_term'].lower())
+    return hits
+
+
+def search_columnar(catalog) -> int:
+    """Index searches, returned rows materialized, then every mapped page read"""
+    hits = 0
+    for query in QUERIES:
+        for category, index in catalog.indexes.items():
+            row_ids = index.search(query, 50)
+            hits += len([catalog.tables[category].search_result(row_id) for row_id in row_ids])
+        hits += len(catalog.fuzzy_index.search(query, 20, 5))
+    for array in catalog.arrays.values():
+        data = array.reshape(-1).view('u1')
+        int(data[::PAGE_SIZE].sum())
+    return hits
+
+
+def measure(mode: str) -> dict:
+    loader, search = {"dicts": (load_dicts, search_dicts), "columnar": (load_columnar, search_columnar)}[mode]
+    if mode == "columnar":
+        # Keep module import costs (numpy etc.) out of the measurement
+        import catalog_snapshot  # noqa: F401
+    gc.collect()
+    before = _memory_kb()
+    tracemalloc.start()
+    start = time.perf_counter()
+    loaded = loader()
+    elapsed = time.perf_counter() - start
+    gc.collect()
+    allocated, _peak = tracemalloc.get_traced_memory()
+    loaded_memory = _memory_kb()
+    start = time.perf_counter()
+    search(loaded)
+    search_elapsed = time.perf_counter() - start
+    gc.collect()
+    tracemalloc.stop()
+    searched_memory = _memory_kb()
+    tables = loaded if mode == "dicts" else loaded.tables
+    return {
+        "rows": sum(len(table) for table in tables.values()),
+        "python_heap_mb": allocated / 1e6,
+        "rss_loaded_mb": (loaded_memory["rss"] - before["rss"]) / 1e3,
+        "rss_searched_mb": (searched_memory["rss"] - before["rss"]) / 1e3,
+        "pss_searched_mb": (searched_memory["pss"] - before["pss"]) / 1e3,
+        "load_seconds": elapsed,
+        "search_seconds": search_elapsed,
+    }
+
+
+def main():
+    if len(sys.argv) == 3 and sys.argv[1] == "--measure":
+        print(json.dumps(measure(sys.argv[2])))
+        return
+
+    # Make sure the snapshot exists so the columnar run measures a plain load
+    subprocess.run([sys.executable, __file__, "--measure", "columnar"], check=True, capture_output=True)
+
+    results = {}
+    for mode in ("dicts", "columnar"):
+        output = subprocess.run(
+            [sys.executable, __file__, "--measure", mode], check=True, capture_output=True, text=True
+        ).stdout
+        results[mode] = json.loads(output.strip().splitlines()[-1])
+
+    print(f"{'':10} {'rows':>8} {'heap MB':>9} {'RSS load':>9} {'RSS used':>9} {'PSS used':>9} "
+          f"{'load s':>8} {'search s':>9}")
+    for mode, result in results.items():
+        print(f"{mode:10} {result['rows']:>8} {result['python_heap_mb']:>9.1f} {result['rss_loaded_mb']:>9.1f} "
+              f"{result['rss_searched_mb']:>9.1f} {result['pss_searched_mb']:>9.1f} "
+              f"{result['load_seconds']:>8.3f} {result['search_seconds']:>9.3f}")
+    print("(MB over the process baseline; 'used' is after the search workload touched every mapped page)")
+
+
+if __name__ == "__main__":
+    main()
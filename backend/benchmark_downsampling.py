@@ -0,0 +1,52 @@
+#!/usr/bin/env python3
+"""
+Downsampling benchmark for chart series
+
+Builds a synthetic attention series (random walk with short spikes, one
+point a minute) and samples it with each algorithm in downsampling.py.
+Reports the time per call and how many of the injected spikes survive,
+since losing spikes is what the old every-Nth sampler got wrong.
+
+Usage: python benchmark_downsampling.py [--points 100000] [--max-points 200] [--runs 20]
+"""
+
+import argparse
+import time
+
+import numpy as np
+
+from downsampling import ALGORITHMS, downsample
+
+
+def make_series(points: int, spikes: int, seed: int = 42):
+    rng = np.random.default_rng(seed)
+    x = 1.7e9 + np.arange(points, dtype=np.float64) * 60
+    y = np.clip(40 + np.cumsum(rng.normal(0, 0.3, points)), 0, 80)
+    spike_at = np.sort(rng.choice(np.arange(1, points - 1), spikes, replace=False))
+    y[spike_at] = 100
+    return x, y, spike_at
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark chart downsampling")
+    parser.add_argument("--points", type=int, default=100_000)
+    parser.add_argument("--max-points", type=int, default=200)
+    parser.add_argument("--spikes", type=int, default=20)
+    parser.add_argument("--runs", type=int, default=20)
+    args = parser.parse_args()
+
+    x, y, spike_at = make_series(args.points, args.spikes)
+    print(f"{args.points} points -> {args.max_points}, {args.spikes} spikes, {args.runs} runs")
+    print(f"{'algorithm':10} {'ms/call':>9} {'kept':>6} {'spikes kept':>12}")
+    for algorithm in ALGORITHMS:
+        start = time.perf_counter()
+        for _ in range(args.runs):
+            kept = downsample(x, y, args.max_points, algorithm)
+        elapsed = (time.perf_counter() - start) / args.runs * 1000
+        # A spike counts as kept if any sampled point shows its peak value
+        spikes_kept = int(np.isin(spike_at, kept).sum())
+        print(f"{algorithm:10} {elapsed:>9.2f} {len(kept):>6} {spikes_kept:>7}/{args.spikes}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+"""
+Ingestion benchmark for attention history
+
+Writes the same synthetic timelines with:
+
+- orm: the previous path, one AttentionHistory object per point with
+  Decimal(str(...)) values, add_all in batches of 1000
+- upsert: history_store upsert through execute_values
+
+Each mode runs in its own transaction against throwaway targets and is
+rolled back, so the database is left untouched. Needs DATABASE_URL to
+point at a Postgres database with the TrendBet schema.
+
+Usage: python benchmark_history_ingest.py [--targets 100] [--points 261]
+"""
+
+import argparse
+import random
+import time
+from datetime import datetime, timedelta, timezone
+from decimal import Decimal
+
+from database import SessionLocal
+from history_store import upsert_history_points
+from models import AttentionHistory, AttentionTarget, TargetType
+
+
+def make_timelines(targets: int, points: int):
+    """Weekly points, like a 5-year Google Trends timeline (261 points)"""
+    end = datetime(2025, 1, 5, tzinfo=timezone.utc)
+    timestamps = [end - timedelta(weeks=points - 1 - i) for i in range(points)]
+    rng = random.Random(42)
+    return timestamps, [[rng.randint(0, 100) for _ in range(points)] for _ in range(targets)]
+
+
+def create_targets(db, count: int):
+    targets = [AttentionTarget(name=f"benchmark-{i}", type=TargetType.CRYPTO, search_term=f"benchmark-{i}",
+                               is_active=False) for i in range(count)]
+    db.add_all(targets)
+    db.flush()
+    return [target.id for target in targets]
+
+
+def ingest_orm(db, target_ids, timestamps, timelines):
+    for target_id, values in zip(target_ids, timelines):
+        entries = [AttentionHistory(
+            target_id=target_id,
+            attention_score=Decimal(str(value)),
+            normalized_score=None,
+            timestamp=timestamp,
+            data_source="google_trends_5y",
+            timeframe_used="today 5-y",
+            confidence_score=Decimal("1.0")
+        ) for timestamp, value in zip(timestamps, values)]
+        for i in range(0, len(entries), 1000):
+            db.add_all(entries[i:i + 1000])
+            db.flush()
+
+
+def ingest_upsert(db, target_ids, timestamps, timelines):
+    for target_id, values in zip(target_ids, timelines):
+        upsert_history_points(db, target_id, "google_trends_5y", "today 5-y", timestamps, values, commit=False)
+
+
+MODES = {"orm": ingest_orm, "upsert": ingest_upsert}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark attention history ingestion")
+    parser.add_argument("--targets", type=int, default=100)
+    parser.add_argument("--points", type=int, default=261)
+    args = parser.parse_args()
+
+    timestamps, timelines = make_timelines(args.targets, args.points)
+    rows = args.targets * args.points
+
+    print(f"{rows} rows ({args.targets} targets x {args.points} points)")
+    print(f"{'mode':8} {'seconds':>9} {'rows/s':>10}")
+    for mode, ingest in MODES.items():
+        db = SessionLocal()
+        try:
+            target_ids = create_targets(db, args.targets)
+            start = time.perf_counter()
+            ingest(db, target_ids, timestamps, timelines)
+            db.flush()
+            elapsed = time.perf_counter() - start
+            print(f"{mode:8} {elapsed:>9.3f} {rows / elapsed:>10.0f}")
+        finally:
+            db.rollback()
+            db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,477 @@
+# backend/catalog_snapshot.py
+"""
+Binary snapshot of the CSV catalogs
+
+Compiles backend/data/*.csv into one file holding every column as a
+UTF-8 string array plus the prebuilt search indexes. Workers memory-map
+the file at startup instead of parsing CSVs, so boot is near instant
+and the pages are shared between uvicorn worker processes.
+
+File layout:
+    8 bytes   magic
+    8 bytes   header length (little-endian uint64)
+    N bytes   JSON header: source fingerprints, categories, array table
+    ...       arrays, each 64-byte aligned, offsets relative to data start
+
+The snapshot is rebuilt automatically when a CSV's size, mtime or
+content hash no longer matches the fingerprint stored in the header.
+
+Usage: python catalog_snapshot.py [build|refresh|info]
+"""
+
+import csv
+import hashlib
+import json
+import logging
+import mmap
+import os
+import struct
+import subprocess
+import sys
+import tempfile
+import time
+from collections.abc import Sequence
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from search_index import CategoryIndex, FuzzyIndex, StringColumn
+
+try:
+    import fcntl
+except ImportError:  # Windows: builds are not serialized across workers
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+CATEGORIES = ['politicians', 'celebrities', 'countries', 'games', 'stocks', 'crypto']
+
+DATA_DIR = Path(__file__).parent / "data"
+SNAPSHOT_FILENAME = "catalog.snapshot"
+
+SNAPSHOT_MAGIC = b"GACATLG\x00"
+SNAPSHOT_VERSION = 1
+ALIGNMENT = 64
+
+_LENGTH = struct.Struct("<Q")
+
+
+class SnapshotError(Exception):
+    """Raised when a snapshot file is missing, truncated or from another version"""
+
+
+class CatalogTable(Sequence):
+    """
+    Rows of one category stored column by column.
+
+    Indexing returns a plain dict for that row, built on demand, so only
+    the rows actually handed out are ever materialized. Nothing is ever
+    written back: the search_term that the API expects on every result is
+    derived from the name when the CSV has no such column.
+    """
+
+    __slots__ = ('columns', 'values', '_by_name')
+
+    def __init__(self, columns: List[str], values: List[StringColumn]):
+        # Interned so every materialized row shares the same key objects
+        self.columns = [sys.intern(column) for column in columns]
+        self.values = values
+        self._by_name = dict(zip(self.columns, values))
+
+    def __len__(self) -> int:
+        return len(self.values[0]) if self.values else 0
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        return {column: values[index] for column, values in zip(self.columns, self.values)}
+
+    def name(self, index: int) -> str:
+        """Handle both 'Name' and 'name' column formats"""
+        for column in ('Name', 'name'):
+            values = self._by_name.get(column)
+            if values is not None and values[index]:
+                return values[index]
+        return ''
+
+    def search_result(self, index: int) -> Dict:
+        """Row dict with search_term filled in, for autocomplete responses"""
+        row = self[index]
+        if 'search_term' not in row:
+            row['search_term'] = self.name(index)
+        return row
+
+
+class Catalog:
+    """Tables and search indexes for every category, from a snapshot or the CSVs"""
+
+    def __init__(self, meta: Dict, arrays: Dict[str, np.ndarray], tables: Dict[str, CatalogTable],
+                 indexes: Dict[str, CategoryIndex], fuzzy_index: FuzzyIndex, source: str):
+        self.meta = meta
+        self.arrays = arrays
+        self.tables = tables
+        self.indexes = indexes
+        self.fuzzy_index = fuzzy_index
+        self.source = source  # "snapshot", "rebuilt" or "memory"
+        self.report: Dict[str, Dict] = {}  # Per-file status and timing of the load that built it
+
+    @property
+    def sources(self) -> Dict[str, Optional[Dict]]:
+        return self.meta["sources"]
+
+
+def item_name(item: Dict) -> str:
+    """Handle both 'Name' and 'name' column formats"""
+    return item.get('Name') or item.get('name', '')
+
+
+def file_fingerprint(path: Path) -> Optional[Dict]:
+    """Size, mtime and SHA-256 of a source file, or None if it does not exist"""
+    try:
+        stat = path.stat()
+    except FileNotFoundError:
+        return None
+    return {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns, "sha256": _sha256(path)}
+
+
+def _sha256(path: Path) -> str:
+    digest = hashlib.sha256()
+    with open(path, 'rb') as file:
+        for chunk in iter(lambda: file.read(1 << 20), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def sources_match(recorded: Dict[str, Optional[Dict]], data_dir: Path, categories: List[str]) -> bool:
+    """
+    True if every CSV is unchanged since the snapshot was compiled.
+
+    Size and mtime are checked first; the file is only hashed when they
+    differ, so a touched but unmodified CSV does not force a rebuild.
+    """
+    for category in categories:
+        filename = f"{category}.csv"
+        if filename not in recorded:
+            return False
+        expected = recorded[filename]
+        path = data_dir / filename
+        try:
+            stat = path.stat()
+        except FileNotFoundError:
+            if expected is not None:
+                return False
+            continue
+        if expected is None or stat.st_size != expected["size"]:
+            return False
+        if stat.st_mtime_ns != expected["mtime_ns"] and _sha256(path) != expected["sha256"]:
+            return False
+    return True
+
+
+def _read_csv(path: Path) -> Tuple[List[str], List[Dict]]:
+    """Parse a CSV into its header and rows, the way csv.DictReader sees them"""
+    try:
+        with open(path, 'r', encoding='utf-8') as file:
+            reader = csv.DictReader(file)
+            rows = [row for row in reader]
+            columns = list(reader.fieldnames or [])
+        logger.info(f"✅ Loaded {len(rows)} items from {path.name}")
+        return columns, rows
+    except FileNotFoundError:
+        logger.warning(f"❌ CSV file not found: {path.name}")
+    except Exception as e:
+        logger.error(f"❌ Error loading {path.name}: {e}")
+    return [], []
+
+
+def _unchanged_since(previous: Optional[Catalog], filename: str, fingerprint: Optional[Dict]) -> bool:
+    """True if previous was built from a file with the same content hash"""
+    if previous is None or fingerprint is None:
+        return False
+    recorded = previous.sources.get(filename)
+    return recorded is not None and recorded["sha256"] == fingerprint["sha256"]
+
+
+def compile_catalog(data_dir: Path = DATA_DIR, categories: List[str] = CATEGORIES,
+                    previous: Optional[Catalog] = None) -> Tuple[Dict, Dict[str, np.ndarray], Dict[str, Dict]]:
+    """
+    Parse the CSVs and build every column and index as flat arrays.
+
+    Categories whose CSV hash matches `previous` reuse its arrays instead
+    of being parsed again; only the cross-category fuzzy index is always
+    rebuilt. Returns (meta, arrays, per-file report).
+    """
+    meta = {"version": SNAPSHOT_VERSION, "sources": {}, "categories": {}}
+    arrays: Dict[str, np.ndarray] = {}
+    indexes: Dict[str, CategoryIndex] = {}
+    report: Dict[str, Dict] = {}
+
+    for category in categories:
+        start = time.perf_counter()
+        path = data_dir / f"{category}.csv"
+        fingerprint = file_fingerprint(path)
+        meta["sources"][path.name] = fingerprint
+
+        if _unchanged_since(previous, path.name, fingerprint) and category in previous.meta["categories"]:
+            prefix = f"{category}/"
+            arrays.update((name, values) for name, values in previous.arrays.items() if name.startswith(prefix))
+            indexes[category] = previous.indexes[category]
+            meta["categories"][category] = previous.meta["categories"][category]
+            status = "unchanged"
+        else:
+            columns, rows = _read_csv(path)
+            for position, column in enumerate(columns):
+                values = StringColumn.from_strings(row.get(column) or '' for row in rows)
+                arrays.update(values.to_arrays(f"{category}/columns/{position}"))
+            indexes[category] = CategoryIndex.build([item_name(row) for row in rows])
+            arrays.update(indexes[category].to_arrays(f"{category}/index"))
+            meta["categories"][category] = {"columns": columns, "rows": len(rows)}
+            status = "parsed" if fingerprint is not None else "missing"
+
+        report[path.name] = {
+            "status": status,
+            "rows": meta["categories"][category]["rows"],
+            "seconds": round(time.perf_counter() - start, 4),
+        }
+
+    start = time.perf_counter()
+    arrays.update(FuzzyIndex.build(indexes).to_arrays("fuzzy"))
+    report["fuzzy_index"] = {"status": "built", "seconds": round(time.perf_counter() - start, 4)}
+    return meta, arrays, report
+
+
+def _align(offset: int) -> int:
+    return (offset + ALIGNMENT - 1) // ALIGNMENT * ALIGNMENT
+
+
+def write_snapshot(path: Path, meta: Dict, arrays: Dict[str, np.ndarray]):
+    """Write the snapshot atomically, so readers never see a partial file"""
+    table = {}
+    offset = 0
+    for name, values in arrays.items():
+        offset = _align(offset)
+        table[name] = {"dtype": values.dtype.str, "shape": list(values.shape), "offset": offset}
+        offset += values.nbytes
+
+    header = json.dumps({**meta, "arrays": table}).encode('utf-8')
+    data_start = _align(len(SNAPSHOT_MAGIC) + _LENGTH.size + len(header))
+
+    fd, tmp_name = tempfile.mkstemp(prefix=f".{path.name}.", dir=path.parent)
+    try:
+        with os.fdopen(fd, 'wb') as file:
+            file.write(SNAPSHOT_MAGIC)
+            file.write(_LENGTH.pack(len(header)))
+            file.write(header)
+            for name, values in arrays.items():
+                file.seek(data_start + table[name]["offset"])
+                file.write(np.ascontiguousarray(values).tobytes())
+            file.truncate(data_start + offset)
+            file.flush()
+            os.fsync(file.fileno())
+        os.chmod(tmp_name, 0o644)  # mkstemp creates 0600; other worker users must read it
+        os.replace(tmp_name, path)
+    except BaseException:
+        try:
+            os.unlink(tmp_name)
+        except FileNotFoundError:
+            pass
+        raise
+
+
+def read_snapshot(path: Path) -> Tuple[Dict, Dict[str, np.ndarray]]:
+    """Memory-map a snapshot and return its header and zero-copy array views"""
+    with open(path, 'rb') as file:
+        try:
+            buffer = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:  # Empty file
+            raise SnapshotError(f"{path.name} is empty")
+
+    prefix_size = len(SNAPSHOT_MAGIC) + _LENGTH.size
+    if len(buffer) < prefix_size or buffer[:len(SNAPSHOT_MAGIC)] != SNAPSHOT_MAGIC:
+        raise SnapshotError(f"{path.name} is not a catalog snapshot")
+    (header_length,) = _LENGTH.unpack_from(buffer, len(SNAPSHOT_MAGIC))
+    try:
+        header = json.loads(bytes(buffer[prefix_size:prefix_size + header_length]))
+    except ValueError as e:
+        raise SnapshotError(f"{path.name} has a corrupt header: {e}")
+    if header.get("version") != SNAPSHOT_VERSION:
+        raise SnapshotError(f"{path.name} is version {header.get('version')}, expected {SNAPSHOT_VERSION}")
+
+    data_start = _align(prefix_size + header_length)
+    arrays = {}
+    for name, spec in header["arrays"].items():
+        dtype = np.dtype(spec["dtype"])
+        count = int(np.prod(spec["shape"], dtype=np.int64))
+        start = data_start + spec["offset"]
+        if start + count * dtype.itemsize > len(buffer):
+            raise SnapshotError(f"{path.name} is truncated")
+        arrays[name] = np.frombuffer(buffer, dtype=dtype, count=count, offset=start).reshape(spec["shape"])
+    return header, arrays
+
+
+def catalog_from_arrays(meta: Dict, arrays: Dict[str, np.ndarray], source: str) -> Catalog:
+    """Wrap snapshot arrays in tables and indexes without copying them"""
+    tables = {}
+    indexes = {}
+    for category, info in meta["categories"].items():
+        columns = info["columns"]
+        tables[category] = CatalogTable(columns, [
+            StringColumn.from_arrays(arrays, f"{category}/columns/{position}")
+            for position in range(len(columns))
+        ])
+        indexes[category] = CategoryIndex.from_arrays(arrays, f"{category}/index")
+    fuzzy_index = FuzzyIndex.from_arrays(arrays, "fuzzy", indexes)
+    return Catalog(meta, arrays, tables, indexes, fuzzy_index, source)
+
+
+@contextmanager
+def _build_lock(path: Path):
+    """Serialize rebuilds so concurrently booting workers compile only once"""
+    if fcntl is None:
+        yield
+        return
+    with open(path.with_name(path.name + ".lock"), 'a') as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+def _load_snapshot(path: Path, categories: List[str]) -> Optional[Catalog]:
+    """The snapshot at path if it exists, is readable and covers `categories`"""
+    try:
+        meta, arrays = read_snapshot(path)
+        if list(meta["categories"]) != list(categories):
+            return None
+        return catalog_from_arrays(meta, arrays, "snapshot")
+    except FileNotFoundError:
+        return None
+    except (SnapshotError, KeyError, ValueError) as e:
+        logger.warning(f"⚠️ Ignoring catalog snapshot: {e}")
+        return None
+
+
+def _mapped_report(catalog: Catalog, previous: Optional[Catalog], seconds: float) -> Dict[str, Dict]:
+    """Per-file report for a catalog mapped from an already compiled snapshot"""
+    report = {}
+    for category, info in catalog.meta["categories"].items():
+        filename = f"{category}.csv"
+        unchanged = _unchanged_since(previous, filename, catalog.sources.get(filename))
+        report[filename] = {"status": "unchanged" if unchanged else "mapped", "rows": info["rows"], "seconds": 0.0}
+    report["snapshot"] = {"status": "mapped", "seconds": round(seconds, 4)}
+    return report
+
+
+def refresh_snapshot(data_dir: Path = DATA_DIR, categories: List[str] = CATEGORIES,
+                     snapshot_path: Optional[Path] = None) -> Optional[Dict[str, Dict]]:
+    """
+    Recompile the snapshot if any CSV changed, reusing the unchanged categories.
+
+    Returns the per-file report, or None if the snapshot was already up to date.
+    """
+    path = snapshot_path or data_dir / SNAPSHOT_FILENAME
+    start = time.perf_counter()
+    with _build_lock(path):
+        # Another worker may have rebuilt it while we waited for the lock
+        current = _load_snapshot(path, categories)
+        if current is not None and sources_match(current.sources, data_dir, categories):
+            return None
+
+        meta, arrays, report = compile_catalog(data_dir, categories, previous=current)
+        write_start = time.perf_counter()
+        write_snapshot(path, meta, arrays)
+        report["snapshot"] = {"status": "written", "seconds": round(time.perf_counter() - write_start, 4)}
+    logger.info(f"📦 Compiled catalog snapshot {path.name} in {time.perf_counter() - start:.2f}s")
+    return report
+
+
+def _refresh_in_subprocess(data_dir: Path, categories: List[str], path: Path) -> Optional[Dict[str, Dict]]:
+    """Run refresh_snapshot in a child process, so compiling never holds this process's GIL"""
+    result = subprocess.run(
+        [sys.executable, str(Path(__file__).resolve()), "refresh",
+         "--data-dir", str(data_dir), "--snapshot", str(path), "--categories", ",".join(categories)],
+        capture_output=True, text=True,
+    )
+    if result.returncode != 0:
+        detail = result.stderr.strip().splitlines()[-1:] or [f"exit code {result.returncode}"]
+        raise SnapshotError(f"snapshot compiler failed: {detail[0]}")
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def load_catalog(data_dir: Path = DATA_DIR, categories: List[str] = CATEGORIES,
+                 snapshot_path: Optional[Path] = None, previous: Optional[Catalog] = None) -> Catalog:
+    """
+    Load the catalogs from the snapshot, recompiling it first if any CSV changed.
+
+    Compilation runs in a child process and only re-parses CSVs whose hash
+    changed, so reloading from a worker thread does not stall requests.
+    Falls back to an in-memory build when the snapshot cannot be written
+    (e.g. a read-only data directory). The returned catalog's `report`
+    holds per-file status and timing; `previous` (the catalog being
+    replaced) lets it mark unchanged files.
+    """
+    path = snapshot_path or data_dir / SNAPSHOT_FILENAME
+    start = time.perf_counter()
+
+    catalog = _load_snapshot(path, categories)
+    if catalog is not None and sources_match(catalog.sources, data_dir, categories):
+        logger.info(f"⚡ Mapped catalog snapshot {path.name}")
+        catalog.report = _mapped_report(catalog, previous, time.perf_counter() - start)
+        return catalog
+
+    try:
+        report = _refresh_in_subprocess(data_dir, categories, path)
+        catalog = _load_snapshot(path, categories)
+        if catalog is None:
+            raise SnapshotError(f"{path.name} was not written")
+    except (OSError, ValueError, SnapshotError) as e:
+        logger.warning(f"⚠️ Could not compile catalog snapshot, using in-memory catalog: {e}")
+        meta, arrays, report = compile_catalog(data_dir, categories, previous)
+        catalog = catalog_from_arrays(meta, arrays, "memory")
+        catalog.report = report
+        return catalog
+
+    catalog.source = "rebuilt"
+    # No report means another worker compiled it first
+    catalog.report = report or _mapped_report(catalog, previous, time.perf_counter() - start)
+    return catalog
+
+
+if __name__ == "__main__":
+    import argparse
+
+    logging.basicConfig(level=logging.INFO)
+    parser = argparse.ArgumentParser(description="Compile the CSV catalogs into a binary snapshot")
+    parser.add_argument("command", nargs="?", default="build", choices=["build", "refresh", "info"])
+    parser.add_argument("--data-dir", type=Path, default=DATA_DIR)
+    parser.add_argument("--snapshot", type=Path, default=None)
+    parser.add_argument("--categories", default=",".join(CATEGORIES))
+    args = parser.parse_args()
+
+    categories = args.categories.split(",")
+    path = args.snapshot or args.data_dir / SNAPSHOT_FILENAME
+
+    if args.command == "build":
+        start = time.perf_counter()
+        with _build_lock(path):
+            meta, arrays, _report = compile_catalog(args.data_dir, categories)
+            write_snapshot(path, meta, arrays)
+        print(f"Wrote {path} ({path.stat().st_size / 1e6:.1f} MB) in {time.perf_counter() - start:.2f}s")
+
+    elif args.command == "refresh":
+        # Used by load_catalog: the last stdout line is the JSON report
+        print(json.dumps(refresh_snapshot(args.data_dir, categories, path)))
+
+    elif args.command == "info":
+        try:
+            meta, arrays = read_snapshot(path)
+        except (FileNotFoundError, SnapshotError) as e:
+            print(f"No usable snapshot: {e}")
+            sys.exit(1)
+        print(f"Snapshot: {path} ({path.stat().st_size / 1e6:.1f} MB, {len(arrays)} arrays)")
+        print(f"Up to date: {sources_match(meta['sources'], args.data_dir, categories)}")
+        for category, info in meta["categories"].items():
+            print(f"  {category}: {info['rows']} rows, columns {info['columns']}")
@@ -0,0 +1,128 @@
+"""
+Chart response cache for TrendBet
+
+Chart payloads only change when a target's history is written. Every
+writer bumps attention_targets.history_version in its own transaction
+(invalidate_target_charts), so the version is shared by every worker
+process and becomes visible exactly when the write commits.
+
+A chart request reads the target's version (one primary-key lookup).
+The ETag is derived from the version, the chart parameters and the
+current CHART_CACHE_TTL time bucket, so any worker answers If-None-Match
+with a 304 without building the chart. Serialized bodies are cached per
+process for the same version and bucket, so an entry from before a write
+is never served once the write commits. The window (and its synthetic
+latest point) slides with time, so ETags and bodies both lapse at the
+end of each bucket, which wall-clock time aligns across workers.
+"""
+
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, NamedTuple, Optional, Tuple
+
+from sqlalchemy.orm import Session
+
+from models import AttentionTarget
+
+CHART_CACHE_TTL = int(os.getenv('CHART_CACHE_TTL', '300'))
+CHART_CACHE_SIZE = 2048
+
+
+class ChartEntry(NamedTuple):
+    body: bytes
+    version: int
+    bucket: int
+
+
+def time_bucket(ttl: int = CHART_CACHE_TTL) -> int:
+    """Current chart time bucket (seconds when caching is disabled)"""
+    return int(time.time() // ttl) if ttl > 0 else int(time.time())
+
+
+def make_etag(key: Tuple, version: int, bucket: int) -> str:
+    """Strong ETag for a chart (key starts with the target id) at a history version and time bucket"""
+    digest = hashlib.blake2b(repr((key, version, bucket)).encode(), digest_size=12).hexdigest()
+    return f'"{key[0]}-{version}-{digest}"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """If-None-Match check (RFC 9110 uses weak comparison here)"""
+    if not if_none_match:
+        return False
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate == "*" or candidate.removeprefix("W/") == etag:
+            return True
+    return False
+
+
+class ChartCache:
+    """Bounded LRU of serialized chart payloads, valid for one history version and time bucket"""
+
+    def __init__(self, ttl: int = CHART_CACHE_TTL, max_size: int = CHART_CACHE_SIZE):
+        self.ttl = ttl
+        self.max_size = max_size
+        self._entries: "OrderedDict[Tuple, ChartEntry]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.stale = 0
+
+    def get(self, key: Tuple, version: int, bucket: int) -> Optional[bytes]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry.version == version and entry.bucket == bucket:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry.body
+            if entry is not None:
+                del self._entries[key]
+                self.stale += 1
+            self.misses += 1
+            return None
+
+    def put(self, key: Tuple, version: int, bucket: int, body: bytes):
+        if self.ttl <= 0:
+            return
+        with self._lock:
+            self._entries[key] = ChartEntry(body, version, bucket)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def stats(self) -> Dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "max_size": self.max_size,
+                "ttl_seconds": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+                "stale": self.stale,
+            }
+
+
+chart_cache = ChartCache()
+
+
+def history_version(db: Session, target_id: int) -> Optional[int]:
+    """The target's current history version, or None if it does not exist"""
+    return db.query(AttentionTarget.history_version).filter(AttentionTarget.id == target_id).scalar()
+
+
+def invalidate_target_charts(db: Session, target_id: Optional[int] = None):
+    """
+    Call when writing a target's history (or every target's, with None):
+    bumps its history version in the session's transaction, so cached
+    charts and ETags in every process change when the write commits.
+    """
+    query = db.query(AttentionTarget)
+    if target_id is not None:
+        query = query.filter(AttentionTarget.id == target_id)
+    query.update({AttentionTarget.history_version: AttentionTarget.history_version + 1},
+                 synchronize_session=False)
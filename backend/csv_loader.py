@@ -1,132 +1,268 @@
 # backend/csv_loader.py
-import csv
-import os
-from typing import List, Dict, Optional
+from collections import OrderedDict
+from typing import List, Dict, Optional, Sequence, Tuple
 from pathlib import Path
 import logging
+import random
+import threading
+
+from alias_sampler import PopularityPool
+from catalog_snapshot import CATEGORIES, Catalog, load_catalog
+from search_index import MIN_QUERY_LENGTH
 
 logger = logging.getLogger(__name__)
 
+QUERY_CACHE_SIZE = 4096       # Cached (category, query, limit) results
+PREFIX_FILTER_ROWS = 256      # Rows fetched per miss so short prefixes can cover longer queries
+TRENDING_SHARE = 0.5          # Share of random suggestions drawn from tracked, popular names
+
+
+class QueryCache:
+    """
+    Bounded LRU of autocomplete results, stored as row ids.
+
+    Each entry is tagged with the catalog it was computed from; entries
+    from a catalog that has since been replaced are ignored, so a search
+    racing a reload can never repopulate the cache with stale rows.
+    """
+
+    def __init__(self, max_size: int = QUERY_CACHE_SIZE):
+        self.max_size = max_size
+        self._entries: "OrderedDict[tuple, Tuple[Tuple[int, ...], bool]]" = OrderedDict()
+        self._catalog: Optional[Catalog] = None
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.prefix_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def get(self, catalog: Catalog, key: tuple) -> Optional[Tuple[Tuple[int, ...], bool]]:
+        with self._lock:
+            if catalog is not self._catalog:
+                return None
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+            return entry
+
+    def put(self, catalog: Catalog, key: tuple, row_ids: Tuple[int, ...], complete: bool):
+        with self._lock:
+            if catalog is not self._catalog:
+                return
+            self._entries[key] = (row_ids, complete)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, catalog: Catalog):
+        """Drop every entry and accept only results computed from `catalog`"""
+        with self._lock:
+            self._entries.clear()
+            self._catalog = catalog
+            self.invalidations += 1
+
+    def record(self, outcome: str):
+        with self._lock:
+            setattr(self, outcome, getattr(self, outcome) + 1)
+
+    def stats(self) -> Dict:
+        with self._lock:
+            lookups = self.hits + self.prefix_hits + self.misses
+            return {
+                "size": len(self._entries),
+                "max_size": self.max_size,
+                "hits": self.hits,
+                "prefix_hits": self.prefix_hits,
+                "misses": self.misses,
+                "hit_rate": round((self.hits + self.prefix_hits) / lookups, 4) if lookups else 0.0,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+            }
+
+
 class CSVDataLoader:
     def __init__(self):
         self.data_dir = Path(__file__).parent / "data"
-        self._cache = {}
+        # Tables and indexes live together in one immutable Catalog, swapped
+        # in with a single assignment so readers never see a half-reloaded state
+        self._catalog: Catalog = None
+        self._reload_lock = threading.Lock()
+        self._query_cache = QueryCache()
+        # category -> {lowercase name: attention score} of tracked targets, and
+        # the sampling pools built from it (paired with the catalog they index)
+        self._popularity: Dict[str, Dict[str, float]] = {}
+        self._suggestion_pools: Tuple[Optional[Catalog], Dict[str, PopularityPool]] = (None, {})
         self.load_all_data()
     
-    def load_csv(self, filename: str) -> List[Dict]:
-        """Load CSV file and return as list of dictionaries"""
-        filepath = self.data_dir / filename
-        data = []
+    def load_all_data(self) -> Dict[str, Dict]:
+        """
+        Load all catalogs from the binary snapshot, recompiling it if a CSV changed.
         
-        try:
-            with open(filepath, 'r', encoding='utf-8') as file:
-                reader = csv.DictReader(file)
-                data = [row for row in reader]
-            logger.info(f"✅ Loaded {len(data)} items from {filename}")
-        except FileNotFoundError:
-            logger.warning(f"❌ CSV file not found: {filename}")
-            # Return empty list if file doesn't exist yet
-            return []
-        except Exception as e:
-            logger.error(f"❌ Error loading {filename}: {e}")
-            return []
+        Blocking; call from a worker thread when the event loop is running.
+        Returns per-file status and timing.
+        """
+        with self._reload_lock:
+            catalog = load_catalog(self.data_dir, CATEGORIES, previous=self._catalog)
+            self._catalog = catalog
+            self._query_cache.invalidate(catalog)
+            self._suggestion_pools = (catalog, self._build_suggestion_pools(catalog, self._popularity))
         
-        return data
+        for category, table in catalog.tables.items():
+            logger.info(f"📁 Cached and indexed {len(table)} {category}")
+        logger.info(f"🔎 Fuzzy index covers {len(catalog.fuzzy_index.vocabulary)} words ({catalog.source})")
+        return catalog.report
     
-    def load_all_data(self):
-        """Load all CSV files into cache"""
-        categories = ['politicians', 'celebrities', 'countries', 'games', 'stocks', 'crypto']
-        
-        for category in categories:
-            filename = f"{category}.csv"
-            self._cache[category] = self.load_csv(filename)
-            logger.info(f"📁 Cached {len(self._cache[category])} {category}")
-    
-    def reload_data(self):
-        """Reload all CSV data (useful for updates)"""
+    def reload_data(self) -> Dict[str, Dict]:
+        """Reload CSV data, re-parsing only files whose hash changed (useful for updates)"""
         logger.info("🔄 Reloading all CSV data...")
-        self.load_all_data()
+        return self.load_all_data()
     
-    def get_category_data(self, category: str) -> List[Dict]:
-        """Get all data for a specific category"""
-        return self._cache.get(category, [])
+    def get_category_data(self, category: str) -> Sequence[Dict]:
+        """Get all data for a specific category (rows are built as dicts on access)"""
+        return self._catalog.tables.get(category, [])
     
     def search_in_category(self, category: str, query: str, limit: int = 10) -> List[Dict]:
-        """Search within a specific category"""
-        data = self.get_category_data(category)
-        if not data:
+        """Search within a specific category using its prebuilt index"""
+        catalog = self._catalog
+        data = catalog.tables.get(category)
+        index = catalog.indexes.get(category)
+        if not data or index is None:
             return []
             
         query_lower = query.lower().strip()
-        if len(query_lower) < 2:
+        if len(query_lower) < MIN_QUERY_LENGTH:
             return []
         
-        matches = []
+        # Prefix hits first, then "contains" hits, both in CSV order.
+        # Only the returned rows are materialized, each as a fresh dict.
+        row_ids = self._cached_search(catalog, category, query_lower, limit)
+        return [data.search_result(row_id) for row_id in row_ids]
+    
+    def _cached_search(self, catalog: Catalog, category: str, query_lower: str, limit: int) -> Tuple[int, ...]:
+        """
+        Row ids for a category search, served from the query cache when possible.
         
-        # First pass: exact matches and starts with
-        for item in data:
-            # Handle both 'Name' and 'name' column formats
-            name = item.get('Name') or item.get('name', '')
-            if not name:
-                continue
-            name_lower = name.lower()
-            if name_lower == query_lower or name_lower.startswith(query_lower):
-                # Ensure we have the search_term field for API compatibility
-                if 'search_term' not in item:
-                    item['search_term'] = name
-                matches.append(item)
-                if len(matches) >= limit:
-                    break
-
-        # Second pass: contains query (if we need more results)
-        if len(matches) < limit:
-            for item in data:
-                if item not in matches:  # Avoid duplicates
-                    name = item.get('Name') or item.get('name', '')
-                    if not name:
-                        continue
-                    name_lower = name.lower()
-                    if query_lower in name_lower:
-                        # Ensure we have the search_term field for API compatibility
-                        if 'search_term' not in item:
-                            item['search_term'] = name
-                        matches.append(item)
-                        if len(matches) >= limit:
-                            break
+        A miss first looks for the longest cached prefix of the query whose
+        result set is complete (every matching row, not just the first
+        `limit`): anything matching the longer query also matches its prefix,
+        so filtering that set answers the query without touching the index.
+        """
+        cache = self._query_cache
+        key = (category, query_lower, limit)
+        entry = cache.get(catalog, key)
+        if entry is not None:
+            cache.record("hits")
+            return entry[0][:limit]
+        
+        index = catalog.indexes[category]
+        for length in range(len(query_lower) - 1, MIN_QUERY_LENGTH - 1, -1):
+            parent = cache.get(catalog, (category, query_lower[:length], limit))
+            if parent is not None and parent[1]:
+                cache.record("prefix_hits")
+                row_ids = self._filter_rows(index, parent[0], query_lower)
+                cache.put(catalog, key, row_ids, True)
+                return row_ids[:limit]
         
-        return matches
+        cache.record("misses")
+        fetch = max(limit, PREFIX_FILTER_ROWS)
+        row_ids = tuple(index.search(query_lower, fetch))
+        cache.put(catalog, key, row_ids, len(row_ids) < fetch)
+        return row_ids[:limit]
+    
+    @staticmethod
+    def _filter_rows(index, row_ids: Tuple[int, ...], query_lower: str) -> Tuple[int, ...]:
+        """Re-rank a complete result set for a longer query: prefix hits, then contains hits"""
+        names_lower = index.names_lower
+        prefix_ids = []
+        contains_ids = []
+        for row_id in sorted(row_ids):
+            name = names_lower[row_id]
+            if name.startswith(query_lower):
+                prefix_ids.append(row_id)
+            elif query_lower in name:
+                contains_ids.append(row_id)
+        return tuple(prefix_ids + contains_ids)
     
     def search_all_categories(self, query: str, limit: int = 20) -> Dict[str, List[Dict]]:
-        """Search across all categories"""
-        if len(query.strip()) < 2:
+        """Search across all categories with one typo-tolerant index lookup"""
+        query_lower = query.lower().strip()
+        if len(query_lower) < MIN_QUERY_LENGTH:
             return {}
             
+        catalog = self._catalog
         results = {}
         per_category_limit = max(1, limit // 4)  # Distribute across 4 categories
         
-        for category in self._cache.keys():
-            matches = self.search_in_category(category, query, per_category_limit)
-            if matches:
-                results[category] = matches
+        # Ranked best-first across categories: prefix > exact token > similarity
+        for category, row_id, _tier, _similarity in catalog.fuzzy_index.search(query_lower, limit, per_category_limit):
+            results.setdefault(category, []).append(catalog.tables[category].search_result(row_id))
         
         return results
     
+    def get_search_cache_stats(self) -> Dict:
+        """Hit/miss counters of the autocomplete query cache"""
+        return self._query_cache.stats()
+    
+    def update_popularity(self, popularity: Dict[str, Dict[str, float]]):
+        """
+        Replace the popularity weights used by get_random_suggestions.
+        
+        `popularity` maps category -> {name: attention score} for tracked
+        targets; called after each background update cycle.
+        """
+        popularity = {
+            category: {name.lower(): float(score) for name, score in scores.items()}
+            for category, scores in popularity.items()
+        }
+        with self._reload_lock:
+            catalog = self._catalog
+            self._popularity = popularity
+            self._suggestion_pools = (catalog, self._build_suggestion_pools(catalog, popularity))
+    
+    @staticmethod
+    def _build_suggestion_pools(catalog: Catalog, popularity: Dict[str, Dict[str, float]]) -> Dict[str, PopularityPool]:
+        """Alias-table pools per category, weighting tracked names by attention score"""
+        pools = {}
+        for category, table in catalog.tables.items():
+            index = catalog.indexes[category]
+            row_ids = []
+            weights = []
+            for name_lower, score in popularity.get(category, {}).items():
+                # An exact match sorts first in the name's prefix range
+                span = index.prefix_range(name_lower)
+                if span:
+                    row_id = int(index.sorted_ids[span.start])
+                    if index.names_lower[row_id] == name_lower:
+                        row_ids.append(row_id)
+                        weights.append(max(score, 1.0))
+            pools[category] = PopularityPool(len(table), row_ids, weights, TRENDING_SHARE)
+        return pools
+    
     def get_random_suggestions(self, category: str, count: int = 10) -> List[Dict]:
-        """Get random suggestions from a category (for homepage/discovery)"""
-        import random
-        data = self.get_category_data(category)
-        if not data:
+        """
+        Random suggestions from a category (for homepage/discovery).
+        
+        Draws in O(count) from a precomputed pool where tracked targets are
+        weighted by their latest attention score, so trending names surface
+        more often without a database query per request.
+        """
+        catalog, pools = self._suggestion_pools
+        table = catalog.tables.get(category) if catalog else None
+        if not table:
             return []
         
-        return random.sample(data, min(count, len(data)))
+        row_ids = pools[category].sample(min(count, len(table)), random)
+        return [table.search_result(row_id) for row_id in row_ids]
     
     def get_all_categories(self) -> List[str]:
         """Get list of all available categories"""
-        return list(self._cache.keys())
+        return list(self._catalog.tables.keys())
     
     def get_category_stats(self) -> Dict[str, int]:
         """Get count of items in each category"""
-        return {category: len(data) for category, data in self._cache.items()}
+        return {category: len(data) for category, data in self._catalog.tables.items()}
 
 # Global instance
 csv_loader = CSVDataLoader()
\ No newline at end of file
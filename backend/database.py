@@ -154,6 +154,20 @@ def create_tables() -> None:
 
         # Create all tables
         Base.metadata.create_all(bind=engine)
+        ensure_target_columns()
+        ensure_history_unique_constraint()
+
+        # Realtime history lives in day partitions so retention can drop them whole
+        from history_partitions import convert_to_partitioned, maintain_partitions
+        convert_to_partitioned()
+        maintain_partitions()
+
+        from history_rollups import ensure_rollups_backfilled
+        ensure_rollups_backfilled(engine)
+
+        # Targets created before the seeding queue still need their history
+        from seeding_queue import enqueue_unseeded_targets
+        enqueue_unseeded_targets(engine)
         logger.info("Database tables created successfully")
 
     except Exception as e:
@@ -161,6 +175,44 @@ def create_tables() -> None:
         raise
 
 
+def ensure_target_columns() -> None:
+    """Add the anchor-scale score and history version columns to an existing attention_targets table"""
+    with engine.begin() as conn:
+        conn.execute(text("ALTER TABLE attention_targets ADD COLUMN IF NOT EXISTS anchor_relative_score double precision"))
+        conn.execute(text("ALTER TABLE attention_targets ADD COLUMN IF NOT EXISTS anchor_scored_at timestamp"))
+        conn.execute(text("ALTER TABLE attention_targets ADD COLUMN IF NOT EXISTS history_version integer NOT NULL DEFAULT 0"))
+
+
+def ensure_history_unique_constraint() -> None:
+    """
+    Add the (target_id, data_source, timestamp) unique constraint to an
+    existing attention_history table, deleting duplicate points first
+    (the newest row of each duplicate group is kept).
+    """
+    with engine.begin() as conn:
+        exists = conn.execute(text(
+            "SELECT 1 FROM pg_constraint WHERE conname = 'uq_attention_history_point'"
+        )).first()
+        if exists:
+            return
+
+        deleted = conn.execute(text("""
+            DELETE FROM attention_history a
+            USING attention_history b
+            WHERE a.target_id = b.target_id
+              AND a.data_source = b.data_source
+              AND a.timestamp = b.timestamp
+              AND a.id < b.id
+        """)).rowcount
+        conn.execute(text("""
+            ALTER TABLE attention_history
+            ADD CONSTRAINT uq_attention_history_point UNIQUE (target_id, data_source, timestamp)
+        """))
+        # The constraint's index covers the same columns
+        conn.execute(text("DROP INDEX IF EXISTS idx_attention_history_target_source_time"))
+    logger.info(f"Added attention history unique constraint ({deleted} duplicate points removed)")
+
+
 def drop_tables() -> None:
     """
     Drop all database tables and enum types.
@@ -192,13 +244,9 @@ def create_database_indices() -> None:
     """
     Create database indices for optimal query performance.
     """
+    # Chart queries on attention_history (target_id, data_source, timestamp)
+    # use the uq_attention_history_point constraint's index
     indices = [
-        # Attention history composite index for chart queries
-        """
-        CREATE INDEX IF NOT EXISTS idx_attention_history_target_source_time
-        ON attention_history (target_id, data_source, timestamp);
-        """,
-
         # Portfolio performance index
         """
         CREATE INDEX IF NOT EXISTS idx_portfolio_user_tournament
@@ -0,0 +1,119 @@
+"""
+Shape-preserving downsampling for attention charts
+
+Taking every Nth point drops the spikes traders look for. Both samplers
+here work on flat NumPy arrays (x as epoch seconds, y as scores) and
+return the indices of the points to keep, so callers only format the
+rows that survive:
+
+- lttb: Largest-Triangle-Three-Buckets. Keeps the point of each bucket
+  that forms the largest triangle with the previous kept point and the
+  next bucket's average, which follows the visual shape of the line.
+- minmax: keeps the lowest and highest point of each bucket, so every
+  peak and trough survives (an envelope; up to max_points points).
+- nth: every Nth point, the previous behaviour.
+
+The first and last points are always kept.
+"""
+
+from typing import Sequence
+
+import numpy as np
+
+ALGORITHMS = ("lttb", "minmax", "nth")
+DEFAULT_ALGORITHM = "lttb"
+DEFAULT_MAX_POINTS = 200
+MAX_POINTS_LIMIT = 5000
+
+
+def lttb(x: np.ndarray, y: np.ndarray, max_points: int) -> np.ndarray:
+    """Indices of the Largest-Triangle-Three-Buckets sample of (x, y)"""
+    n = len(y)
+    if max_points >= n:
+        return np.arange(n)
+    if max_points < 3:
+        return np.array([0, n - 1][:max(max_points, 1)])
+
+    x = np.asarray(x, dtype=np.float64) - x[0]  # Keep epoch-second products well inside float precision
+    y = np.asarray(y, dtype=np.float64)
+
+    # Interior points [1, n - 1) split into max_points - 2 buckets; integer
+    # arithmetic, since flooring float edges can shift a bucket by one point
+    edges = 1 + np.arange(max_points - 1, dtype=np.int64) * (n - 2) // (max_points - 2)
+    counts = np.diff(edges)
+    avg_x = np.add.reduceat(x[:n - 1], edges[:-1]) / counts
+    avg_y = np.add.reduceat(y[:n - 1], edges[:-1]) / counts
+    # Third vertex for each bucket: the next bucket's average, the last point for the final bucket
+    next_x = np.append(avg_x[1:], x[-1])
+    next_y = np.append(avg_y[1:], y[-1])
+
+    selected = np.empty(max_points, dtype=np.int64)
+    selected[0] = 0
+    selected[-1] = n - 1
+    previous = 0
+    for bucket in range(max_points - 2):
+        start, end = edges[bucket], edges[bucket + 1]
+        ax, ay = x[previous], y[previous]
+        # Twice the triangle area; the constant factor does not change the argmax
+        area = np.abs((ax - next_x[bucket]) * (y[start:end] - ay) - (ax - x[start:end]) * (next_y[bucket] - ay))
+        previous = start + int(area.argmax())
+        selected[bucket + 1] = previous
+    return selected
+
+
+def _first_per_bucket(mask: np.ndarray, bucket_ids: np.ndarray) -> np.ndarray:
+    """First index where mask holds in each bucket (bucket_ids is sorted)"""
+    indices = np.flatnonzero(mask)
+    buckets = bucket_ids[indices]
+    first = np.ones(len(indices), dtype=bool)
+    first[1:] = buckets[1:] != buckets[:-1]
+    return indices[first]
+
+
+def minmax(y: np.ndarray, max_points: int) -> np.ndarray:
+    """Indices of each bucket's minimum and maximum, in order"""
+    n = len(y)
+    if max_points >= n:
+        return np.arange(n)
+    if max_points < 4:
+        return np.array([0, n - 1][:max(max_points, 1)])
+
+    y = np.asarray(y, dtype=np.float64)
+    interior = y[1:-1]
+    bucket_count = (max_points - 2) // 2
+    bucket_ids = (np.arange(len(interior)) * bucket_count) // len(interior)
+    starts = np.searchsorted(bucket_ids, np.arange(bucket_count))
+
+    lows = np.minimum.reduceat(interior, starts)
+    highs = np.maximum.reduceat(interior, starts)
+    low_indices = _first_per_bucket(interior == lows[bucket_ids], bucket_ids)
+    high_indices = _first_per_bucket(interior == highs[bucket_ids], bucket_ids)
+
+    # A flat bucket has the same low and high; np.unique merges them
+    return np.unique(np.concatenate(([0], low_indices + 1, high_indices + 1, [n - 1])))
+
+
+def every_nth(n: int, max_points: int) -> np.ndarray:
+    """Every Nth index plus the last one"""
+    if max_points >= n:
+        return np.arange(n)
+    step = -(-n // max(max_points - 1, 1))
+    indices = np.arange(0, n, step)
+    if indices[-1] != n - 1:
+        indices = np.append(indices, n - 1)
+    return indices
+
+
+def downsample(x: Sequence[float], y: Sequence[float], max_points: int = DEFAULT_MAX_POINTS,
+               algorithm: str = DEFAULT_ALGORITHM) -> np.ndarray:
+    """Indices of at most max_points points to plot, in x order"""
+    if algorithm not in ALGORITHMS:
+        raise ValueError(f"Unknown downsampling algorithm: {algorithm}")
+    n = len(y)
+    if n <= max_points:
+        return np.arange(n)
+    if algorithm == "lttb":
+        return lttb(np.asarray(x, dtype=np.float64), np.asarray(y, dtype=np.float64), max_points)
+    if algorithm == "minmax":
+        return minmax(np.asarray(y, dtype=np.float64), max_points)
+    return every_nth(n, max_points)
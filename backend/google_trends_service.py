@@ -8,20 +8,59 @@ rate limiting, and session management.
 import aiohttp
 import json
 import asyncio
+import os
 import time
 import logging
 import sys
 import random
-from datetime import datetime, timedelta, timezone
+from datetime import datetime, timezone
 from decimal import Decimal
-from typing import Dict, List, Optional
+from typing import Dict, List, Optional, Sequence
 from sqlalchemy.orm import Session
 from database import SessionLocal
-from models import AttentionTarget, AttentionHistory
+from models import AttentionTarget
+from history_store import upsert_history_points
+from normalization import normalize_timeline
+from trends_cache import explore_token_cache, token_ttl, trends_response_cache
+from trends_rate_limiter import CircuitOpenError, Priority, get_rate_limiter
 
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
+# Batch mode: up to TRENDS_BATCH_SIZE targets plus the anchor term per request
+# (Google compares at most 5 terms at once)
+TRENDS_BATCH_MODE = os.getenv('TRENDS_BATCH_MODE', 'true').lower() == 'true'
+TRENDS_BATCH_SIZE = max(1, min(int(os.getenv('TRENDS_BATCH_SIZE', '4')), 4))
+TRENDS_ANCHOR_TERM = os.getenv('TRENDS_ANCHOR_TERM', 'Wikipedia')
+
+# A term whose peak inside a batch is below this has too little resolution
+# (Trends values are integers) and is refetched on its own instead
+MIN_BATCH_PEAK = 10
+# The anchor's mean inside a batch must reach this for the batch to be rescaled
+MIN_ANCHOR_MEAN = 1.0
+
+
+def anchor_rescale(batches: Sequence[Dict]) -> Dict[str, float]:
+    """
+    Put the latest scores of separately fetched batches on one scale.
+
+    Each batch is {'anchor_mean': float, 'latest': {term: raw value}} with raw
+    values as returned inside that batch (0-100 relative to the batch's max).
+    Every batch contains the same anchor term, so dividing by the batch's
+    anchor mean expresses each term in anchor units: 100 means as much
+    attention as the anchor term gets on average, in any batch or cycle.
+    Batches whose anchor mean is below MIN_ANCHOR_MEAN are too coarse to
+    relate to the others and are left out.
+    """
+    comparable = {}
+    for batch in batches:
+        if batch['anchor_mean'] < MIN_ANCHOR_MEAN:
+            continue
+        for term, value in batch['latest'].items():
+            comparable[term] = round(value * 100 / batch['anchor_mean'], 2)
+    return comparable
+
+
 class GoogleTrendsService:
     """
     Google Trends API service with robust session management.
@@ -30,7 +69,8 @@ class GoogleTrendsService:
     for reliable Google Trends data retrieval.
     """
     
-    def __init__(self, websocket_manager=None, use_tor=False):
+    def __init__(self, websocket_manager=None, use_tor=False, proxy: Optional[str] = None,
+                 browser_index: int = 0, priority: Priority = Priority.BACKGROUND):
         # EXACT configuration from your working ExactPyTrendsAPI
         self.session = None
         self.hl = 'en-US'
@@ -46,22 +86,26 @@ class GoogleTrendsService:
         
         # EXACT payloads from your working code
         self.token_payload = {}
+        self._explore_widgets = []
         self.interest_over_time_widget = {}
         self.interest_by_region_widget = {}
         self.kw_list = []
+        self.token_cache_key = None  # Set while the current widgets came from explore_token_cache
+        self.token_ttl = 0
         
-        # EXACT rate limiting from your working code
+        # Request budget, backoff and circuit breaker are shared process-wide
+        # (see trends_rate_limiter); min_delay is this session's own spacing
         self.last_request_time = 0
         self.min_delay = 5  # Your exact working value
+        self.priority = priority
         
         # Enhanced features
         self.session_created_at = None
         self.session_max_age = 1800
         self.use_tor = use_tor
         self.tor_failed = False
+        self.proxy = proxy  # Optional HTTP proxy, e.g. a Tor HTTPTunnelPort circuit
         self.websocket_manager = websocket_manager
-        self.request_history = []
-        self.max_requests_per_hour = 4000
         self.failure_count = 0
         
         # Browser rotation to avoid fingerprinting
@@ -71,7 +115,7 @@ class GoogleTrendsService:
             'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/138.0.0.0 Safari/537.36',
             'Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/138.0.0.0 Safari/537.36'
         ]
-        self.current_browser_index = 0
+        self.current_browser_index = browser_index % len(self.browser_agents)
         
         # EXACT headers from your working code (will be updated with rotation)
         self.headers = {
@@ -86,6 +130,9 @@ class GoogleTrendsService:
         return self
     
     async def __aexit__(self, exc_type, exc_val, exc_tb):
+        await self.close()
+    
+    async def close(self):
         if self.session:
             await self.session.close()
     
@@ -154,7 +201,7 @@ class GoogleTrendsService:
             
             logger.debug(f"Cookie URL: {cookie_url}")
             
-            async with self.session.get(cookie_url) as response:
+            async with self.session.get(cookie_url, proxy=self.proxy) as response:
                 logger.debug(f"Cookie response: {response.status}")
                 
                 if response.status != 200:
@@ -265,8 +312,24 @@ class GoogleTrendsService:
         # Convert to JSON string (CRITICAL - pytrends does this!)
         self.token_payload['req'] = json.dumps(self.token_payload['req'])
         
+        # Never fall back to the previous payload's widgets if fetching tokens fails
+        self.interest_over_time_widget = {}
+        self.interest_by_region_widget = {}
+        self.token_cache_key = None
+        self.token_ttl = token_ttl(timeframe)
+        
+        # Reuse cached widget tokens for an identical request, skipping /api/explore
+        cache_key = (self.proxy, self.hl, self.tz, self.token_payload['req'])
+        cached_widgets = explore_token_cache.get(cache_key)
+        if cached_widgets:
+            self._assign_widgets(cached_widgets)
+            self.token_cache_key = cache_key
+            logger.debug("Using cached API tokens")
+            return
+        
         # Get tokens (like pytrends does)
-        await self._get_tokens()
+        if await self._get_tokens():
+            explore_token_cache.put(cache_key, self._explore_widgets, self.token_ttl)
     
     async def _get_tokens(self):
         """EXACT _get_tokens from your working ExactPyTrendsAPI"""
@@ -279,12 +342,14 @@ class GoogleTrendsService:
             async with self.session.post(
                 self.explore_url, 
                 params=self.token_payload,
-                cookies=self.cookies
+                cookies=self.cookies,
+                proxy=self.proxy
             ) as response:
                 
                 logger.info(f"Explore response status: {response.status}")
                 
                 if response.status == 200:
+                    get_rate_limiter(self.proxy).record_success()
                     response_text = await response.text()
                     logger.debug(f"📝 Response length: {len(response_text)} chars")
                     
@@ -293,6 +358,7 @@ class GoogleTrendsService:
                     
                     if widget_dicts:
                         self._assign_widgets(widget_dicts)
+                        self._explore_widgets = widget_dicts
                         logger.info("API tokens obtained successfully")
                         return True
                     else:
@@ -301,7 +367,7 @@ class GoogleTrendsService:
                         
                 elif response.status == 429:
                     logger.warning("🚫 Rate limited on explore endpoint")
-                    self.min_delay = min(self.min_delay * 2, 60)
+                    get_rate_limiter(self.proxy).record_throttled()
                     return False
                     
                 else:
@@ -351,9 +417,36 @@ class GoogleTrendsService:
     
     async def interest_over_time(self):
         """EXACT interest_over_time from your working ExactPyTrendsAPI"""
+        response_text = await self._request_timeline()
+        if response_text is None:
+            return None
+        
+        # Parse response (trim 5 chars for widget endpoints)
+        return self._parse_timeline_response(response_text, trim_chars=5)
+    
+    async def _request_timeline(self) -> Optional[str]:
+        """
+        Fetch the raw multiline widget response for the current payload.
+        
+        If a cached token is rejected, fresh tokens are fetched from
+        /api/explore and the request is retried once.
+        """
+        response_text, rejected = await self._request_timeline_once()
+        if rejected and self.token_cache_key:
+            logger.info("Cached API tokens rejected - refreshing")
+            explore_token_cache.reject(self.token_cache_key)
+            cache_key, self.token_cache_key = self.token_cache_key, None
+            self.interest_over_time_widget = {}
+            if await self._get_tokens():
+                explore_token_cache.put(cache_key, self._explore_widgets, self.token_ttl)
+                response_text, _rejected = await self._request_timeline_once()
+        return response_text
+    
+    async def _request_timeline_once(self):
+        """One multiline request: (response text or None, whether the token was rejected)"""
         if not self.interest_over_time_widget:
             logger.error("No interest_over_time_widget available. Call build_payload first.")
-            return None
+            return None, False
         
         await self._rate_limit()
         
@@ -370,28 +463,29 @@ class GoogleTrendsService:
             async with self.session.get(
                 self.interest_over_time_url,
                 params=over_time_payload,
-                cookies=self.cookies
+                cookies=self.cookies,
+                proxy=self.proxy
             ) as response:
                 
                 logger.debug(f"Timeline response status: {response.status}")
                 
                 if response.status == 200:
-                    response_text = await response.text()
-                    
-                    # Parse response (trim 5 chars for widget endpoints)
-                    return self._parse_timeline_response(response_text, trim_chars=5)
+                    get_rate_limiter(self.proxy).record_success()
+                    return await response.text(), False
                     
                 elif response.status == 429:
                     logger.warning("🚫 Rate limited on timeline endpoint")
-                    return None
+                    get_rate_limiter(self.proxy).record_throttled()
+                    return None, False
                     
                 else:
+                    # Expired or invalid tokens come back as 400/401/403
                     logger.error(f"Timeline endpoint failed: {response.status}")
-                    return None
+                    return None, 400 <= response.status < 500
                     
         except Exception as e:
             logger.error(f"Timeline request failed: {e}")
-            return None
+            return None, False
     
     def _parse_timeline_response(self, response_text: str, trim_chars: int = 5):
         """EXACT timeline parsing from your working ExactPyTrendsAPI + timestamp enhancement"""
@@ -453,6 +547,37 @@ class GoogleTrendsService:
             logger.error(f"Timeline parsing failed: {e}")
             return {'success': False, 'error': f'Parsing failed: {e}'}
     
+    def _parse_multiline_response(self, response_text: str, kw_list: List[str], trim_chars: int = 5) -> Optional[Dict]:
+        """
+        Split a multi-keyword timeline into one series per keyword.
+        
+        Returns {'timestamps': [...], 'series': {keyword: [values]}} where values
+        are on the batch's shared 0-100 scale, or None if nothing was parsed.
+        """
+        try:
+            data = json.loads(response_text[trim_chars:])
+            timeline_data = data['default']['timelineData']
+        except (json.JSONDecodeError, KeyError, TypeError) as e:
+            logger.error(f"Multiline parsing failed: {e}")
+            return None
+        
+        if not timeline_data:
+            return None
+        
+        timestamps = []
+        series = {kw: [] for kw in kw_list}
+        for entry in timeline_data:
+            values = entry.get('value') or []
+            if 'time' in entry:
+                timestamps.append(self._parse_google_timestamp(entry['time']))
+            else:
+                timestamps.append(datetime.now(timezone.utc))
+            for position, kw in enumerate(kw_list):
+                value = values[position] if position < len(values) else None
+                series[kw].append(0 if value is None else value)
+        
+        return {'timestamps': timestamps, 'series': series}
+    
     def _parse_google_timestamp(self, timestamp_input) -> datetime:
         """Parse Google timestamp and return timezone-aware UTC datetime"""
         try:
@@ -467,29 +592,16 @@ class GoogleTrendsService:
             return datetime.now(timezone.utc)
     
     async def _rate_limit(self):
-        """EXACT rate limiting from your working code + hourly enhancement"""
-        current_time = time.time()
-        
-        # Enhanced: hourly limit tracking
-        cutoff_time = current_time - 3600
-        self.request_history = [t for t in self.request_history if t > cutoff_time]
-        
-        if len(self.request_history) >= self.max_requests_per_hour:
-            oldest_request = self.request_history[0]
-            wait_time = 3600 - (current_time - oldest_request)
-            if wait_time > 0:
-                logger.warning(f"⏰ Hourly limit reached - waiting {wait_time/60:.1f} minutes")
-                await asyncio.sleep(wait_time)
-        
+        """Take a token from the shared limiter, then keep this session's own spacing"""
+        await get_rate_limiter(self.proxy).acquire(self.priority)
+
         # EXACT minimum delay logic from your working code
-        time_since_last = current_time - self.last_request_time
+        time_since_last = time.time() - self.last_request_time
         if time_since_last < self.min_delay:
             sleep_time = self.min_delay - time_since_last
             logger.info(f"Rate limiting: sleeping for {sleep_time:.1f} seconds")
             await asyncio.sleep(sleep_time)
-        
-        # Record request
-        self.request_history.append(time.time())
+
         self.last_request_time = time.time()
     
     async def get_trend_score(self, search_term: str, timeframe: str = "now 7-d", geo: str = "") -> dict:
@@ -525,6 +637,15 @@ class GoogleTrendsService:
                     'attention_score': -1.0
                 }
             
+        except CircuitOpenError as e:
+            logger.warning(f"Skipping '{search_term}': {e}")
+            return {
+                'success': False,
+                'error': str(e),
+                'retry_after': e.retry_after,
+                'search_term': search_term,
+                'attention_score': -1.0
+            }
         except Exception as e:
             self.failure_count += 1
             logger.error(f"get_trend_score exception: {e}")
@@ -535,8 +656,94 @@ class GoogleTrendsService:
                 'attention_score': -1.0
             }
     
+    async def get_trend_scores_batch(self, search_terms: List[str], timeframe: str = "now 1-d",
+                                     anchor_term: str = TRENDS_ANCHOR_TERM) -> Dict:
+        """
+        Fetch up to 4 search terms plus an anchor term in one explore/multiline round trip.
+        
+        Each term's timeline is rescaled to its own peak, so 'timeline' and
+        'attention_score' mean the same as a single-term get_trend_score call.
+        'batch_latest' and 'anchor_mean' keep the shared batch scale for
+        anchor_rescale. Terms with too little signal in the batch come back
+        with success False so the caller can fetch them individually.
+        
+        Returns {'success', 'anchor_mean', 'results': {term: result}}.
+        """
+        terms = list(dict.fromkeys(term for term in search_terms if term != anchor_term))[:4]
+        kw_list = terms + [anchor_term]
+        
+        try:
+            await self._ensure_valid_session()
+            await self.build_payload(kw_list=kw_list, timeframe=timeframe, geo=self.geo)
+            response_text = await self._request_timeline()
+            parsed = self._parse_multiline_response(response_text, kw_list) if response_text else None
+        except Exception as e:
+            logger.error(f"Batch fetch exception: {e}")
+            parsed = None
+        
+        if not parsed:
+            self.failure_count += 1
+            return {'success': False, 'anchor_mean': 0.0, 'results': {}}
+        
+        self.failure_count = 0
+        timestamps = parsed['timestamps']
+        anchor_values = parsed['series'][anchor_term]
+        results = {}
+        for term in terms:
+            values = parsed['series'][term]
+            peak = max(values, default=0)
+            if peak < MIN_BATCH_PEAK:
+                results[term] = {
+                    'success': False,
+                    'error': f'Peak {peak} in batch is too low to rescale',
+                    'search_term': term,
+                    'attention_score': -1.0
+                }
+                continue
+            
+            timeline = [round(value * 100 / peak, 2) for value in values]
+            results[term] = {
+                'success': True,
+                'search_term': term,
+                'attention_score': float(timeline[-1]),
+                'timeline': timeline,
+                'timeline_timestamps': timestamps,
+                'timeline_length': len(timeline),
+                'average_score': sum(timeline) / len(timeline),
+                'max_score': max(timeline),
+                'batch_latest': float(values[-1]),
+                'batch_peak': float(peak),
+                'source': 'batched_multiline',
+                'timestamp': datetime.now(timezone.utc).isoformat()
+            }
+            trends_response_cache.put(trends_response_cache.key(term, timeframe, self.geo), results[term])
+        
+        return {
+            'success': True,
+            'anchor_mean': sum(anchor_values) / len(anchor_values) if anchor_values else 0.0,
+            'results': results
+        }
+    
     async def get_google_trends_data(self, search_term: str, timeframe: str = "now 1-d") -> Dict:
-        """Enhanced wrapper that adds metadata to working method"""
+        """
+        Enhanced wrapper that adds metadata to working method.
+        
+        Concurrent calls for the same (term, timeframe, geo) from any service
+        instance share one upstream fetch, and successful results are reused
+        for TRENDS_RESPONSE_TTL seconds. The shared fetch runs on a session
+        from shared_fetch_services on this service's route, never on this
+        instance, so closing it does not break the fetch for other callers.
+        """
+        key = trends_response_cache.key(search_term, timeframe, self.geo)
+        use_tor, proxy, geo = self.use_tor, self.proxy, self.geo
+        return await trends_response_cache.fetch(
+            key,
+            lambda priority: shared_fetch_services.fetch(use_tor, proxy, geo, priority, search_term, timeframe),
+            self.priority
+        )
+    
+    async def fetch_google_trends_data(self, search_term: str, timeframe: str) -> Dict:
+        """One uncached upstream fetch on this service's own session"""
         result = await self.get_trend_score(search_term, timeframe, geo=self.geo)
         
         # Enhanced: Add metadata
@@ -564,6 +771,16 @@ class GoogleTrendsService:
                 logger.error(f"Failed to get data for {target.name}: {error_msg}")
                 return False
             
+            return await self.store_target_update(target, data, db)
+            
+        except Exception as e:
+            logger.error(f"Update failed for {target.name}: {e}")
+            db.rollback()
+            return False
+    
+    async def store_target_update(self, target: AttentionTarget, data: Dict, db: Session) -> bool:
+        """Save a successful trends result as the target's latest score and notify clients"""
+        try:
             # Update target
             new_score = data["attention_score"]
             old_score = float(target.current_attention_score)
@@ -579,24 +796,16 @@ class GoogleTrendsService:
                 # Use the most recent timestamp from Google's response
                 google_timestamp = data['timeline_timestamps'][-1]
 
-            history_entry = AttentionHistory(
-                target_id=target.id,
-                attention_score=Decimal(str(new_score)),
-                timestamp=google_timestamp,
-                data_source="google_trends_realtime",
-                timeframe_used="now 1-d",
-                confidence_score=Decimal("1.0")
+            # Normalized against the peak of the timeline it came from, so it needs no later rewrite
+            normalized = normalize_timeline(data.get('timeline', []) + [new_score], target.normalization_baseline)
+
+            # Google revises its newest bucket, so re-fetches update the point in place
+            upsert_history_points(
+                db, target.id, "google_trends_realtime", "now 1-d",
+                [google_timestamp], [new_score], normalized[-1:] if normalized else None, commit=False
             )
-            db.add(history_entry)
-            
-            # Cleanup old data
-            cutoff = datetime.now(timezone.utc) - timedelta(hours=48)
-            deleted = db.query(AttentionHistory).filter(
-                AttentionHistory.target_id == target.id,
-                AttentionHistory.data_source == "google_trends_realtime",
-                AttentionHistory.timestamp < cutoff
-            ).delete()
             
+            # Points older than the retention window go with their day partition (history_partitions)
             db.commit()
             
             # Enhanced logging with metadata (without storing in DB)
@@ -606,9 +815,6 @@ class GoogleTrendsService:
             
             logger.info(f"{target.name}: {old_score:.1f} → {new_score:.1f} ({change:+.1f}) {tor_info} {browser_info} {cookie_info}")
             
-            if deleted > 0:
-                logger.debug(f"🗑️ Cleaned {deleted} old points")
-            
             # WebSocket notification
             await self._notify_clients(target, new_score, change, google_timestamp)
             
@@ -654,6 +860,12 @@ class GoogleTrendsService:
             
             logger.info(f"Starting update cycle for {len(targets)} targets")
             
+            if TRENDS_BATCH_MODE:
+                updated = await self.update_targets_batched(targets, db)
+                success_rate = (updated / len(targets)) * 100
+                logger.info(f"Update cycle completed: {updated}/{len(targets)} targets successful ({success_rate:.1f}%)")
+                return success_rate > 50
+            
             updated = 0
             for i, target in enumerate(targets):
                 try:
@@ -684,6 +896,108 @@ class GoogleTrendsService:
             db.close()
 
 
+    async def update_targets_batched(self, targets: List[AttentionTarget], db: Session) -> int:
+        """
+        Update targets TRENDS_BATCH_SIZE at a time, each batch sharing an anchor term.
+        
+        Cuts requests per cycle roughly by the batch size. Targets the batch
+        could not resolve fall back to a single-term fetch. Returns the
+        number of targets updated.
+        """
+        updated = 0
+        comparable = {}
+        chunks = [targets[i:i + TRENDS_BATCH_SIZE] for i in range(0, len(targets), TRENDS_BATCH_SIZE)]
+        
+        limiter = get_rate_limiter(self.proxy)
+        for chunk_number, chunk in enumerate(chunks):
+            if limiter.retry_after() > 0:
+                logger.warning(f"Circuit breaker open - leaving {len(targets) - chunk_number * TRENDS_BATCH_SIZE} "
+                               f"targets for the next cycle")
+                break
+            batch = await self.get_trend_scores_batch([target.search_term for target in chunk])
+            anchored = {}
+            if batch['success']:
+                anchored = anchor_rescale([{
+                    'anchor_mean': batch['anchor_mean'],
+                    'latest': {term: result['batch_latest'] for term, result in batch['results'].items()
+                               if result.get('success')}
+                }])
+                comparable.update(anchored)
+            
+            for target in chunk:
+                result = batch['results'].get(target.search_term)
+                try:
+                    if result and result.get('success'):
+                        # Committed together with the score by store_target_update
+                        if target.search_term in anchored:
+                            target.anchor_relative_score = anchored[target.search_term]
+                            target.anchor_scored_at = datetime.now(timezone.utc)
+                        success = await self.store_target_update(target, result, db)
+                    else:
+                        success = await self.update_target_data(target, db)
+                    if success:
+                        updated += 1
+                except Exception as e:
+                    logger.error(f"Failed to update {target.name}: {e}")
+            
+            # Rate limit between batches
+            if chunk_number < len(chunks) - 1:
+                await asyncio.sleep(3 + random.uniform(0, 2))  # 3-5 seconds
+        
+        if comparable:
+            top = sorted(comparable.items(), key=lambda item: item[1], reverse=True)[:5]
+            logger.info(f"📊 Cross-target attention (anchor '{TRENDS_ANCHOR_TERM}' = 100): "
+                        + ", ".join(f"{term} {score:.1f}" for term, score in top))
+        
+        return updated
+
+
+class SharedFetchServices:
+    """
+    Trends sessions owned by the shared (coalesced) fetches of trends_response_cache.
+    
+    A coalesced fetch outlives the caller that started it, so it borrows an
+    idle session for that caller's route (Tor / proxy, which decides the
+    rate limiter bucket) and returns it afterwards. Sessions are reused, so
+    cookies are only fetched when a route needs one more concurrent session.
+    """
+    
+    MAX_IDLE_PER_ROUTE = 4
+    
+    def __init__(self):
+        self._idle: Dict[tuple, List[GoogleTrendsService]] = {}
+        self._created = 0
+    
+    async def fetch(self, use_tor: bool, proxy: Optional[str], geo: str, priority: Priority,
+                    search_term: str, timeframe: str) -> Dict:
+        idle = self._idle.setdefault((use_tor, proxy), [])
+        if idle:
+            service = idle.pop()
+        else:
+            # Spread user agents across the sessions of a route
+            service = GoogleTrendsService(use_tor=use_tor, proxy=proxy, browser_index=self._created)
+            self._created += 1
+        service.geo = geo
+        service.priority = priority
+        try:
+            return await service.fetch_google_trends_data(search_term, timeframe)
+        finally:
+            if len(idle) < self.MAX_IDLE_PER_ROUTE:
+                idle.append(service)
+            else:
+                await service.close()
+    
+    async def close(self):
+        """Close every idle session (on shutdown)"""
+        idle, self._idle = self._idle, {}
+        for services in idle.values():
+            for service in services:
+                await service.close()
+
+
+shared_fetch_services = SharedFetchServices()
+
+
 # Background worker
 async def run_background_updates(websocket_manager=None, use_tor=False):
     """Background worker using working implementation"""
@@ -703,8 +1017,10 @@ async def run_background_updates(websocket_manager=None, use_tor=False):
                 logger.info(f"Update cycle #{cycle} completed successfully")
                 await asyncio.sleep(900)  # 15 minutes
             else:
-                logger.error(f"Update cycle #{cycle} failed")
-                await asyncio.sleep(1800)  # 30 minutes on failure
+                # Throttling is handled by the shared breaker: retry as soon as it allows a probe
+                retry_after = max(60.0, get_rate_limiter().retry_after())
+                logger.error(f"Update cycle #{cycle} failed - retrying in {retry_after:.0f}s")
+                await asyncio.sleep(retry_after)
             
         except KeyboardInterrupt:
             logger.info("Background updates stopped by user")
@@ -0,0 +1,291 @@
+"""
+Partitioned attention_history and partition-based retention for TrendBet
+
+attention_history is LIST-partitioned by data_source:
+
+- attention_history_realtime holds 'google_trends_realtime' points and is
+  RANGE-partitioned by day on timestamp. Retention drops whole day
+  partitions, so updates never delete rows and the table never bloats.
+- attention_history_timeline (the default partition) holds the seeded
+  1d/7d/1m/3m/1y/5y timelines, which are kept.
+
+convert_to_partitioned() turns an existing plain table into this layout
+(create_tables runs it), and maintain_partitions() creates upcoming day
+partitions and drops expired ones, each day in its own savepoint. The
+background loop runs it hourly.
+
+Usage: python history_partitions.py [convert|maintain|info]
+"""
+
+import asyncio
+import json
+import logging
+import os
+import sys
+from datetime import date, datetime, timedelta, timezone
+from typing import Dict, List
+
+from sqlalchemy import text
+
+from database import engine
+
+logger = logging.getLogger(__name__)
+
+REALTIME_SOURCE = "google_trends_realtime"
+REALTIME_RETENTION_HOURS = int(os.getenv('REALTIME_RETENTION_HOURS', '48'))
+PREMAKE_DAYS = 3                 # Day partitions created ahead of time
+MAINTENANCE_INTERVAL = 3600      # Seconds between background maintenance runs
+MAINTENANCE_LOCK_ID = 7210318    # pg advisory lock: one maintainer across processes
+
+_PARTITION_PREFIX = "attention_history_rt_"
+
+
+def _partition_name(day: date) -> str:
+    return f"{_PARTITION_PREFIX}{day:%Y%m%d}"
+
+
+def is_partitioned(conn) -> bool:
+    return conn.execute(text(
+        "SELECT 1 FROM pg_partitioned_table WHERE partrelid = 'attention_history'::regclass"
+    )).first() is not None
+
+
+def _create_day_partition(conn, day: date) -> bool:
+    """
+    Create one realtime day partition. Points for that day that landed in
+    attention_history_rt_default meanwhile would make CREATE fail, so they
+    are moved out first and inserted again into the new partition.
+    """
+    name = _partition_name(day)
+    exists = conn.execute(text("SELECT to_regclass(:name)"), {"name": name}).scalar()
+    if exists:
+        return False
+    bounds = {"start": day, "end": day + timedelta(days=1)}
+    stranded = conn.execute(text(
+        "SELECT 1 FROM attention_history_rt_default WHERE timestamp >= :start AND timestamp < :end LIMIT 1"
+    ), bounds).first()
+    if stranded:
+        conn.execute(text("CREATE TEMP TABLE attention_history_rt_moving (LIKE attention_history_rt_default)"))
+        conn.execute(text("""
+            WITH moved AS (
+                DELETE FROM attention_history_rt_default
+                WHERE timestamp >= :start AND timestamp < :end
+                RETURNING *
+            )
+            INSERT INTO attention_history_rt_moving SELECT * FROM moved
+        """), bounds)
+    conn.execute(text(
+        f"CREATE TABLE {name} PARTITION OF attention_history_realtime "
+        f"FOR VALUES FROM ('{day.isoformat()}') TO ('{(day + timedelta(days=1)).isoformat()}')"
+    ))
+    if stranded:
+        moved = conn.execute(text(
+            "INSERT INTO attention_history_realtime SELECT * FROM attention_history_rt_moving"
+        )).rowcount
+        conn.execute(text("DROP TABLE attention_history_rt_moving"))
+        logger.info(f"Moved {moved} points from attention_history_rt_default into {name}")
+    return True
+
+
+def convert_to_partitioned() -> bool:
+    """
+    Rebuild a plain attention_history as the partitioned layout, copying
+    its rows (expired realtime points are left behind). Returns False if
+    it is already partitioned.
+    """
+    with engine.begin() as conn:
+        if is_partitioned(conn):
+            return False
+        conn.execute(text("LOCK TABLE attention_history IN ACCESS EXCLUSIVE MODE"))
+
+        conn.execute(text("ALTER TABLE attention_history RENAME TO attention_history_legacy"))
+        conn.execute(text("ALTER TABLE attention_history_legacy DROP CONSTRAINT IF EXISTS uq_attention_history_point"))
+        conn.execute(text("ALTER TABLE attention_history_legacy DROP CONSTRAINT IF EXISTS attention_history_pkey"))
+        for index in ("ix_attention_history_id", "ix_attention_history_timestamp",
+                      "idx_attention_history_target_source_time"):
+            conn.execute(text(f"DROP INDEX IF EXISTS {index}"))
+        # The id sequence carries over to the new table
+        conn.execute(text("ALTER SEQUENCE attention_history_id_seq OWNED BY NONE"))
+
+        conn.execute(text("""
+            CREATE TABLE attention_history (
+                id integer NOT NULL DEFAULT nextval('attention_history_id_seq'),
+                target_id integer NOT NULL REFERENCES attention_targets (id),
+                attention_score numeric(5, 2) NOT NULL,
+                normalized_score numeric(5, 2),
+                data_source varchar(50) NOT NULL DEFAULT 'google_trends',
+                timeframe_used varchar(20),
+                confidence_score numeric(3, 2),
+                timestamp timestamp NOT NULL,
+                PRIMARY KEY (id, data_source, timestamp),
+                CONSTRAINT uq_attention_history_point UNIQUE (target_id, data_source, timestamp)
+            ) PARTITION BY LIST (data_source)
+        """))
+        conn.execute(text("ALTER SEQUENCE attention_history_id_seq OWNED BY attention_history.id"))
+        conn.execute(text("CREATE INDEX ix_attention_history_id ON attention_history (id)"))
+        conn.execute(text("CREATE INDEX ix_attention_history_timestamp ON attention_history (timestamp)"))
+
+        conn.execute(text(f"""
+            CREATE TABLE attention_history_realtime PARTITION OF attention_history
+            FOR VALUES IN ('{REALTIME_SOURCE}') PARTITION BY RANGE (timestamp)
+        """))
+        # Catches points outside the day partitions (e.g. clock skew); trimmed by maintenance
+        conn.execute(text("CREATE TABLE attention_history_rt_default PARTITION OF attention_history_realtime DEFAULT"))
+        conn.execute(text("CREATE TABLE attention_history_timeline PARTITION OF attention_history DEFAULT"))
+
+        cutoff = datetime.now(timezone.utc).replace(tzinfo=None) - timedelta(hours=REALTIME_RETENTION_HOURS)
+        today = datetime.now(timezone.utc).date()
+        day = cutoff.date()
+        while day <= today + timedelta(days=PREMAKE_DAYS):
+            _create_day_partition(conn, day)
+            day += timedelta(days=1)
+
+        columns = "id, target_id, attention_score, normalized_score, data_source, timeframe_used, confidence_score, timestamp"
+        params = {"realtime": REALTIME_SOURCE, "cutoff": cutoff}
+        # Rows without a timestamp cannot be placed in any partition: kept aside, not dropped
+        rejected = conn.execute(text(
+            "SELECT count(*) FROM attention_history_legacy WHERE timestamp IS NULL"
+        )).scalar()
+        if rejected:
+            conn.execute(text(
+                "CREATE TABLE attention_history_rejected AS "
+                "SELECT * FROM attention_history_legacy WHERE timestamp IS NULL"
+            ))
+        expired = conn.execute(text(
+            "SELECT count(*) FROM attention_history_legacy WHERE data_source = :realtime AND timestamp < :cutoff"
+        ), params).scalar()
+
+        copied = conn.execute(text(f"""
+            INSERT INTO attention_history ({columns})
+            SELECT {columns} FROM attention_history_legacy
+            WHERE data_source IS NOT NULL AND timestamp IS NOT NULL
+              AND (data_source <> :realtime OR timestamp >= :cutoff)
+        """), params).rowcount
+        # Rows without a source get the column default; ones that duplicate a
+        # stored point are skipped, as ensure_history_unique_constraint does
+        missing_source = conn.execute(text(
+            "SELECT count(*) FROM attention_history_legacy WHERE data_source IS NULL AND timestamp IS NOT NULL"
+        )).scalar()
+        backfilled = conn.execute(text(f"""
+            INSERT INTO attention_history ({columns})
+            SELECT id, target_id, attention_score, normalized_score, 'google_trends', timeframe_used,
+                   confidence_score, timestamp
+            FROM attention_history_legacy
+            WHERE data_source IS NULL AND timestamp IS NOT NULL
+            ON CONFLICT ON CONSTRAINT uq_attention_history_point DO NOTHING
+        """)).rowcount if missing_source else 0
+        conn.execute(text("DROP TABLE attention_history_legacy"))
+
+    logger.info(f"Converted attention_history to partitioned layout ({copied} rows copied, "
+                f"{expired} expired realtime points not copied)")
+    if missing_source:
+        logger.warning(f"Backfilled data_source 'google_trends' on {backfilled} rows without a source "
+                       f"({missing_source - backfilled} duplicates of stored points skipped)")
+    if rejected:
+        logger.warning(f"{rejected} attention_history rows without a timestamp moved to attention_history_rejected")
+    return True
+
+
+def maintain_partitions() -> Dict:
+    """Create upcoming realtime day partitions and drop expired ones"""
+    report = {"created": [], "dropped": [], "trimmed_default": 0, "skipped": None, "errors": []}
+    with engine.begin() as conn:
+        if not conn.execute(text("SELECT pg_try_advisory_xact_lock(:id)"), {"id": MAINTENANCE_LOCK_ID}).scalar():
+            report["skipped"] = "another process is maintaining partitions"
+            return report
+
+        now = datetime.now(timezone.utc).replace(tzinfo=None)
+        cutoff = now - timedelta(hours=REALTIME_RETENTION_HOURS)
+
+        if not is_partitioned(conn):
+            # Not converted yet: one set-based delete instead of partition drops
+            report["skipped"] = "attention_history is not partitioned"
+            report["trimmed_default"] = conn.execute(text(
+                "DELETE FROM attention_history WHERE data_source = :realtime AND timestamp < :cutoff"
+            ), {"realtime": REALTIME_SOURCE, "cutoff": cutoff}).rowcount
+            return report
+
+        # Each day in its own savepoint: one failing day must not block the rest
+        for offset in range(PREMAKE_DAYS + 1):
+            day = now.date() + timedelta(days=offset)
+            try:
+                with conn.begin_nested():
+                    if _create_day_partition(conn, day):
+                        report["created"].append(_partition_name(day))
+            except Exception as e:
+                logger.error(f"❌ Creating partition {_partition_name(day)} failed: {e}")
+                report["errors"].append({"partition": _partition_name(day), "error": str(e)})
+
+        for name in _realtime_partitions(conn):
+            day = datetime.strptime(name[len(_PARTITION_PREFIX):], "%Y%m%d").date()
+            # Whole partition is older than the cutoff once its end is
+            if datetime.combine(day + timedelta(days=1), datetime.min.time()) <= cutoff:
+                try:
+                    with conn.begin_nested():
+                        conn.execute(text(f"ALTER TABLE attention_history_realtime DETACH PARTITION {name}"))
+                        conn.execute(text(f"DROP TABLE {name}"))
+                    report["dropped"].append(name)
+                except Exception as e:
+                    logger.error(f"❌ Dropping partition {name} failed: {e}")
+                    report["errors"].append({"partition": name, "error": str(e)})
+
+        report["trimmed_default"] = conn.execute(text(
+            "DELETE FROM attention_history_rt_default WHERE timestamp < :cutoff"
+        ), {"cutoff": cutoff}).rowcount
+
+    if report["created"] or report["dropped"]:
+        logger.info(f"🗂️ History partitions: created {report['created']}, dropped {report['dropped']}")
+    return report
+
+
+def _realtime_partitions(conn) -> List[str]:
+    rows = conn.execute(text("""
+        SELECT child.relname FROM pg_inherits
+        JOIN pg_class parent ON parent.oid = pg_inherits.inhparent
+        JOIN pg_class child ON child.oid = pg_inherits.inhrelid
+        WHERE parent.relname = 'attention_history_realtime'
+        ORDER BY child.relname
+    """)).fetchall()
+    return [row.relname for row in rows if row.relname.startswith(_PARTITION_PREFIX) and row.relname[-8:].isdigit()]
+
+
+def partition_info() -> Dict:
+    with engine.connect() as conn:
+        if not is_partitioned(conn):
+            return {"partitioned": False}
+        sizes = conn.execute(text("""
+            SELECT child.relname, pg_total_relation_size(child.oid) AS bytes, child.reltuples AS estimated_rows
+            FROM pg_inherits
+            JOIN pg_class child ON child.oid = pg_inherits.inhrelid
+            WHERE pg_inherits.inhparent IN ('attention_history'::regclass, 'attention_history_realtime'::regclass)
+            ORDER BY child.relname
+        """)).fetchall()
+    return {
+        "partitioned": True,
+        "realtime_retention_hours": REALTIME_RETENTION_HOURS,
+        "partitions": [{"name": row.relname, "bytes": row.bytes, "estimated_rows": int(max(row.estimated_rows, 0))}
+                       for row in sizes],
+    }
+
+
+async def run_partition_maintenance():
+    """Background loop: maintain partitions every MAINTENANCE_INTERVAL seconds"""
+    while True:
+        try:
+            await asyncio.to_thread(maintain_partitions)
+        except Exception as e:
+            logger.error(f"❌ History partition maintenance failed: {e}")
+        await asyncio.sleep(MAINTENANCE_INTERVAL)
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    command = sys.argv[1] if len(sys.argv) > 1 else "info"
+    if command == "convert":
+        print("Converted" if convert_to_partitioned() else "Already partitioned")
+    elif command == "maintain":
+        print(json.dumps(maintain_partitions(), indent=2))
+    elif command == "info":
+        print(json.dumps(partition_info(), indent=2))
+    else:
+        print("Usage: python history_partitions.py [convert|maintain|info]")
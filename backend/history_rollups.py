@@ -0,0 +1,267 @@
+"""
+Multi-resolution rollups of attention history for TrendBet charts
+
+attention_rollups keeps hourly, daily and weekly min/max/avg/last scores
+per target. Google returns the same period at several granularities (the
+1-day timeline every 8 minutes, 7-day hourly, 1-month daily, ...), so
+each bucket is filled from one source:
+
+- hour buckets: the finest source that has points in the bucket
+- day and week buckets: the source that covers most of the bucket (a few
+  realtime points do not outweigh a 1-month series with every day of the
+  week), the finest one among equals
+
+A 14-day chart at hourly resolution therefore shows hourly detail for the
+last week and daily points before it, read with one range scan of the
+(target_id, resolution, bucket) key.
+
+Rollups are kept current incrementally: history_store refreshes the hour
+and day buckets touched by every write, in the same transaction, and the
+week bucket when the write spans weeks or the stored week is more than
+WEEK_REFRESH_INTERVAL behind. Buckets built from realtime points outlive
+the raw points' retention window; a rebuild (after renormalization)
+overwrites every bucket it has raw points for.
+
+Usage: python history_rollups.py [backfill|rebuild TARGET_ID]
+"""
+
+import logging
+import sys
+from datetime import datetime, timedelta, timezone
+from typing import List, Optional
+
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from chart_cache import invalidate_target_charts
+from models import AttentionRollup
+
+logger = logging.getLogger(__name__)
+
+RESOLUTIONS = ("hour", "day", "week")
+
+# Lower is finer; anything not listed ranks last
+SOURCE_RANKS = {
+    "google_trends_realtime": 0,
+    "google_trends_1d": 1,
+    "google_trends_7d": 2,
+    "google_trends_1m": 3,
+    "google_trends_3m": 4,
+    "google_trends_1y": 5,
+    "google_trends_5y": 6,
+}
+UNKNOWN_SOURCE_RANK = 9
+
+# Seconds of the timeline each point of a source stands for (its step)
+SOURCE_STEPS = {
+    "google_trends_realtime": 480,
+    "google_trends_1d": 480,
+    "google_trends_7d": 3600,
+    "google_trends_1m": 86400,
+    "google_trends_3m": 86400,
+    "google_trends_1y": 604800,
+    "google_trends_5y": 604800,
+}
+UNKNOWN_SOURCE_STEP = 3600
+RESOLUTION_SECONDS = {"hour": 3600, "day": 86400, "week": 604800}
+
+# Writes within one week recompute its week bucket at most this often
+WEEK_REFRESH_INTERVAL = timedelta(hours=1)
+
+# Chart windows up to these many days use the resolution; raw points below hour
+HOURLY_MAX_DAYS = 14
+DAILY_MAX_DAYS = 400
+
+
+def _source_case(values: dict, default) -> str:
+    return "CASE h.data_source {} ELSE {} END".format(
+        " ".join(f"WHEN '{source}' THEN {value}" for source, value in values.items()), default
+    )
+
+
+def _resolutions_sql(resolutions) -> str:
+    return ", ".join(f"('{resolution}', {RESOLUTION_SECONDS[resolution]})" for resolution in resolutions)
+
+
+# Preference of a bucket's source: rank alone for hours, coverage then rank
+# for days and weeks. Compared as rows, so a larger tuple wins.
+def _preference(row: str) -> str:
+    return (f"(CASE WHEN {row}.resolution = 'hour' THEN 1 ELSE coalesce({row}.coverage, 0) END, "
+            f"-{row}.source_rank)")
+
+
+# DISTINCT ON keeps the preferred source per bucket. {guard} decides which
+# stored buckets may be replaced; unchanged buckets are always skipped.
+_ROLLUP_SQL = f"""
+    INSERT INTO attention_rollups (target_id, resolution, bucket, data_source, source_rank, coverage, min_score,
+                                   max_score, avg_score, last_score, point_count, last_timestamp)
+    SELECT DISTINCT ON (target_id, resolution, bucket)
+        target_id, resolution, bucket, data_source, source_rank, coverage, min_score,
+        max_score, avg_score, last_score, point_count, last_timestamp
+    FROM (
+        SELECT h.target_id, r.resolution, date_trunc(r.resolution, h.timestamp) AS bucket, h.data_source,
+               {_source_case(SOURCE_RANKS, UNKNOWN_SOURCE_RANK)} AS source_rank,
+               least(1.0, count(*) * CAST({_source_case(SOURCE_STEPS, UNKNOWN_SOURCE_STEP)} AS double precision)
+                          / r.seconds) AS coverage,
+               min(h.score) AS min_score,
+               max(h.score) AS max_score,
+               avg(h.score) AS avg_score,
+               (array_agg(h.score ORDER BY h.timestamp DESC))[1] AS last_score,
+               count(*) AS point_count,
+               max(h.timestamp) AS last_timestamp
+        FROM (
+            SELECT target_id, data_source, timestamp,
+                   CAST(coalesce(normalized_score, attention_score) AS double precision) AS score
+            FROM attention_history
+            WHERE {{where}}
+        ) h
+        CROSS JOIN (VALUES {{resolutions}}) AS r (resolution, seconds)
+        GROUP BY h.target_id, r.resolution, r.seconds, bucket, h.data_source
+    ) per_source
+    ORDER BY target_id, resolution, bucket,
+             CASE WHEN resolution = 'hour' THEN 1 ELSE coverage END DESC, source_rank
+    ON CONFLICT (target_id, resolution, bucket) DO UPDATE SET
+        data_source = EXCLUDED.data_source,
+        source_rank = EXCLUDED.source_rank,
+        coverage = EXCLUDED.coverage,
+        min_score = EXCLUDED.min_score,
+        max_score = EXCLUDED.max_score,
+        avg_score = EXCLUDED.avg_score,
+        last_score = EXCLUDED.last_score,
+        point_count = EXCLUDED.point_count,
+        last_timestamp = EXCLUDED.last_timestamp
+    WHERE {{guard}}
+      AND (attention_rollups.data_source, attention_rollups.coverage, attention_rollups.min_score,
+           attention_rollups.max_score, attention_rollups.avg_score, attention_rollups.last_score,
+           attention_rollups.point_count, attention_rollups.last_timestamp)
+          IS DISTINCT FROM
+          (EXCLUDED.data_source, EXCLUDED.coverage, EXCLUDED.min_score, EXCLUDED.max_score,
+           EXCLUDED.avg_score, EXCLUDED.last_score, EXCLUDED.point_count, EXCLUDED.last_timestamp)
+"""
+
+# A refresh sees one source: it replaces that source's own buckets and
+# buckets held by a less preferred source
+_REFRESH_GUARD = (f"(attention_rollups.data_source = EXCLUDED.data_source "
+                  f"OR {_preference('EXCLUDED')} >= {_preference('attention_rollups')})")
+# A rebuild sees every stored source, so its choice stands (also over
+# buckets whose raw points have expired, e.g. after renormalization)
+_REBUILD_GUARD = "TRUE"
+
+# Whole buckets of one source around a write, aligned to the resolution
+_REFRESH_WHERE = """
+    target_id = :target_id AND data_source = :data_source
+    AND timestamp >= date_trunc(:unit, CAST(:start AS timestamp))
+    AND timestamp < date_trunc(:unit, CAST(:end AS timestamp)) + CAST('1 ' || :unit AS interval)
+"""
+
+
+def _rollup_sql(where: str, guard: str, resolutions=RESOLUTIONS) -> str:
+    return _ROLLUP_SQL.format(where=where, guard=guard, resolutions=_resolutions_sql(resolutions))
+
+
+def _week_is_current(db: Session, target_id: int, data_source: str, start: datetime, end: datetime) -> bool:
+    """True if [start, end] lies in one week whose stored bucket is this source's and recent enough"""
+    start, end = _naive_utc(start), _naive_utc(end)
+    week = datetime.combine(end.date() - timedelta(days=end.weekday()), datetime.min.time())
+    if start < week:
+        return False
+    last_timestamp = db.query(AttentionRollup.last_timestamp).filter(
+        AttentionRollup.target_id == target_id,
+        AttentionRollup.resolution == "week",
+        AttentionRollup.bucket == week,
+        AttentionRollup.data_source == data_source
+    ).scalar()
+    return last_timestamp is not None and end - last_timestamp < WEEK_REFRESH_INTERVAL
+
+
+def refresh_rollups(db: Session, target_id: int, data_source: str, start: datetime, end: datetime) -> int:
+    """
+    Recompute the hour and day buckets covering [start, end] for one
+    source, and its week bucket unless it is current, in the session's
+    transaction
+    """
+    params = {"target_id": target_id, "data_source": data_source, "start": start, "end": end}
+    written = db.execute(text(_rollup_sql(_REFRESH_WHERE, _REFRESH_GUARD, ("hour", "day"))),
+                         dict(params, unit="day")).rowcount or 0
+    if not _week_is_current(db, target_id, data_source, start, end):
+        written += db.execute(text(_rollup_sql(_REFRESH_WHERE, _REFRESH_GUARD, ("week",))),
+                              dict(params, unit="week")).rowcount or 0
+    return written
+
+
+def rebuild_rollups(db: Session, target_id: Optional[int] = None) -> int:
+    """
+    Recompute every bucket of one target (or all targets) from the stored
+    history, e.g. after its normalized scores changed. Buckets with no raw
+    points left keep their stored values.
+    """
+    if target_id is None:
+        result = db.execute(text(_rollup_sql("TRUE", _REBUILD_GUARD)))
+    else:
+        result = db.execute(text(_rollup_sql("target_id = :target_id", _REBUILD_GUARD)), {"target_id": target_id})
+    invalidate_target_charts(db, target_id)
+    return result.rowcount or 0
+
+
+def ensure_rollups_backfilled(engine) -> None:
+    """Build rollups for existing history the first time the table is empty"""
+    with engine.begin() as conn:
+        if conn.execute(text("SELECT 1 FROM attention_rollups LIMIT 1")).first():
+            return
+        if not conn.execute(text("SELECT 1 FROM attention_history LIMIT 1")).first():
+            return
+        written = conn.execute(text(_rollup_sql("TRUE", _REBUILD_GUARD))).rowcount
+    logger.info(f"Backfilled {written} attention rollup buckets")
+
+
+def choose_resolution(days: int) -> Optional[str]:
+    """Rollup resolution for a chart window, or None to read raw points"""
+    if days <= 1:
+        return None
+    if days <= HOURLY_MAX_DAYS:
+        return "hour"
+    if days <= DAILY_MAX_DAYS:
+        return "day"
+    return "week"
+
+
+def _naive_utc(value: datetime) -> datetime:
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+
+def load_rollups(db: Session, target_id: int, resolution: str, start: datetime) -> List:
+    """Buckets from `start` on, oldest first"""
+    start = _naive_utc(start)
+    return db.query(
+        AttentionRollup.bucket,
+        AttentionRollup.data_source,
+        AttentionRollup.min_score,
+        AttentionRollup.max_score,
+        AttentionRollup.avg_score,
+        AttentionRollup.last_score,
+        AttentionRollup.point_count,
+    ).filter(
+        AttentionRollup.target_id == target_id,
+        AttentionRollup.resolution == resolution,
+        AttentionRollup.bucket >= start
+    ).order_by(AttentionRollup.bucket.asc()).all()
+
+
+if __name__ == "__main__":
+    from database import SessionLocal
+
+    logging.basicConfig(level=logging.INFO)
+    command = sys.argv[1] if len(sys.argv) > 1 else ""
+    if command in ("backfill", "rebuild"):
+        db = SessionLocal()
+        try:
+            target = int(sys.argv[2]) if command == "rebuild" and len(sys.argv) > 2 else None
+            written = rebuild_rollups(db, target)
+            db.commit()
+            print(f"Wrote {written} rollup buckets")
+        finally:
+            db.close()
+    else:
+        print("Usage: python history_rollups.py [backfill|rebuild TARGET_ID]")
@@ -0,0 +1,136 @@
+"""
+Attention history ingestion for TrendBet
+
+Every fetched timeline overlaps the previous fetch of the same source, so
+points are upserted on (target_id, data_source, timestamp) instead of
+appended. Only points at or after the newest stored timestamp for that
+source are written: the newest point is usually Google's partial
+bucket and gets revised, and everything older is already stored.
+
+Rows go straight from the timeline arrays to psycopg2, with no ORM
+objects or Decimal conversions, in one execute_values INSERT ... ON
+CONFLICT per page. Timelines are at most a few hundred points (261 for
+five years of weeks) and usually only the newest one or two are new, so
+a COPY staging table would never pay for itself.
+
+The chart rollups for the written range are refreshed in the same
+transaction (see history_rollups) and the target's cached charts are
+invalidated (see chart_cache).
+"""
+
+import logging
+from datetime import datetime, timezone
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from psycopg2.extras import execute_values
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from chart_cache import invalidate_target_charts
+from history_rollups import refresh_rollups
+from models import AttentionHistory
+
+logger = logging.getLogger(__name__)
+
+HISTORY_CONSTRAINT = "uq_attention_history_point"
+VALUES_PAGE_SIZE = 1000
+
+_COLUMNS = "target_id, data_source, timeframe_used, timestamp, attention_score, normalized_score, confidence_score"
+
+# Identical rows are left alone (no dead tuples, and they count as skipped).
+# attention_history is partitioned, so RETURNING cannot read xmax to tell
+# inserts from updates; the written timestamps are returned instead
+_UPSERT_TAIL = f"""
+    ON CONFLICT ON CONSTRAINT {HISTORY_CONSTRAINT} DO UPDATE SET
+        attention_score = EXCLUDED.attention_score,
+        normalized_score = EXCLUDED.normalized_score,
+        timeframe_used = EXCLUDED.timeframe_used,
+        confidence_score = EXCLUDED.confidence_score
+    WHERE attention_history.attention_score IS DISTINCT FROM EXCLUDED.attention_score
+       OR attention_history.normalized_score IS DISTINCT FROM EXCLUDED.normalized_score
+    RETURNING timestamp
+"""
+
+_VALUES_SQL = f"INSERT INTO attention_history ({_COLUMNS}) VALUES %s {_UPSERT_TAIL}"
+
+Row = Tuple[int, str, str, datetime, float, Optional[float], float]
+
+
+def _utc_naive(timestamp: datetime) -> datetime:
+    """attention_history.timestamp has no time zone; values are stored as UTC wall time"""
+    if timestamp.tzinfo is not None:
+        timestamp = timestamp.astimezone(timezone.utc).replace(tzinfo=None)
+    return timestamp
+
+
+def latest_timestamp(db: Session, target_id: int, data_source: str) -> Optional[datetime]:
+    return db.query(func.max(AttentionHistory.timestamp)).filter(
+        AttentionHistory.target_id == target_id,
+        AttentionHistory.data_source == data_source
+    ).scalar()
+
+
+def write_history_rows(db: Session, rows: List[Row]) -> List[datetime]:
+    """Upsert raw rows in the session's transaction; returns the timestamps actually written"""
+    if not rows:
+        return []
+    cursor = db.connection().connection.cursor()
+    try:
+        written = execute_values(cursor, _VALUES_SQL, rows, page_size=VALUES_PAGE_SIZE, fetch=True)
+        return [timestamp for (timestamp,) in written]
+    finally:
+        cursor.close()
+
+
+def upsert_history_points(
+    db: Session,
+    target_id: int,
+    data_source: str,
+    timeframe_used: str,
+    timestamps: Sequence[datetime],
+    scores: Sequence[float],
+    normalized_scores: Optional[Sequence[Optional[float]]] = None,
+    confidence: float = 1.0,
+    commit: bool = True
+) -> Dict[str, int]:
+    """
+    Write a timeline for one target and source.
+
+    Returns {'inserted', 'updated', 'skipped'}: points older than the
+    newest stored one, and re-sent points whose values did not change,
+    count as skipped.
+    """
+    counts = {"inserted": 0, "updated": 0, "skipped": 0}
+    if normalized_scores is None:
+        normalized_scores = [None] * len(scores)
+
+    latest = latest_timestamp(db, target_id, data_source)
+    rows: Dict[datetime, Row] = {}
+    for timestamp, score, normalized in zip(timestamps, scores, normalized_scores):
+        timestamp = _utc_naive(timestamp)
+        if latest is not None and timestamp < latest:
+            counts["skipped"] += 1
+            continue
+        # One statement may not touch the same row twice: the last value wins
+        if timestamp in rows:
+            counts["skipped"] += 1
+        rows[timestamp] = (
+            target_id, data_source, timeframe_used, timestamp,
+            round(float(score), 2),
+            None if normalized is None else round(float(normalized), 2),
+            confidence,
+        )
+
+    written = write_history_rows(db, list(rows.values()))
+    if rows:
+        refresh_rollups(db, target_id, data_source, min(rows), max(rows))
+        invalidate_target_charts(db, target_id)
+    # Only the newest stored point can be rewritten: every later one is new
+    inserted = sum(1 for timestamp in written if timestamp != latest)
+    counts["inserted"] += inserted
+    counts["updated"] += len(written) - inserted
+    counts["skipped"] += len(rows) - len(written)
+
+    if commit:
+        db.commit()
+    return counts
@@ -21,20 +21,29 @@ from dotenv import load_dotenv
 load_dotenv()
 
 # Third-party imports
-from fastapi import BackgroundTasks, Depends, FastAPI, HTTPException, Query, WebSocket, WebSocketDisconnect, status
+from fastapi import Depends, FastAPI, HTTPException, Query, Request, Response, WebSocket, WebSocketDisconnect, status
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.security import OAuth2PasswordBearer
-from pydantic import BaseModel
-from sqlalchemy import func
+from pydantic import BaseModel, Field
+import numpy as np
+from sqlalchemy import Float, Integer, any_, cast, func, literal
+from sqlalchemy.dialects.postgresql import ARRAY
 from sqlalchemy.orm import Session
 
 # Local imports
 from auth import authenticate_user, create_access_token, create_user, decode_access_token, get_current_user
 from csv_loader import csv_loader
 from database import SessionLocal, engine
-from google_trends_service import GoogleTrendsService
+from google_trends_service import GoogleTrendsService, shared_fetch_services
+from chart_cache import chart_cache, etag_matches, history_version, make_etag, time_bucket
+from downsampling import ALGORITHMS, DEFAULT_ALGORITHM, DEFAULT_MAX_POINTS, MAX_POINTS_LIMIT, downsample
+from history_rollups import choose_resolution, load_rollups
+from history_store import upsert_history_points
+from normalization import get_recalculation_status, normalize_target, recalculate_baselines
+from trends_rate_limiter import Priority
 from models import (
     AttentionHistory,
+    AttentionRollup,
     AttentionTarget,
     ChatMessage,
     Portfolio,
@@ -137,6 +146,13 @@ class ChatMessageRequest(BaseModel):
     """Chat message request model."""
     content: str
 
+class ChartBatchRequest(BaseModel):
+    """Charts for several targets over the same window."""
+    target_ids: List[int] = Field(..., min_length=1, max_length=100)
+    days: int = 30
+    max_points: int = Field(DEFAULT_MAX_POINTS, ge=2, le=MAX_POINTS_LIMIT)
+    algorithm: str = Field(DEFAULT_ALGORITHM, pattern="^(" + "|".join(ALGORITHMS) + ")$")
+
 # WebSocket Connection Manager
 class ConnectionManager:
     """
@@ -462,18 +478,61 @@ async def reload_csv_data(current_user: User = Depends(get_current_user)):
     """Reload CSV data from files (admin only)"""
     # You might want to add admin role checking here
     try:
-        csv_loader.reload_data()
+        # Parse and index off the event loop; the new catalog is swapped in atomically
+        files = await asyncio.to_thread(csv_loader.reload_data)
         stats = csv_loader.get_category_stats()
         
         return {
             "success": True,
             "message": "CSV data reloaded successfully",
-            "stats": stats
+            "stats": stats,
+            "files": files
         }
     except Exception as e:
         logger.error(f"Failed to reload CSV data: {e}")
         raise HTTPException(status_code=500, detail=f"Failed to reload CSV data: {str(e)}")
 
+@app.get("/admin/search-cache-stats")
+async def search_cache_stats(current_user: User = Depends(get_current_user)):
+    """Autocomplete query cache hit/miss counters (admin only)"""
+    return {
+        "success": True,
+        "cache": csv_loader.get_search_cache_stats()
+    }
+
+@app.get("/admin/refresh-schedule")
+async def refresh_schedule(limit: int = 50, current_user: User = Depends(get_current_user)):
+    """Per-target refresh priority and interval stats from the background scheduler (admin only)"""
+    from background_updater import get_refresh_schedule
+    
+    schedule = get_refresh_schedule(limit=max(1, min(limit, 500)))
+    if schedule is None:
+        raise HTTPException(status_code=503, detail="Background updater is not running")
+    return {
+        "success": True,
+        "scheduler": schedule
+    }
+
+@app.get("/admin/trends-throttle")
+async def trends_throttle(current_user: User = Depends(get_current_user)):
+    """Adaptive Trends rate, circuit breaker state and recent transitions per route (admin only)"""
+    from trends_rate_limiter import get_rate_limiter_stats
+    
+    return {
+        "success": True,
+        "limiters": get_rate_limiter_stats(include_history=True)
+    }
+
+@app.get("/admin/seeding-jobs")
+async def seeding_jobs(current_user: User = Depends(get_current_user), db: Session = Depends(get_db)):
+    """Historical seeding queue counts and recent failures (admin only)"""
+    from seeding_queue import get_seeding_status
+    
+    return {
+        "success": True,
+        "seeding": get_seeding_status(db)
+    }
+
 # Update your existing search endpoint to use CSV validation
 @app.post("/api/search")
 async def search_attention_target(
@@ -538,7 +597,8 @@ async def search_attention_target(
     
     # Create new target using CSV data
     try:
-        async with GoogleTrendsService(websocket_manager=manager, use_tor=USE_TOR) as service:
+        async with GoogleTrendsService(websocket_manager=manager, use_tor=USE_TOR,
+                                       priority=Priority.INTERACTIVE) as service:
             trends_data = await service.get_google_trends_data(best_match['search_term'])
             
             if not trends_data.get('success'):
@@ -594,26 +654,17 @@ async def search_attention_target(
                 except Exception as e:
                     logger.warning(f"Failed to store initial timeframe data: {e}")
             else:
-                # Store single point if no timeline data
-                history = AttentionHistory(
-                    target_id=new_target.id,
-                    attention_score=new_target.current_attention_score,
-                    normalized_score=new_target.current_attention_score,  # Default to raw score
-                    data_source="google_trends",
-                    timeframe_used="now 1-d"
+                # Store single point if no timeline data (normalized defaults to raw score)
+                score = float(new_target.current_attention_score)
+                upsert_history_points(
+                    db, new_target.id, "google_trends", "now 1-d",
+                    [datetime.now(timezone.utc)], [score], [score]
                 )
-                db.add(history)
-                db.commit()
             
-            # Start gradual background seeding for remaining timeframes
-            # This spreads the seeding over 30+ minutes to avoid rate limits
-            asyncio.create_task(
-                gradual_historical_seeding(
-                    new_target.id, 
-                    best_match['search_term'],
-                    start_delay_minutes=2  # Wait 2 minutes before starting
-                )
-            )
+            # Queue the remaining timeframes for the seeding workers
+            # They are spread over the next hour to avoid rate limits and survive restarts
+            from seeding_queue import enqueue_seeding
+            enqueue_seeding(db, new_target.id, best_match['search_term'])
             
             return {
                 "success": True,
@@ -637,122 +688,34 @@ async def search_attention_target(
 async def calculate_normalization_baseline(target_id: int, db: SessionLocal):
     """Calculate 7-day baseline for score normalization and apply to all existing data"""
     try:
-        # Get all 7-day data points for this target
-        seven_day_data = db.query(AttentionHistory).filter(
-            AttentionHistory.target_id == target_id,
-            AttentionHistory.timeframe_used.in_(["now 7-d", "7d"])
-        ).order_by(AttentionHistory.timestamp).all()
-
-        logger.info(f"🔍 Found {len(seven_day_data)} 7-day data points for target {target_id}")
-
-        if not seven_day_data:
-            logger.warning(f"No 7-day data found for target {target_id} - cannot calculate baseline")
-            return
-
-        # Calculate baseline as average of 7-day scores
-        total_score = sum(float(point.attention_score) for point in seven_day_data)
-        baseline = total_score / len(seven_day_data)
-
-        # Update target with new baseline
-        target = db.query(AttentionTarget).filter(AttentionTarget.id == target_id).first()
-        if target:
-            target.normalization_baseline = Decimal(str(round(baseline, 2)))
-            target.baseline_calculated_at = datetime.now(timezone.utc)
-            db.commit()
-
-            logger.info(f"📊 Calculated normalization baseline for {target.name}: {baseline:.2f} (from {len(seven_day_data)} 7-day points)")
-
-            # Apply normalization to all existing data points
-            await apply_normalization_to_existing_data(target_id, baseline, db)
-
+        # Blocking DB work, so keep it off the event loop
+        await asyncio.to_thread(normalize_target, db, target_id)
     except Exception as e:
         logger.error(f"Failed to calculate normalization baseline for target {target_id}: {e}")
-        db.rollback()
-
-async def apply_normalization_to_existing_data(target_id: int, baseline: float, db: SessionLocal):
-    """Apply normalization to all existing attention history data"""
-    try:
-        # Get all data points for this target
-        all_data = db.query(AttentionHistory).filter(
-            AttentionHistory.target_id == target_id
-        ).all()
-
-        # Group by timeframe to normalize each group
-        timeframe_groups = {}
-        for point in all_data:
-            tf = point.timeframe_used
-            if tf not in timeframe_groups:
-                timeframe_groups[tf] = []
-            timeframe_groups[tf].append(point)
-
-        # Normalize each timeframe group
-        for timeframe, points in timeframe_groups.items():
-            if not points:
-                continue
-
-            # Find the peak (max) score in this timeframe for normalization
-            timeframe_peak = max(float(point.attention_score) for point in points)
-
-            # Apply normalization formula: normalized = raw * (baseline / timeframe_peak)
-            normalization_factor = baseline / timeframe_peak if timeframe_peak > 0 else 1
-
-            for point in points:
-                raw_score = float(point.attention_score)
-                normalized = raw_score * normalization_factor
-                point.normalized_score = Decimal(str(round(normalized, 2)))
-
-            logger.info(f"📈 Normalized {len(points)} points for timeframe {timeframe} (peak: {timeframe_peak:.1f}, factor: {normalization_factor:.3f})")
-
-        db.commit()
-        logger.info(f"✅ Applied normalization to {len(all_data)} total data points for target {target_id}")
-
-    except Exception as e:
-        logger.error(f"Failed to apply normalization for target {target_id}: {e}")
-        db.rollback()
+        await asyncio.to_thread(db.rollback)
 
 async def recalculate_all_baselines():
-    """Monthly re-normalization: recalculate baselines for all targets"""
+    """Monthly re-normalization: recalculate baselines for all targets in worker threads"""
     logger.info("🔄 Starting monthly baseline recalculation for all targets...")
-
-    db = SessionLocal()
     try:
-        # Get all active targets
-        targets = db.query(AttentionTarget).filter(AttentionTarget.is_active == True).all()
-
-        recalculated_count = 0
-        for target in targets:
-            try:
-                # Check if baseline is older than 30 days or doesn't exist
-                needs_recalc = (
-                    not target.baseline_calculated_at or
-                    (datetime.now(timezone.utc) - target.baseline_calculated_at).days >= 30
-                )
-
-                if needs_recalc:
-                    logger.info(f"🎯 Recalculating baseline for {target.name} (last calc: {target.baseline_calculated_at})")
-                    await calculate_normalization_baseline(target.id, db)
-                    recalculated_count += 1
-
-                    # Small delay to avoid overwhelming the system
-                    await asyncio.sleep(1)
-
-            except Exception as e:
-                logger.error(f"Failed to recalculate baseline for target {target.id}: {e}")
-                continue
-
-        logger.info(f"✅ Monthly baseline recalculation complete: {recalculated_count}/{len(targets)} targets updated")
-
+        await asyncio.to_thread(recalculate_baselines)
     except Exception as e:
         logger.error(f"Failed during monthly baseline recalculation: {e}")
-    finally:
-        db.close()
 
 @app.post("/admin/recalculate-baselines")
 async def manual_baseline_recalculation():
     """Admin endpoint to manually trigger baseline recalculation"""
-    await recalculate_all_baselines()
+    status = get_recalculation_status()
+    if status["running"]:
+        return {"message": "Baseline recalculation already running", "progress": status}
+    asyncio.create_task(recalculate_all_baselines())
     return {"message": "Baseline recalculation started"}
 
+@app.get("/admin/recalculate-baselines/status")
+async def baseline_recalculation_status(_current_user: User = Depends(get_current_user)):
+    """Progress of the current or last baseline recalculation"""
+    return get_recalculation_status()
+
 # Start monthly baseline recalculation task
 async def start_monthly_baseline_task():
     """Start the monthly baseline recalculation background task"""
@@ -766,83 +729,6 @@ async def start_monthly_baseline_task():
             # Wait 1 hour before retrying
             await asyncio.sleep(3600)
 
-async def gradual_historical_seeding(target_id: int, search_term: str, start_delay_minutes: int = 2):
-    """Gradual background seeding to avoid rate limits - spread over 30+ minutes"""
-    
-    # Initial delay before starting
-    logger.info(f"Chart: Gradual seeding for target {target_id} starting in {start_delay_minutes} minutes...")
-    await asyncio.sleep(start_delay_minutes * 60)
-    
-    db = SessionLocal()
-    try:
-        target = db.query(AttentionTarget).filter(AttentionTarget.id == target_id).first()
-        if not target:
-            logger.error(f"Failed: Target {target_id} not found for gradual seeding")
-            return
-            
-        logger.info(f"Chart: Starting gradual historical seeding for {target.name}")
-        
-        # FIX: Conservative timeframe seeding with long delays (no random)
-        timeframes_with_delays = [
-            ("now 7-d", "7d", 5),      # Wait 5 minutes, then seed 7-day
-            ("today 1-m", "1m", 8),    # Wait 8 more minutes, then seed 1-month  
-            ("today 3-m", "3m", 10),   # Wait 10 more minutes, then seed 3-month
-            ("today 12-m", "1y", 12),  # Wait 12 more minutes, then seed 1-year
-            ("today 5-y", "5y", 15),   # Wait 15 more minutes, then seed 5-year
-        ]
-        
-        seeded_count = 1  # Already have 1d data
-        
-        async with GoogleTrendsService(websocket_manager=manager, use_tor=USE_TOR) as service:
-            for timeframe_code, timeframe_name, delay_minutes in timeframes_with_delays:
-                try:
-                    # Wait before each request
-                    logger.info(f"Timing: Waiting {delay_minutes} minutes before seeding {timeframe_name} data for {target.name}")
-                    await asyncio.sleep(delay_minutes * 60)
-                    
-                    logger.info(f"Data: Seeding {timeframe_name} data for {target.name}...")
-                    data = await service.get_google_trends_data(
-                        search_term, 
-                        timeframe=timeframe_code,
-                    )
-                    
-                    if data and data.get('success') and data.get('timeline'):
-                        from seed_data import store_timeframe_data_with_real_timestamps
-                        await store_timeframe_data_with_real_timestamps(
-                            target, data, timeframe_name, timeframe_code, db
-                        )
-                        seeded_count += 1
-                        logger.info(f"Successfully Seeded {timeframe_name} data for {target.name}")
-                    else:
-                        error_msg = data.get('error', 'No timeline data') if data else 'Request failed'
-                        logger.warning(f"Warning: No {timeframe_name} data for {target.name}: {error_msg}")
-                        
-                        # If we hit rate limits, increase delays for remaining timeframes
-                        if 'Rate limited' in error_msg or 'Circuit breaker' in error_msg:
-                            logger.warning(f"Blocked: Rate limited during {timeframe_name} seeding. Extending delays for remaining timeframes.")
-                            # Double remaining delays
-                            remaining_frames = timeframes_with_delays[timeframes_with_delays.index((timeframe_code, timeframe_name, delay_minutes)) + 1:]
-                            for tc, tn, dm in remaining_frames:
-                                timeframes_with_delays[timeframes_with_delays.index((tc, tn, dm))] = (tc, tn, dm * 2)
-                    
-                except Exception as e:
-                    logger.error(f"Failed: Failed to seed {timeframe_name} data for {target.name}: {e}")
-                    # Continue with next timeframe after brief pause
-                    await asyncio.sleep(30)
-            
-            total_time = sum([delay for _, _, delay in timeframes_with_delays])
-            logger.info(f"Successfully Gradual seeding complete for {target.name}: {seeded_count}/6 timeframes over {total_time} minutes")
-            
-            # Update target to indicate seeding is complete
-            target.last_updated = datetime.now(timezone.utc)
-            db.commit()
-            
-    except Exception as e:
-        logger.error(f"Failed: Gradual seeding failed for target {target_id}: {e}")
-        db.rollback()
-    finally:
-        db.close()
-
 async def seed_historical_data_for_target(target_id: int, search_term: str):
     """Background task to seed historical data for a newly created target"""
     db = SessionLocal()
@@ -854,7 +740,8 @@ async def seed_historical_data_for_target(target_id: int, search_term: str):
             
         logger.info(f"Chart: Starting historical data seeding for {target.name}")
         
-        async with GoogleTrendsService(websocket_manager=manager, use_tor=USE_TOR) as service:
+        async with GoogleTrendsService(websocket_manager=manager, use_tor=USE_TOR,
+                                       priority=Priority.SEEDING) as service:
             # Standard Google Trends timeframes
             timeframes = [
                 ("now 1-d", "1d"),
@@ -926,6 +813,7 @@ def get_targets(
             "search_term": target.search_term,
             "description": target.description,
             "current_attention_score": float(target.current_attention_score),
+            "anchor_relative_score": target.anchor_relative_score,
             "last_updated": target.last_updated.isoformat() if target.last_updated else None
         })
     
@@ -949,9 +837,35 @@ def get_target_detail(target_id: int, db: Session = Depends(get_db)):
     }
 
 @app.get("/targets/{target_id}/chart")
-def get_target_chart_data(target_id: int, days: int = 30, db: Session = Depends(get_db)):
-    """Get chart data"""
+def get_target_chart_data(
+    request: Request,
+    target_id: int,
+    days: int = 30,
+    max_points: int = Query(DEFAULT_MAX_POINTS, ge=2, le=MAX_POINTS_LIMIT),
+    algorithm: str = Query(DEFAULT_ALGORITHM, pattern="^(" + "|".join(ALGORITHMS) + ")$"),
+    db: Session = Depends(get_db)
+):
+    """Get chart data, downsampled to at most max_points (lttb, minmax or nth)"""
+    version = history_version(db, target_id)
+    if version is None:
+        raise HTTPException(status_code=404, detail="Target not found")
     
+    # Polling clients revalidate with the ETag and get an empty 304 until the
+    # history changes or the time bucket (and with it the window) moves on
+    key = (target_id, days, max_points, algorithm)
+    bucket = time_bucket()
+    headers = {"ETag": make_etag(key, version, bucket), "Cache-Control": "no-cache"}
+    if etag_matches(request.headers.get("if-none-match"), headers["ETag"]):
+        return Response(status_code=304, headers=headers)
+    
+    body = chart_cache.get(key, version, bucket)
+    if body is None:
+        body = json.dumps(build_chart_payload(target_id, days, max_points, algorithm, db)).encode()
+        chart_cache.put(key, version, bucket, body)
+    return Response(content=body, media_type="application/json", headers=headers)
+
+def build_chart_payload(target_id: int, days: int, max_points: int, algorithm: str, db: Session) -> Dict:
+    """Chart response body (raises 404 for unknown targets)"""
     target = db.query(AttentionTarget).filter(AttentionTarget.id == target_id).first()
     if not target:
         raise HTTPException(status_code=404, detail="Target not found")
@@ -959,49 +873,34 @@ def get_target_chart_data(target_id: int, days: int = 30, db: Session = Depends(
     end_time = datetime.now(timezone.utc)
     start_time = end_time - timedelta(days=days)
     
-    # Simple timeframe mapping to data sources
-    if days <= 1:
-        data_source = "google_trends_1d"
-    elif days <= 7:
-        data_source = "google_trends_7d"
-    elif days <= 30:
-        data_source = "google_trends_1m"
-    elif days <= 90:
-        data_source = "google_trends_3m"
-    elif days <= 365:
-        data_source = "google_trends_1y"
-    else:
-        data_source = "google_trends_5y"
-    
-    logger.info(f"Chart: Chart request: {days} days -> trying {data_source}")
-    
-    # Try primary data source first
-    base_data = db.query(AttentionHistory).filter(
-        AttentionHistory.target_id == target_id,
-        AttentionHistory.data_source == data_source,
-        AttentionHistory.timestamp >= start_time
-    ).order_by(AttentionHistory.timestamp.asc()).all()
-    
-    all_data = list(base_data)
-    actual_data_source = data_source
-    
-    # For 1-day charts, always try to add real-time data
-    if days <= 1:
-        logger.info("Chart: Adding real-time data for 1-day chart")
-        realtime_data = db.query(AttentionHistory).filter(
+    # Longer windows read pre-aggregated buckets that span all sources (see history_rollups)
+    resolution = choose_resolution(days)
+    
+    if resolution is None:
+        # 1-day charts: Google's 8-minute timeline plus real-time updates, in one query
+        actual_data_source = "google_trends_1d"
+        rows = db.query(
+            AttentionHistory.timestamp,
+            # Return normalized scores for consistent UX
+            cast(func.coalesce(AttentionHistory.normalized_score, AttentionHistory.attention_score), Float).label("score"),
+            AttentionHistory.data_source
+        ).filter(
             AttentionHistory.target_id == target_id,
-            AttentionHistory.data_source == "google_trends_realtime",
+            AttentionHistory.data_source.in_(["google_trends_1d", "google_trends_realtime"]),
             AttentionHistory.timestamp >= start_time
         ).order_by(AttentionHistory.timestamp.asc()).all()
-        
-        if realtime_data:
-            # Combine and sort
-            all_data = list(all_data) + list(realtime_data)
-            all_data.sort(key=lambda x: x.timestamp)
-            logger.info(f"Chart: Combined data: {len(base_data)} base + {len(realtime_data)} realtime = {len(all_data)} total")
+        timestamps = [row.timestamp for row in rows]
+        scores = np.fromiter((row.score for row in rows), dtype=np.float64, count=len(rows))
+    else:
+        actual_data_source = f"rollup_{resolution}"
+        rows = load_rollups(db, target_id, resolution, start_time)
+        timestamps = [row.bucket for row in rows]
+        scores = np.fromiter((row.avg_score for row in rows), dtype=np.float64, count=len(rows))
+    
+    logger.info(f"Chart: Chart request: {days} days -> {len(rows)} points from {actual_data_source}")
     
     # FIX: If still no data, create a synthetic data point from current score
-    if not all_data:
+    if not rows:
         logger.warning(f"No historical data found for target {target_id}. Creating synthetic data point.")
         
         # Create a single data point with current score (normalized if baseline available)
@@ -1041,37 +940,29 @@ def get_target_chart_data(target_id: int, days: int = 30, db: Session = Depends(
             "message": "Historical data is being loaded in the background. Chart will update automatically when ready."
         }
     
-    # Convert to response format - return normalized scores for consistent UX
-    data_points = [
-        {
-            "timestamp": point.timestamp.isoformat() if point.timestamp.tzinfo else point.timestamp.replace(tzinfo=timezone.utc).isoformat(),
-            "attention_score": float(point.normalized_score) if point.normalized_score else float(point.attention_score),  # Use normalized score
-            "data_source": point.data_source
+    # Shape-preserving sampling on the arrays; only kept points are formatted
+    seconds = np.array(timestamps, dtype="datetime64[us]").astype(np.int64) / 1e6
+    kept = downsample(seconds, scores, max_points, algorithm)
+    
+    data_points = []
+    for i in kept.tolist():
+        row = rows[i]
+        point = {
+            "timestamp": timestamps[i].replace(tzinfo=timezone.utc).isoformat(),
+            "attention_score": float(scores[i]),
+            "data_source": row.data_source
         }
-        for point in all_data
-    ]
-    
-    # Simple sampling if too many points
-    original_count = len(data_points)
-    if len(data_points) > 200:
-        step = len(data_points) // 150
-        data_points = [data_points[i] for i in range(0, len(data_points), step)]
-        if data_points and all_data and data_points[-1]["timestamp"] != all_data[-1].timestamp.isoformat():
-            data_points.append({
-                "timestamp": all_data[-1].timestamp.isoformat(),
-                "attention_score": float(all_data[-1].attention_score),
-                "data_source": all_data[-1].data_source
-            })
+        if resolution is not None:
+            point["min_score"] = row.min_score
+            point["max_score"] = row.max_score
+        data_points.append(point)
     
     # Determine granularity based on actual data source used
     granularity_map = {
-        "google_trends_realtime": "real-time updates",
-        "google_trends_1d": "hourly data",
-        "google_trends_7d": "daily data", 
-        "google_trends_1m": "daily data",
-        "google_trends_3m": "weekly data",
-        "google_trends_1y": "monthly data",
-        "google_trends_5y": "monthly data"
+        "google_trends_1d": "real-time updates",
+        "rollup_hour": "hourly data",
+        "rollup_day": "daily data",
+        "rollup_week": "weekly data"
     }
     
     logger.info(f"Chart: Returning {len(data_points)} points for {target.name} ({days}d) using {actual_data_source}")
@@ -1092,12 +983,103 @@ def get_target_chart_data(target_id: int, days: int = 30, db: Session = Depends(
         },
         "sampling_info": {
             "granularity": granularity_map.get(actual_data_source, "optimized sampling"),
-            "total_points_available": original_count,
+            "total_points_available": len(rows),
             "sampled_points": len(data_points),
+            "algorithm": algorithm if len(rows) > max_points else None,
+            "resolution": resolution or "raw",
             "is_synthetic": False
         }
     }
 
+@app.post("/charts/batch")
+def get_charts_batch(batch: ChartBatchRequest, db: Session = Depends(get_db)):
+    """
+    Charts for many targets in one request and one query.
+    
+    Columnar response: `timestamps` is the sorted union of every kept
+    point's time (epoch seconds), and each series lists indices into it
+    (`i`) with the scores (`v`); rollup windows also carry `min`/`max`.
+    Bucketed windows share almost every timestamp across targets.
+    """
+    target_ids = sorted(set(batch.target_ids))
+    end_time = datetime.now(timezone.utc)
+    start_time = end_time - timedelta(days=batch.days)
+    resolution = choose_resolution(batch.days)
+    ids_param = any_(literal(target_ids, ARRAY(Integer)))
+    
+    if resolution is None:
+        rows = db.query(
+            AttentionHistory.target_id,
+            AttentionHistory.timestamp,
+            cast(func.coalesce(AttentionHistory.normalized_score, AttentionHistory.attention_score), Float)
+        ).filter(
+            AttentionHistory.target_id == ids_param,
+            AttentionHistory.data_source.in_(["google_trends_1d", "google_trends_realtime"]),
+            AttentionHistory.timestamp >= start_time
+        ).order_by(AttentionHistory.target_id, AttentionHistory.timestamp).all()
+    else:
+        naive_start = start_time.replace(tzinfo=None)
+        rows = db.query(
+            AttentionRollup.target_id,
+            AttentionRollup.bucket,
+            AttentionRollup.avg_score,
+            AttentionRollup.min_score,
+            AttentionRollup.max_score
+        ).filter(
+            AttentionRollup.target_id == ids_param,
+            AttentionRollup.resolution == resolution,
+            AttentionRollup.bucket >= naive_start
+        ).order_by(AttentionRollup.target_id, AttentionRollup.bucket).all()
+    
+    count = len(rows)
+    columns = list(zip(*rows)) if rows else [(), (), (), (), ()]
+    row_targets = np.fromiter(columns[0], dtype=np.int64, count=count)
+    seconds = np.array(columns[1], dtype="datetime64[s]").astype(np.int64)
+    scores = np.fromiter(columns[2], dtype=np.float64, count=count)
+    
+    # Rows are ordered by target, so each target is one contiguous slice
+    starts = np.flatnonzero(np.r_[True, row_targets[1:] != row_targets[:-1]]) if count else np.array([], dtype=np.int64)
+    ends = np.r_[starts[1:], count]
+    kept_by_target = {}
+    for start, end in zip(starts.tolist(), ends.tolist()):
+        kept = start + downsample(seconds[start:end], scores[start:end], batch.max_points, batch.algorithm)
+        kept_by_target[int(row_targets[start])] = (kept, end - start)
+    
+    all_kept = np.concatenate([kept for kept, _total in kept_by_target.values()]) if kept_by_target else np.array([], dtype=np.int64)
+    timestamps, positions = np.unique(seconds[all_kept], return_inverse=True)
+    if resolution is not None:
+        lows = np.fromiter(columns[3], dtype=np.float64, count=count)
+        highs = np.fromiter(columns[4], dtype=np.float64, count=count)
+    
+    series = {str(target_id): {"i": [], "v": [], "total_points": 0} for target_id in target_ids}
+    offset = 0
+    for target_id, (kept, total) in kept_by_target.items():
+        entry = {
+            "i": positions[offset:offset + len(kept)].tolist(),
+            "v": np.round(scores[kept], 2).tolist(),
+            "total_points": total
+        }
+        if resolution is not None:
+            entry["min"] = np.round(lows[kept], 2).tolist()
+            entry["max"] = np.round(highs[kept], 2).tolist()
+        series[str(target_id)] = entry
+        offset += len(kept)
+    
+    logger.info(f"Chart: Batch of {len(target_ids)} targets ({batch.days}d): {count} rows -> {len(all_kept)} points")
+    
+    return {
+        "days": batch.days,
+        "resolution": resolution or "raw",
+        "algorithm": batch.algorithm,
+        "max_points": batch.max_points,
+        "date_range": {
+            "start": start_time.isoformat(),
+            "end": end_time.isoformat()
+        },
+        "timestamps": timestamps.tolist(),
+        "series": series
+    }
+
 # Trading endpoints
 @app.post("/trade")
 def execute_trade(trade: TradeRequest, current_user: User = Depends(get_current_user), db: Session = Depends(get_db)):
@@ -1988,24 +1970,13 @@ def get_leaderboard(db: Session = Depends(get_db)):
 
 # Admin endpoints
 @app.get("/admin/cleanup")
-async def cleanup_database(_current_user: User = Depends(get_current_user), db: Session = Depends(get_db)):
-    """Admin endpoint to cleanup old data"""
+async def cleanup_database(_current_user: User = Depends(get_current_user)):
+    """Admin endpoint to run history retention now (drops expired realtime partitions)"""
     try:
-        # Simple cleanup - remove old history entries (keep last 100 per target)
-        targets = db.query(AttentionTarget).all()
-        
-        for target in targets:
-            # Keep only the latest 100 history entries per target
-            old_entries = db.query(AttentionHistory).filter(
-                AttentionHistory.target_id == target.id
-            ).order_by(AttentionHistory.timestamp.desc()).offset(100).all()
-            
-            for entry in old_entries:
-                db.delete(entry)
-        
-        db.commit()
+        from history_partitions import maintain_partitions
+        report = await asyncio.to_thread(maintain_partitions)
         logger.info("Database cleanup completed")
-        return {"message": "Database cleanup completed", "status": "success"}
+        return {"message": "Database cleanup completed", "status": "success", **report}
     except Exception as e:
         logger.error(f"Cleanup failed: {e}")
         raise HTTPException(status_code=500, detail=f"Cleanup failed: {str(e)}")
@@ -2018,7 +1989,8 @@ async def force_update_target(target_id: int, _current_user: User = Depends(get_
         raise HTTPException(status_code=404, detail="Target not found")
     
     try:
-        async with GoogleTrendsService(websocket_manager=manager, use_tor=USE_TOR) as service:
+        async with GoogleTrendsService(websocket_manager=manager, use_tor=USE_TOR,
+                                       priority=Priority.INTERACTIVE) as service:
             success = await service.update_target_data(target, db)
         
         if success:
@@ -2054,10 +2026,13 @@ def health_check():
 @app.get("/service-status")
 def get_service_status():
     """Get status of various services"""
+    from background_updater import get_updater_status
+    
     return {
         "api": {"status": "healthy", "version": "2.0.0"},
         "database": {"status": "connected"},
         "google_trends": {"status": "running", "service": "GoogleTrendsService"},
+        "background_updater": get_updater_status(),
         "timestamp": datetime.now(timezone.utc).isoformat()
     }
 
@@ -2102,6 +2077,15 @@ async def start_background_tasks():
         asyncio.create_task(start_background_updates(websocket_manager=manager, use_tor=USE_TOR))
         logger.info("Successfully Background data updates started with WebSocket support")
         
+        # Historical seeding jobs live in the database; workers in every process share them
+        from seeding_queue import start_seeding_workers
+        workers = start_seeding_workers(websocket_manager=manager, use_tor=USE_TOR)
+        logger.info(f"Successfully Started {len(workers)} historical seeding worker(s)")
+        
+        from history_partitions import run_partition_maintenance
+        asyncio.create_task(run_partition_maintenance())
+        logger.info("Successfully History partition maintenance started")
+        
     except ImportError as e:
         logger.error(f"Failed: Failed to import background_updater: {e}")
         # Fallback to service method with WebSocket manager
@@ -2138,6 +2122,9 @@ async def shutdown_event():
         except:
             pass
     
+    # Close the sessions used by coalesced Trends fetches
+    await shared_fetch_services.close()
+    
     logger.info("Successfully TrendBet API shutdown complete!")
 
 # Chat endpoints
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Float, DateTime, Boolean, ForeignKey, Enum, Text, Numeric
+from sqlalchemy import Column, Integer, String, Float, DateTime, Boolean, ForeignKey, Enum, Text, Numeric, Index, UniqueConstraint
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import relationship
 from datetime import datetime, timezone
@@ -61,6 +61,13 @@ class AttentionTarget(Base):
     # 7-day normalization baseline (new system)
     normalization_baseline = Column(Numeric(5, 2))  # 7-day average for score normalization
     baseline_calculated_at = Column(DateTime)  # When normalization baseline was last calculated
+
+    # Latest score on the shared anchor scale (anchor term's mean = 100), comparable across targets
+    anchor_relative_score = Column(Float)
+    anchor_scored_at = Column(DateTime)
+
+    # Bumped by every history write; chart caches and ETags key on it (see chart_cache)
+    history_version = Column(Integer, nullable=False, default=0, server_default="0")
     
     # Relationships
     history = relationship("AttentionHistory", back_populates="target")
@@ -69,6 +76,10 @@ class AttentionTarget(Base):
 
 class AttentionHistory(Base):
     __tablename__ = "attention_history"
+    __table_args__ = (
+        # One point per source and timestamp; ingestion upserts against it (see history_store)
+        UniqueConstraint("target_id", "data_source", "timestamp", name="uq_attention_history_point"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     target_id = Column(Integer, ForeignKey("attention_targets.id"), nullable=False)
@@ -200,4 +211,70 @@ class ChatMessage(Base):
     timestamp = Column(DateTime, default=lambda: datetime.now(timezone.utc), index=True)
 
     # Relationships
-    user = relationship("User")
\ No newline at end of file
+    user = relationship("User")
+
+class RateLimitBucket(Base):
+    """
+    Shared Google Trends token bucket (TRENDS_RATE_LIMIT_BACKEND=postgres)
+    """
+    __tablename__ = "rate_limit_buckets"
+
+    key = Column(String(200), primary_key=True)  # "default" or a proxy URL
+    tokens = Column(Float, nullable=False)
+    updated_at = Column(DateTime(timezone=True), nullable=False)
+
+
+class SeedingJob(Base):
+    """
+    One historical timeframe to seed for a target (see seeding_queue)
+    """
+    __tablename__ = "seeding_jobs"
+    __table_args__ = (
+        UniqueConstraint("target_id", "timeframe_code", name="uq_seeding_jobs_target_timeframe"),
+        Index("ix_seeding_jobs_claim", "status", "not_before"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    target_id = Column(Integer, ForeignKey("attention_targets.id"), nullable=False)
+    search_term = Column(String(200), nullable=False)
+    timeframe_code = Column(String(20), nullable=False)  # Google Trends code, e.g. "today 1-m"
+    timeframe_name = Column(String(10), nullable=False)  # e.g. "1m"
+
+    status = Column(String(10), nullable=False, default="pending")  # pending, running, done, failed
+    attempts = Column(Integer, nullable=False, default=0)
+    max_attempts = Column(Integer, nullable=False, default=5)
+    not_before = Column(DateTime(timezone=True), nullable=False)  # Earliest time a worker may claim it
+    locked_by = Column(String(100))
+    locked_at = Column(DateTime(timezone=True))
+    last_error = Column(Text)
+
+    created_at = Column(DateTime(timezone=True), default=lambda: datetime.now(timezone.utc))
+    completed_at = Column(DateTime(timezone=True))
+
+    target = relationship("AttentionTarget")
+
+
+class AttentionRollup(Base):
+    """
+    Hourly, daily or weekly min/max/avg/last of a target's attention history
+    (see history_rollups). Hour buckets come from the finest data source
+    with points in them; day and week buckets from the finest source that
+    covers the whole bucket.
+    """
+    __tablename__ = "attention_rollups"
+
+    target_id = Column(Integer, ForeignKey("attention_targets.id"), primary_key=True)
+    resolution = Column(String(10), primary_key=True)  # hour, day, week
+    bucket = Column(DateTime, primary_key=True)        # Bucket start, UTC wall time like attention_history
+
+    data_source = Column(String(50), nullable=False)
+    source_rank = Column(Integer, nullable=False)      # Lower is finer
+    coverage = Column(Float)                           # Share of the bucket the source's points span, 0-1
+    min_score = Column(Float, nullable=False)
+    max_score = Column(Float, nullable=False)
+    avg_score = Column(Float, nullable=False)
+    last_score = Column(Float, nullable=False)
+    point_count = Column(Integer, nullable=False)
+    last_timestamp = Column(DateTime, nullable=False)
+
+    target = relationship("AttentionTarget")
@@ -0,0 +1,246 @@
+"""
+Attention score normalization for TrendBet
+
+Google scales every timeframe's timeline to its own peak (100), so scores
+from different timeframes are not comparable. Each target gets a
+baseline, the average of its 7-day scores, and every point is stored as
+
+    normalized = raw * baseline / peak of the point's timeframe
+
+New timelines are normalized as they are ingested (normalize_timeline),
+so they never need a second pass. Rewriting stored history runs in the
+database: one aggregate for the baseline and one
+UPDATE ... FROM (per-timeframe peaks) for the points, instead of loading
+and rewriting every row as an ORM object.
+
+The periodic recalculation (recalculate_baselines) computes every active
+target's baseline in one grouped query and only renormalizes targets
+whose baseline moved by more than BASELINE_CHANGE_THRESHOLD points,
+spread over BASELINE_WORKERS threads. It blocks, so callers run it in a
+worker thread; get_recalculation_status() reports its progress.
+"""
+
+import logging
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime, timezone
+from decimal import Decimal
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+from sqlalchemy import func, text
+from sqlalchemy.orm import Session
+
+from database import SessionLocal
+from history_rollups import rebuild_rollups
+from models import AttentionHistory, AttentionTarget
+
+logger = logging.getLogger(__name__)
+
+BASELINE_TIMEFRAMES = ("now 7-d", "7d")
+BASELINE_CHANGE_THRESHOLD = float(os.getenv('BASELINE_CHANGE_THRESHOLD', '1.0'))
+BASELINE_WORKERS = max(1, int(os.getenv('BASELINE_WORKERS', '4')))
+MAX_REPORTED_ERRORS = 20
+
+# Rows whose value would not change are left alone (no dead tuples)
+_APPLY_SQL = """
+    UPDATE attention_history AS h
+    SET normalized_score = round(h.attention_score * peaks.factor, 2)
+    FROM (
+        SELECT timeframe_used,
+               CASE WHEN max(attention_score) > 0 THEN :baseline / max(attention_score) ELSE 1 END AS factor
+        FROM attention_history
+        WHERE target_id = :target_id
+        GROUP BY timeframe_used
+    ) AS peaks
+    WHERE h.target_id = :target_id
+      AND h.timeframe_used IS NOT DISTINCT FROM peaks.timeframe_used
+      AND h.normalized_score IS DISTINCT FROM round(h.attention_score * peaks.factor, 2)
+"""
+
+
+def normalize_timeline(scores: Sequence[float], baseline) -> Optional[List[float]]:
+    """
+    Normalized values for one fetched timeline, with its peak taken once
+    over the whole array; None while the target has no baseline.
+    """
+    if baseline is None or not len(scores):
+        return None
+    values = np.asarray(scores, dtype=np.float64)
+    peak = values.max()
+    factor = float(baseline) / peak if peak > 0 else 1.0
+    return np.round(values * factor, 2).tolist()
+
+
+def calculate_baseline(db: Session, target_id: int) -> Optional[Dict]:
+    """Average 7-day score of a target, or None without 7-day data"""
+    average, points = db.query(
+        func.avg(AttentionHistory.attention_score), func.count(AttentionHistory.id)
+    ).filter(
+        AttentionHistory.target_id == target_id,
+        AttentionHistory.timeframe_used.in_(BASELINE_TIMEFRAMES)
+    ).one()
+    if not points:
+        return None
+    return {"baseline": round(float(average), 2), "points": points}
+
+
+def apply_normalization(db: Session, target_id: int, baseline: float) -> int:
+    """Rewrite the target's normalized scores in one statement; returns rows changed"""
+    updated = db.execute(text(_APPLY_SQL), {
+        "target_id": target_id, "baseline": Decimal(str(baseline))
+    }).rowcount or 0
+    if updated:
+        rebuild_rollups(db, target_id)
+    return updated
+
+
+def store_baseline(db: Session, target_id: int, baseline: float) -> int:
+    """Save a new baseline and renormalize the target's history against it; returns rows changed"""
+    db.query(AttentionTarget).filter(AttentionTarget.id == target_id).update({
+        AttentionTarget.normalization_baseline: Decimal(str(baseline)),
+        AttentionTarget.baseline_calculated_at: datetime.now(timezone.utc),
+    })
+    return apply_normalization(db, target_id, baseline)
+
+
+def normalize_target(db: Session, target_id: int, commit: bool = True) -> Optional[Dict]:
+    """
+    Recalculate a target's baseline and renormalize its history.
+
+    Returns {'baseline', 'points', 'updated'}, or None when the target
+    has no 7-day data yet.
+    """
+    result = calculate_baseline(db, target_id)
+    if result is None:
+        logger.warning(f"No 7-day data found for target {target_id} - cannot calculate baseline")
+        return None
+
+    result["updated"] = store_baseline(db, target_id, result["baseline"])
+    if commit:
+        db.commit()
+
+    logger.info(f"📊 Normalized target {target_id}: baseline {result['baseline']:.2f} "
+                f"(from {result['points']} 7-day points), {result['updated']} points updated")
+    return result
+
+
+_recalculation = {
+    "running": False,
+    "started_at": None,
+    "finished_at": None,
+    "targets": 0,
+    "unchanged": 0,
+    "to_renormalize": 0,
+    "renormalized": 0,
+    "points_updated": 0,
+    "failed": 0,
+    "errors": [],
+}
+_recalculation_lock = threading.Lock()
+
+
+def _progress(**changes):
+    with _recalculation_lock:
+        _recalculation.update(changes)
+
+
+def get_recalculation_status() -> Dict:
+    with _recalculation_lock:
+        status = dict(_recalculation, errors=list(_recalculation["errors"]))
+    for key in ("started_at", "finished_at"):
+        if status[key]:
+            status[key] = status[key].isoformat()
+    done = status["renormalized"] + status["failed"]
+    status["percent"] = round(100 * done / status["to_renormalize"], 1) if status["to_renormalize"] else (
+        100.0 if status["finished_at"] else 0.0)
+    return status
+
+
+def compute_baselines(db: Session) -> List[Tuple[int, Optional[float], float]]:
+    """(target_id, stored baseline, current 7-day average) for every active target with 7-day data"""
+    rows = db.query(
+        AttentionTarget.id,
+        AttentionTarget.normalization_baseline,
+        func.avg(AttentionHistory.attention_score)
+    ).join(
+        AttentionHistory, AttentionHistory.target_id == AttentionTarget.id
+    ).filter(
+        AttentionTarget.is_active == True,
+        AttentionHistory.timeframe_used.in_(BASELINE_TIMEFRAMES)
+    ).group_by(AttentionTarget.id, AttentionTarget.normalization_baseline).all()
+    return [(target_id, None if stored is None else float(stored), round(float(average), 2))
+            for target_id, stored, average in rows]
+
+
+def _renormalize(target_id: int, baseline: float) -> int:
+    db = SessionLocal()
+    try:
+        updated = store_baseline(db, target_id, baseline)
+        db.commit()
+        return updated
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+
+def recalculate_baselines(threshold: float = BASELINE_CHANGE_THRESHOLD, workers: int = BASELINE_WORKERS) -> Dict:
+    """
+    Recalculate every active target's baseline and renormalize the ones
+    that moved by more than `threshold`. Blocking; returns the final status.
+    """
+    with _recalculation_lock:
+        already_running = _recalculation["running"]
+        if not already_running:
+            _recalculation.update(running=True, started_at=datetime.now(timezone.utc), finished_at=None, targets=0,
+                                  unchanged=0, to_renormalize=0, renormalized=0, points_updated=0, failed=0, errors=[])
+    if already_running:
+        logger.warning("Baseline recalculation already running")
+        return get_recalculation_status()
+
+    try:
+        db = SessionLocal()
+        try:
+            baselines = compute_baselines(db)
+            moved = [(target_id, baseline) for target_id, stored, baseline in baselines
+                     if stored is None or abs(baseline - stored) > threshold]
+            unchanged = [target_id for target_id, stored, baseline in baselines
+                         if stored is not None and abs(baseline - stored) <= threshold]
+            # Checked and still accurate: only the check time moves
+            if unchanged:
+                db.query(AttentionTarget).filter(AttentionTarget.id.in_(unchanged)).update(
+                    {AttentionTarget.baseline_calculated_at: datetime.now(timezone.utc)},
+                    synchronize_session=False
+                )
+            db.commit()
+        finally:
+            db.close()
+
+        _progress(targets=len(baselines), unchanged=len(unchanged), to_renormalize=len(moved))
+        logger.info(f"🔄 Baselines: {len(baselines)} targets checked, {len(moved)} moved more than {threshold} points")
+
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="baseline") as pool:
+            futures = {pool.submit(_renormalize, target_id, baseline): target_id for target_id, baseline in moved}
+            for future in as_completed(futures):
+                target_id = futures[future]
+                try:
+                    updated = future.result()
+                    with _recalculation_lock:
+                        _recalculation["renormalized"] += 1
+                        _recalculation["points_updated"] += updated
+                except Exception as e:
+                    logger.error(f"Failed to recalculate baseline for target {target_id}: {e}")
+                    with _recalculation_lock:
+                        _recalculation["failed"] += 1
+                        if len(_recalculation["errors"]) < MAX_REPORTED_ERRORS:
+                            _recalculation["errors"].append({"target_id": target_id, "error": str(e)})
+    finally:
+        _progress(running=False, finished_at=datetime.now(timezone.utc))
+
+    status = get_recalculation_status()
+    logger.info(f"✅ Baseline recalculation complete: {status['renormalized']}/{status['targets']} targets "
+                f"renormalized, {status['failed']} failed")
+    return status
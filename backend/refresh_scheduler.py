@@ -0,0 +1,237 @@
+"""
+Priority-driven refresh scheduler for TrendBet attention targets
+
+Instead of refreshing every active target on one fixed loop, each target
+gets its own refresh interval from how much it matters right now:
+
+- open stake in portfolios on the target
+- WebSocket clients watching its chart
+- recent volatility of its attention score (realtime points only)
+
+The busiest targets refresh every TRENDS_REFRESH_MIN_INTERVAL seconds;
+targets nobody holds or watches drift out to TRENDS_REFRESH_MAX_INTERVAL.
+Targets sit in a heap ordered by when they are next due, and every tick
+the scheduler pops as many due targets as the Trends request budget
+allows. Under overload everything slips, but short-interval targets get
+back into the queue sooner, so they keep the larger share of requests.
+"""
+
+import heapq
+import logging
+import math
+import os
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import func
+
+from database import SessionLocal
+from models import AttentionHistory, AttentionTarget, Portfolio
+
+logger = logging.getLogger(__name__)
+
+TRENDS_REFRESH_MIN_INTERVAL = int(os.getenv('TRENDS_REFRESH_MIN_INTERVAL', '120'))
+TRENDS_REFRESH_MAX_INTERVAL = int(os.getenv('TRENDS_REFRESH_MAX_INTERVAL', '1800'))
+
+# Importance weights: each term adds to a base importance of 1, and the
+# refresh interval is MAX_INTERVAL / importance (clamped to MIN_INTERVAL)
+STAKE_WEIGHT = 1.0          # Per log-unit of open stake (log1p(stake / STAKE_SCALE))
+STAKE_SCALE = 100.0
+SUBSCRIBER_WEIGHT = 2.0     # Per watching WebSocket client, capped below
+MAX_SUBSCRIBER_BOOST = 10.0
+VOLATILITY_WEIGHT = 0.25    # Per point of score standard deviation
+VOLATILITY_WINDOW = timedelta(hours=24)
+# Volatility is measured on one series only (timeframes have different
+# scales) and recomputed at most this often; stakes and targets every reload
+VOLATILITY_SOURCE = "google_trends_realtime"
+VOLATILITY_CACHE_SECONDS = 300
+
+RETRY_AFTER_FAILURE = TRENDS_REFRESH_MIN_INTERVAL  # Failed targets wait at least this long
+
+
+def _as_utc(value: Optional[datetime]) -> Optional[datetime]:
+    if value is not None and value.tzinfo is None:
+        return value.replace(tzinfo=timezone.utc)
+    return value
+
+
+class TargetSchedule:
+    """Scheduling state and refresh-interval stats for one target"""
+
+    __slots__ = ('target_id', 'name', 'stake', 'subscribers', 'volatility', 'interval',
+                 'last_updated', 'last_attempt', 'refreshes', 'failures', 'mean_interval')
+
+    def __init__(self, target_id: int, name: str):
+        self.target_id = target_id
+        self.name = name
+        self.stake = 0.0
+        self.subscribers = 0
+        self.volatility = 0.0
+        self.interval = float(TRENDS_REFRESH_MAX_INTERVAL)
+        self.last_updated = 0.0       # Epoch seconds of the last stored update
+        self.last_attempt = 0.0       # Epoch seconds the scheduler last dispatched it
+        self.refreshes = 0
+        self.failures = 0
+        self.mean_interval: Optional[float] = None  # Moving average of observed refresh gaps
+
+    @property
+    def importance(self) -> float:
+        return (1.0
+                + STAKE_WEIGHT * math.log1p(self.stake / STAKE_SCALE)
+                + min(SUBSCRIBER_WEIGHT * self.subscribers, MAX_SUBSCRIBER_BOOST)
+                + VOLATILITY_WEIGHT * self.volatility)
+
+    @property
+    def due_at(self) -> float:
+        return max(self.last_updated + self.interval, self.last_attempt + RETRY_AFTER_FAILURE)
+
+    def observe_update(self, updated_at: float):
+        """Record a newly stored update time and fold the gap into the stats"""
+        if updated_at <= self.last_updated:
+            return
+        if self.last_updated:
+            gap = updated_at - self.last_updated
+            self.mean_interval = gap if self.mean_interval is None else 0.8 * self.mean_interval + 0.2 * gap
+            self.refreshes += 1
+        self.last_updated = updated_at
+
+    def to_dict(self, now: float) -> Dict:
+        return {
+            "target_id": self.target_id,
+            "name": self.name,
+            "importance": round(self.importance, 2),
+            "stake": round(self.stake, 2),
+            "subscribers": self.subscribers,
+            "volatility": round(self.volatility, 2),
+            "target_interval_seconds": round(self.interval),
+            "observed_interval_seconds": round(self.mean_interval) if self.mean_interval else None,
+            "seconds_since_update": round(now - self.last_updated) if self.last_updated else None,
+            "due_in_seconds": round(self.due_at - now),
+            "refreshes": self.refreshes,
+            "failures": self.failures,
+        }
+
+
+class RefreshScheduler:
+    """
+    Heap of active targets keyed by next due time.
+
+    Usage:
+        scheduler = RefreshScheduler(websocket_manager=manager)
+        await asyncio.to_thread(scheduler.reload)
+        target_ids = scheduler.next_due(budget)
+        ... fetch them ...
+        await asyncio.to_thread(scheduler.reload)   # Picks up the stored updates
+    """
+
+    def __init__(self, websocket_manager=None, min_interval: int = TRENDS_REFRESH_MIN_INTERVAL,
+                 max_interval: int = TRENDS_REFRESH_MAX_INTERVAL):
+        self.websocket_manager = websocket_manager
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.targets: Dict[int, TargetSchedule] = {}
+        self._heap: List[Tuple[float, int]] = []
+        self._volatility: Dict[int, float] = {}
+        self._volatility_loaded = 0.0
+
+    def _load_volatility(self, db) -> Dict[int, float]:
+        """Per-target stddev of the realtime series, cached for VOLATILITY_CACHE_SECONDS"""
+        now = time.monotonic()
+        if self._volatility_loaded and now - self._volatility_loaded < VOLATILITY_CACHE_SECONDS:
+            return self._volatility
+        since = datetime.now(timezone.utc) - VOLATILITY_WINDOW
+        self._volatility = {target_id: float(stddev or 0) for target_id, stddev in db.query(
+            AttentionHistory.target_id, func.stddev_samp(AttentionHistory.attention_score)
+        ).filter(
+            AttentionHistory.data_source == VOLATILITY_SOURCE,
+            AttentionHistory.timestamp >= since
+        ).group_by(AttentionHistory.target_id).all()}
+        self._volatility_loaded = now
+        return self._volatility
+
+    def _load_signals(self) -> Tuple[list, Dict[int, float], Dict[int, float]]:
+        db = SessionLocal()
+        try:
+            targets = db.query(
+                AttentionTarget.id, AttentionTarget.name, AttentionTarget.last_updated
+            ).filter(AttentionTarget.is_active == True).all()
+
+            stakes = dict(db.query(
+                Portfolio.target_id, func.sum(func.abs(Portfolio.attention_stakes))
+            ).filter(Portfolio.attention_stakes != 0).group_by(Portfolio.target_id).all())
+
+            return targets, stakes, self._load_volatility(db)
+        finally:
+            db.close()
+
+    def _subscriber_counts(self) -> Dict[int, int]:
+        subscribers = getattr(self.websocket_manager, 'target_subscribers', None) or {}
+        return {target_id: len(connections) for target_id, connections in list(subscribers.items())}
+
+    def reload(self):
+        """Refresh every target's signals and rebuild the heap (blocking; run in a thread)"""
+        targets, stakes, volatility = self._load_signals()
+        subscribers = self._subscriber_counts()
+
+        active = {}
+        for target_id, name, last_updated in targets:
+            schedule = self.targets.get(target_id) or TargetSchedule(target_id, name)
+            schedule.name = name
+            last_updated = _as_utc(last_updated)
+            if last_updated:
+                schedule.observe_update(last_updated.timestamp())
+            schedule.stake = float(stakes.get(target_id) or 0)
+            schedule.subscribers = subscribers.get(target_id, 0)
+            schedule.volatility = float(volatility.get(target_id) or 0)
+            schedule.interval = min(self.max_interval, max(self.min_interval, self.max_interval / schedule.importance))
+            active[target_id] = schedule
+        self.targets = active
+
+        self._heap = [(schedule.due_at, target_id) for target_id, schedule in active.items()]
+        heapq.heapify(self._heap)
+
+    def next_due(self, budget: int) -> List[int]:
+        """Pop up to `budget` targets that are due, most overdue first"""
+        now = time.time()
+        chosen = []
+        while self._heap and len(chosen) < budget:
+            due_at, target_id = self._heap[0]
+            schedule = self.targets.get(target_id)
+            if schedule is None or due_at != schedule.due_at:
+                heapq.heappop(self._heap)  # Stale entry
+                continue
+            if due_at > now:
+                break
+            heapq.heappop(self._heap)
+            schedule.last_attempt = now
+            heapq.heappush(self._heap, (schedule.due_at, target_id))
+            chosen.append(target_id)
+        return chosen
+
+    def record_results(self, target_ids: List[int]):
+        """Count dispatched targets whose last_updated did not move as failures"""
+        for target_id in target_ids:
+            schedule = self.targets.get(target_id)
+            if schedule and schedule.last_updated < schedule.last_attempt:
+                schedule.failures += 1
+
+    def seconds_until_next(self) -> Optional[float]:
+        while self._heap:
+            due_at, target_id = self._heap[0]
+            schedule = self.targets.get(target_id)
+            if schedule is not None and due_at == schedule.due_at:
+                return max(0.0, due_at - time.time())
+            heapq.heappop(self._heap)
+        return None
+
+    def status(self, limit: int = 50) -> Dict:
+        now = time.time()
+        schedules = sorted(self.targets.values(), key=lambda s: s.importance, reverse=True)
+        return {
+            "targets": len(self.targets),
+            "due": sum(1 for s in self.targets.values() if s.due_at <= now),
+            "min_interval_seconds": self.min_interval,
+            "max_interval_seconds": self.max_interval,
+            "schedule": [schedule.to_dict(now) for schedule in schedules[:limit]],
+        }
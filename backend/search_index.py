@@ -0,0 +1,546 @@
+"""
+Search indexes for the CSV catalogs
+
+Built once per category when the CSV data is loaded so autocomplete
+never has to scan a whole category on each keystroke. Every index is
+kept in flat NumPy arrays so it can be written to, and memory-mapped
+from, the binary catalog snapshot (see catalog_snapshot.py).
+"""
+
+import bisect
+import difflib
+import heapq
+import re
+from collections.abc import Sequence
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+MIN_QUERY_LENGTH = 2
+
+# Prefixes up to this length get their first matches precomputed, since
+# short prefixes are the ones that match thousands of rows.
+PREFIX_HEAD_LENGTH = 3
+PREFIX_HEAD_SIZE = 50  # Largest limit the autocomplete endpoints accept
+
+# Sorts after any character that can appear in a name
+_PREFIX_SENTINEL = chr(0x10FFFF)
+
+# Fuzzy matching thresholds
+MIN_FUZZY_WORD_LENGTH = 3   # Shorter query words only match exactly or by prefix
+MIN_SIMILARITY = 0.6        # Lowest similarity score returned as a match
+MAX_FUZZY_WORDS = 100       # Candidate spellings scored per query word
+
+# Match tiers, best first
+TIER_PREFIX = 0
+TIER_EXACT_TOKEN = 1
+TIER_SIMILAR = 2
+
+# Similarity given to token matches that are not exact
+TOKEN_PREFIX_SIMILARITY = 0.9
+TOKEN_CONTAINS_SIMILARITY = 0.8
+FUZZY_MAX_SIMILARITY = 0.79  # Misspellings always rank below real substrings
+
+# Characters are hashed into this many buckets for the edit distance prefilter
+CHAR_BUCKETS = 32
+
+# Posting lists are converted to Python ints in chunks of this size
+_SCAN_CHUNK = 256
+
+_WORD_RE = re.compile(r"\w+")
+
+
+def _bigrams(text: str) -> set:
+    """Return the set of 2-character substrings of text"""
+    return {text[i:i + 2] for i in range(len(text) - 1)}
+
+
+def _words(text: str) -> List[str]:
+    """Split lowercase text into word tokens"""
+    return _WORD_RE.findall(text)
+
+
+def _char_histogram(word: str) -> np.ndarray:
+    """Character counts of word, hashed into CHAR_BUCKETS buckets"""
+    histogram = np.zeros(CHAR_BUCKETS, dtype=np.int16)
+    for char in word:
+        histogram[ord(char) % CHAR_BUCKETS] += 1
+    return histogram
+
+
+def _trigrams(word: str) -> set:
+    """Return the padded trigrams of a single word (pg_trgm style)"""
+    padded = f"  {word} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def _to_csr(lists: Sequence) -> Tuple[np.ndarray, np.ndarray]:
+    """Pack a list of id lists into offsets + flat id arrays"""
+    offsets = np.zeros(len(lists) + 1, dtype=np.int64)
+    np.cumsum([len(ids) for ids in lists], out=offsets[1:])
+    flat = np.fromiter((i for ids in lists for i in ids), dtype=np.uint32, count=int(offsets[-1]))
+    return offsets, flat
+
+
+class StringColumn(Sequence):
+    """
+    Immutable array of strings stored as one UTF-8 blob plus offsets.
+
+    Strings are decoded on access, so a column backed by a memory-mapped
+    snapshot costs no private memory until it is read.
+    """
+
+    __slots__ = ('blob', 'offsets')
+
+    def __init__(self, blob: np.ndarray, offsets: np.ndarray):
+        self.blob = blob
+        self.offsets = offsets
+
+    @classmethod
+    def from_strings(cls, strings: Iterable[str]) -> "StringColumn":
+        encoded = [s.encode('utf-8') for s in strings]
+        offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+        np.cumsum([len(b) for b in encoded], out=offsets[1:])
+        return cls(np.frombuffer(b''.join(encoded), dtype=np.uint8), offsets)
+
+    def __len__(self) -> int:
+        return len(self.offsets) - 1
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("StringColumn index out of range")
+        return str(self.blob[self.offsets[index]:self.offsets[index + 1]], 'utf-8')
+
+    def find(self, key: str) -> int:
+        """Position of key in a sorted column, or -1"""
+        position = bisect.bisect_left(self, key)
+        if position < len(self) and self[position] == key:
+            return position
+        return -1
+
+    def to_arrays(self, prefix: str) -> Dict[str, np.ndarray]:
+        return {f"{prefix}/blob": self.blob, f"{prefix}/offsets": self.offsets}
+
+    @classmethod
+    def from_arrays(cls, arrays: Dict[str, np.ndarray], prefix: str) -> "StringColumn":
+        return cls(arrays[f"{prefix}/blob"], arrays[f"{prefix}/offsets"])
+
+
+class PostingIndex:
+    """Sorted string keys mapped to ascending id lists, stored as CSR arrays"""
+
+    __slots__ = ('keys', 'offsets', 'ids')
+
+    def __init__(self, keys: StringColumn, offsets: np.ndarray, ids: np.ndarray):
+        self.keys = keys
+        self.offsets = offsets
+        self.ids = ids
+
+    @classmethod
+    def build(cls, postings: Dict[str, List[int]]) -> "PostingIndex":
+        keys = sorted(postings)
+        offsets, ids = _to_csr([postings[key] for key in keys])
+        return cls(StringColumn.from_strings(keys), offsets, ids)
+
+    def __len__(self) -> int:
+        return len(self.keys)
+
+    def get(self, key: str) -> Optional[np.ndarray]:
+        """Ascending ids stored under key, or None"""
+        position = self.keys.find(key)
+        if position < 0:
+            return None
+        return self.ids[self.offsets[position]:self.offsets[position + 1]]
+
+    def to_arrays(self, prefix: str) -> Dict[str, np.ndarray]:
+        arrays = self.keys.to_arrays(f"{prefix}/keys")
+        arrays.update({f"{prefix}/offsets": self.offsets, f"{prefix}/ids": self.ids})
+        return arrays
+
+    @classmethod
+    def from_arrays(cls, arrays: Dict[str, np.ndarray], prefix: str) -> "PostingIndex":
+        return cls(
+            StringColumn.from_arrays(arrays, f"{prefix}/keys"),
+            arrays[f"{prefix}/offsets"],
+            arrays[f"{prefix}/ids"],
+        )
+
+
+class _SortedView(Sequence):
+    """Read-only view of a StringColumn in the order given by `order`, for bisect"""
+
+    __slots__ = ('strings', 'order')
+
+    def __init__(self, strings: StringColumn, order: np.ndarray):
+        self.strings = strings
+        self.order = order
+
+    def __len__(self) -> int:
+        return len(self.order)
+
+    def __getitem__(self, index: int) -> str:
+        return self.strings[int(self.order[index])]
+
+
+class CategoryIndex:
+    """
+    Prefix and substring index over the names of one category.
+
+    Row ids are positions in the category's CSV order, so results can be
+    returned in exactly the order a linear scan would produce.
+    """
+
+    def __init__(self, names_lower: StringColumn, sorted_ids: np.ndarray,
+                 prefix_heads: PostingIndex, bigram_postings: PostingIndex):
+        self.names_lower = names_lower
+        self.sorted_ids = sorted_ids
+        self.sorted_names = _SortedView(names_lower, sorted_ids)
+        self.prefix_heads = prefix_heads
+        self.bigram_postings = bigram_postings
+
+    @classmethod
+    def build(cls, names: Sequence) -> "CategoryIndex":
+        names_lower = [name.lower() for name in names]
+        order = sorted(range(len(names_lower)), key=names_lower.__getitem__)
+        return cls(
+            StringColumn.from_strings(names_lower),
+            np.array(order, dtype=np.uint32),
+            PostingIndex.build(cls._build_prefix_heads(names_lower)),
+            PostingIndex.build(cls._build_bigram_postings(names_lower)),
+        )
+
+    @staticmethod
+    def _build_prefix_heads(names_lower: List[str]) -> Dict[str, List[int]]:
+        """Map each short prefix to the first PREFIX_HEAD_SIZE row ids that start with it"""
+        heads: Dict[str, List[int]] = {}
+        for row_id, name in enumerate(names_lower):
+            for length in range(MIN_QUERY_LENGTH, min(len(name), PREFIX_HEAD_LENGTH) + 1):
+                head = heads.setdefault(name[:length], [])
+                if len(head) < PREFIX_HEAD_SIZE:
+                    head.append(row_id)
+        return heads
+
+    @staticmethod
+    def _build_bigram_postings(names_lower: List[str]) -> Dict[str, List[int]]:
+        """Map each bigram to the ascending row ids whose name contains it"""
+        postings: Dict[str, List[int]] = {}
+        for row_id, name in enumerate(names_lower):
+            for bigram in _bigrams(name):
+                postings.setdefault(bigram, []).append(row_id)
+        return postings
+
+    def to_arrays(self, prefix: str) -> Dict[str, np.ndarray]:
+        arrays = self.names_lower.to_arrays(f"{prefix}/names_lower")
+        arrays[f"{prefix}/sorted_ids"] = self.sorted_ids
+        arrays.update(self.prefix_heads.to_arrays(f"{prefix}/prefix_heads"))
+        arrays.update(self.bigram_postings.to_arrays(f"{prefix}/bigrams"))
+        return arrays
+
+    @classmethod
+    def from_arrays(cls, arrays: Dict[str, np.ndarray], prefix: str) -> "CategoryIndex":
+        return cls(
+            StringColumn.from_arrays(arrays, f"{prefix}/names_lower"),
+            arrays[f"{prefix}/sorted_ids"],
+            PostingIndex.from_arrays(arrays, f"{prefix}/prefix_heads"),
+            PostingIndex.from_arrays(arrays, f"{prefix}/bigrams"),
+        )
+
+    def __len__(self) -> int:
+        return len(self.names_lower)
+
+    def prefix_range(self, query_lower: str) -> range:
+        """Return the slice of sorted_ids whose names start with query_lower"""
+        lo = bisect.bisect_left(self.sorted_names, query_lower)
+        hi = bisect.bisect_right(self.sorted_names, query_lower + _PREFIX_SENTINEL, lo)
+        return range(lo, hi)
+
+    def prefix_ids(self, query_lower: str, limit: int) -> List[int]:
+        """First `limit` row ids (in CSV order) whose name starts with query_lower"""
+        if len(query_lower) <= PREFIX_HEAD_LENGTH and limit <= PREFIX_HEAD_SIZE:
+            head = self.prefix_heads.get(query_lower)
+            return head[:limit].tolist() if head is not None else []
+
+        span = self.prefix_range(query_lower)
+        ids = self.sorted_ids[span.start:span.stop]
+        if len(ids) > limit:
+            ids = np.partition(ids, limit - 1)[:limit]
+        return sorted(ids.tolist())
+
+    def contains_ids(self, query_lower: str, limit: int) -> List[int]:
+        """First `limit` row ids (in CSV order) containing query_lower but not starting with it"""
+        postings = [self.bigram_postings.get(bigram) for bigram in _bigrams(query_lower)]
+        if not postings or any(posting is None for posting in postings):
+            return []
+
+        # Walk the rarest bigram's postings and verify each candidate
+        rarest = min(postings, key=len)
+        names_lower = self.names_lower
+        matches = []
+        for chunk_start in range(0, len(rarest), _SCAN_CHUNK):
+            for row_id in rarest[chunk_start:chunk_start + _SCAN_CHUNK].tolist():
+                name = names_lower[row_id]
+                if query_lower in name and not name.startswith(query_lower):
+                    matches.append(row_id)
+                    if len(matches) >= limit:
+                        return matches
+        return matches
+
+    def search(self, query_lower: str, limit: int) -> List[int]:
+        """
+        Row ids matching query_lower, prefix hits first, then substring hits.
+
+        Matches the ordering of a two-pass linear scan over the CSV rows.
+        """
+        if len(query_lower) < MIN_QUERY_LENGTH or limit <= 0:
+            return []
+
+        matches = self.prefix_ids(query_lower, limit)
+        if len(matches) < limit:
+            matches.extend(self.contains_ids(query_lower, limit - len(matches)))
+        return matches
+
+
+class FuzzyIndex:
+    """
+    Typo-tolerant search across every category at once.
+
+    Names are split into words. Query words are matched against the sorted
+    vocabulary of unique words (exact, token prefix, substring, or a close
+    spelling found through a trigram index), and a word-to-name posting
+    list maps those words back to catalog rows. Matches are ranked by tier
+    (whole-name prefix, exact token, similarity) and merged across
+    categories with a heap, so a query is one index lookup rather than a
+    scan per category.
+    """
+
+    def __init__(self, category_indexes: Dict[str, CategoryIndex], category_offsets: np.ndarray,
+                 vocabulary: StringColumn, word_name_offsets: np.ndarray, word_name_ids: np.ndarray,
+                 word_lengths: np.ndarray, word_histograms: np.ndarray, trigram_postings: PostingIndex):
+        self.category_indexes = category_indexes
+        self.categories = list(category_indexes)
+        self.category_offsets = category_offsets  # Global name ids: categories back to back
+        self.vocabulary = vocabulary              # Sorted, so a word id is also its sort position
+        self.word_name_offsets = word_name_offsets
+        self.word_name_ids = word_name_ids
+        self.word_lengths = word_lengths
+        self.word_histograms = word_histograms
+        self.trigram_postings = trigram_postings
+
+    @classmethod
+    def build(cls, category_indexes: Dict[str, CategoryIndex]) -> "FuzzyIndex":
+        category_offsets = np.zeros(len(category_indexes) + 1, dtype=np.int64)
+        np.cumsum([len(index) for index in category_indexes.values()], out=category_offsets[1:])
+
+        word_names: Dict[str, List[int]] = {}
+        global_id = 0
+        for index in category_indexes.values():
+            for name in index.names_lower:
+                for word in set(_words(name)):
+                    word_names.setdefault(word, []).append(global_id)
+                global_id += 1
+
+        vocabulary = sorted(word_names)
+        word_name_offsets, word_name_ids = _to_csr([word_names[word] for word in vocabulary])
+
+        word_histograms = np.zeros((len(vocabulary), CHAR_BUCKETS), dtype=np.uint8)
+        trigram_words: Dict[str, List[int]] = {}
+        for word_id, word in enumerate(vocabulary):
+            word_histograms[word_id] = _char_histogram(word)
+            for trigram in _trigrams(word):
+                trigram_words.setdefault(trigram, []).append(word_id)
+
+        return cls(
+            category_indexes,
+            category_offsets,
+            StringColumn.from_strings(vocabulary),
+            word_name_offsets,
+            word_name_ids,
+            np.array([len(word) for word in vocabulary], dtype=np.int16),
+            word_histograms,
+            PostingIndex.build(trigram_words),
+        )
+
+    def to_arrays(self, prefix: str) -> Dict[str, np.ndarray]:
+        arrays = self.vocabulary.to_arrays(f"{prefix}/vocabulary")
+        arrays.update({
+            f"{prefix}/category_offsets": self.category_offsets,
+            f"{prefix}/word_name_offsets": self.word_name_offsets,
+            f"{prefix}/word_name_ids": self.word_name_ids,
+            f"{prefix}/word_lengths": self.word_lengths,
+            f"{prefix}/word_histograms": self.word_histograms,
+        })
+        arrays.update(self.trigram_postings.to_arrays(f"{prefix}/trigrams"))
+        return arrays
+
+    @classmethod
+    def from_arrays(cls, arrays: Dict[str, np.ndarray], prefix: str,
+                    category_indexes: Dict[str, CategoryIndex]) -> "FuzzyIndex":
+        return cls(
+            category_indexes,
+            arrays[f"{prefix}/category_offsets"],
+            StringColumn.from_arrays(arrays, f"{prefix}/vocabulary"),
+            arrays[f"{prefix}/word_name_offsets"],
+            arrays[f"{prefix}/word_name_ids"],
+            arrays[f"{prefix}/word_lengths"],
+            arrays[f"{prefix}/word_histograms"],
+            PostingIndex.from_arrays(arrays, f"{prefix}/trigrams"),
+        )
+
+    @property
+    def name_count(self) -> int:
+        return int(self.category_offsets[-1])
+
+    def _trigram_postings(self, trigram: str) -> np.ndarray:
+        """Ascending vocabulary word ids containing the trigram"""
+        postings = self.trigram_postings.get(trigram)
+        return postings if postings is not None else np.empty(0, dtype=np.uint32)
+
+    def similar_words(self, query_word: str) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Vocabulary words resembling query_word.
+
+        Returns parallel arrays of word ids and 0-1 similarities: 1.0 for the
+        exact word, then token prefix, substring, and close spellings.
+        """
+        word_ids = []
+        similarities = []
+
+        exact_id = self.vocabulary.find(query_word)
+        if exact_id >= 0:
+            word_ids.append(np.array([exact_id], dtype=np.uint32))
+            similarities.append(1.0)
+
+        lo = bisect.bisect_right(self.vocabulary, query_word)
+        hi = bisect.bisect_right(self.vocabulary, query_word + _PREFIX_SENTINEL, lo)
+        prefix_ids = np.arange(lo, hi, dtype=np.uint32)
+        word_ids.append(prefix_ids)
+        similarities.append(TOKEN_PREFIX_SIMILARITY)
+
+        length = len(query_word)
+        if length >= MIN_FUZZY_WORD_LENGTH:
+            seen = set(prefix_ids.tolist())
+            if exact_id >= 0:
+                seen.add(exact_id)
+
+            # Substring matches hold every unpadded trigram of the query word
+            inner = sorted((self._trigram_postings(query_word[i:i + 3]) for i in range(length - 2)), key=len)
+            contained = inner[0]
+            for postings in inner[1:]:
+                contained = np.intersect1d(contained, postings, assume_unique=True)
+            contains_ids = [w for w in contained.tolist() if w not in seen and query_word in self.vocabulary[w]]
+            seen.update(contains_ids)
+            word_ids.append(np.array(contains_ids, dtype=np.uint32))
+            similarities.append(TOKEN_CONTAINS_SIMILARITY)
+
+            # Only look for misspellings when the word itself is not in the catalog
+            if not seen:
+                typo_ids, typo_sims = self._close_spellings(query_word)
+                word_ids.append(typo_ids)
+                similarities.append(typo_sims)
+
+        sims = [np.broadcast_to(np.float32(sim), ids.shape) if np.isscalar(sim) else sim
+                for ids, sim in zip(word_ids, similarities)]
+        return np.concatenate(word_ids), np.concatenate(sims).astype(np.float32)
+
+    def _close_spellings(self, query_word: str) -> Tuple[np.ndarray, np.ndarray]:
+        """Words within a small edit distance of query_word, scored by difflib ratio"""
+        postings = [self._trigram_postings(t) for t in _trigrams(query_word)]
+        postings = [p for p in postings if len(p)]
+        if not postings:
+            return np.empty(0, dtype=np.uint32), np.empty(0, dtype=np.float32)
+
+        # Cheap vectorized filters first: shared trigram, similar length, and a
+        # character histogram distance that is a lower bound on edit distance
+        candidates = np.unique(np.concatenate(postings))
+        length = len(query_word)
+        max_edits = 1 if length <= 5 else 2
+        candidates = candidates[np.abs(self.word_lengths[candidates] - length) <= max_edits]
+        distance = np.abs(
+            self.word_histograms[candidates].astype(np.int16) - _char_histogram(query_word)
+        ).sum(axis=1)
+        close = distance <= 2 * max_edits
+        candidates = candidates[close][np.argsort(distance[close], kind='stable')][:MAX_FUZZY_WORDS]
+
+        # SequenceMatcher caches its analysis of seq2, so keep the query there
+        matcher = difflib.SequenceMatcher(None)
+        matcher.set_seq2(query_word)
+        ids = []
+        sims = []
+        for word_id in candidates.tolist():
+            matcher.set_seq1(self.vocabulary[word_id])
+            if matcher.quick_ratio() < MIN_SIMILARITY:
+                continue
+            ratio = matcher.ratio()
+            if ratio >= MIN_SIMILARITY:
+                ids.append(word_id)
+                sims.append(min(ratio, FUZZY_MAX_SIMILARITY))
+        return np.array(ids, dtype=np.uint32), np.array(sims, dtype=np.float32)
+
+    def _names_with_words(self, word_ids: np.ndarray) -> np.ndarray:
+        """Concatenated global name ids of every word in word_ids"""
+        starts = self.word_name_offsets[word_ids]
+        lengths = self.word_name_offsets[word_ids + 1] - starts
+        total = int(lengths.sum())
+        if not total:
+            return np.empty(0, dtype=np.uint32)
+        # Offset of each posting slot within its word's run, added to its start
+        run_starts = np.repeat(np.cumsum(lengths) - lengths, lengths)
+        return self.word_name_ids[np.repeat(starts, lengths) + np.arange(total) - run_starts]
+
+    def _name_scores(self, query_words: List[str]) -> np.ndarray:
+        """Score every name by the mean best similarity of each query word"""
+        total = np.zeros(self.name_count, dtype=np.float32)
+        for query_word in query_words:
+            word_ids, sims = self.similar_words(query_word)
+            best = np.zeros(self.name_count, dtype=np.float32)
+            # Assign in ascending similarity so each name keeps its best word
+            for level in np.unique(sims).tolist():
+                best[self._names_with_words(word_ids[sims == level].astype(np.int64))] = level
+            total += best
+        return total / len(query_words)
+
+    def search(self, query_lower: str, limit: int, per_category_limit: int) -> List[Tuple[str, int, int, float]]:
+        """
+        Ranked matches across all categories.
+
+        Returns up to `limit` (category, row_id, tier, similarity) tuples, best
+        first, with at most `per_category_limit` from any one category.
+        """
+        query_lower = query_lower.strip()
+        if len(query_lower) < MIN_QUERY_LENGTH or limit <= 0:
+            return []
+
+        query_words = _words(query_lower)
+        scores = self._name_scores(query_words) if query_words else np.zeros(self.name_count, dtype=np.float32)
+        matched = np.flatnonzero(scores >= MIN_SIMILARITY)
+        bounds = np.searchsorted(matched, self.category_offsets)
+
+        ranked = []
+        for position, category in enumerate(self.categories):
+            # Whole-name prefix hits outrank any token match
+            prefix_rows = self.category_indexes[category].prefix_ids(query_lower, per_category_limit)
+            scored = [(TIER_PREFIX, -1.0, row_id, position) for row_id in prefix_rows]
+
+            ids = matched[bounds[position]:bounds[position + 1]]
+            if len(scored) < per_category_limit and len(ids):
+                # Best scores first, CSV order within equal scores
+                best = ids[np.lexsort((ids, -scores[ids]))][:per_category_limit + len(prefix_rows)]
+                seen = set(prefix_rows)
+                offset = int(self.category_offsets[position])
+                for global_id in best.tolist():
+                    row_id = global_id - offset
+                    if row_id in seen:
+                        continue
+                    score = float(scores[global_id])
+                    tier = TIER_EXACT_TOKEN if score == 1.0 else TIER_SIMILAR
+                    scored.append((tier, -score, row_id, position))
+            ranked.append(sorted(scored)[:per_category_limit])
+
+        return [
+            (self.categories[position], row_id, tier, -negative_score)
+            for tier, negative_score, row_id, position in heapq.merge(*ranked)
+        ][:limit]
@@ -20,9 +20,13 @@ import asyncio
 import logging
 from datetime import datetime, timezone
 from decimal import Decimal
+from typing import Dict, Optional
 from database import SessionLocal
 from models import AttentionTarget, AttentionHistory, TargetType
 from google_trends_service import GoogleTrendsService
+from history_store import upsert_history_points
+from normalization import normalize_timeline
+from trends_rate_limiter import Priority
 import os
 import sys
 
@@ -147,16 +151,22 @@ async def store_timeframe_data_with_real_timestamps(
     timeframe_name: str,
     timeframe_code: str,
     db: SessionLocal
-) -> None:
+) -> Optional[Dict[str, int]]:
     """
     Store historical attention data using real Google Trends timestamps.
 
+    Points are upserted on (target, source, timestamp), so re-fetching an
+    overlapping window only writes what is new or changed.
+
     Args:
         target: The attention target to store data for
         data: Google Trends response containing timeline data
         timeframe_name: Human-readable timeframe (e.g., '1d', '7d')
         timeframe_code: Google Trends timeframe code (e.g., 'now 1-d')
         db: Database session for data persistence
+
+    Returns:
+        Inserted/updated/skipped point counts, or None if nothing was stored
     """
     try:
         timeline_values = data.get('timeline', [])
@@ -173,10 +183,18 @@ async def store_timeframe_data_with_real_timestamps(
         
         logger.info(f"Storing {timeframe_name}: {len(timeline_values)} data points for {target.name}")
         
-        entries = []
-        stored_count = 0
+        # Normalized against this array's own peak, in the same write as the raw scores
+        normalized_values = normalize_timeline(timeline_values, target.normalization_baseline)
+        if normalized_values is None:
+            normalized_values = [None] * len(timeline_values)
+        
+        point_timestamps = []
+        point_scores = []
+        point_normalized = []
         
-        for i, (timestamp_dt, value) in enumerate(zip(timeline_timestamps, timeline_values)):
+        for i, (timestamp_dt, value, normalized_score) in enumerate(
+            zip(timeline_timestamps, timeline_values, normalized_values)
+        ):
             try:
                 # Validate timestamp is datetime object
                 if not isinstance(timestamp_dt, datetime):
@@ -191,45 +209,28 @@ async def store_timeframe_data_with_real_timestamps(
                 # Log sample timestamps for verification
                 if i < 3:
                     logger.debug(f"Sample timestamp {i}: {timestamp_dt} (tzinfo: {timestamp_dt.tzinfo})")
-                
-                # Calculate normalized score if baseline is available
-                normalized_score = None
-                if target.normalization_baseline:
-                    # Find peak score in current timeframe data for normalization
-                    timeframe_peak = max(trends_data['timeline']) if trends_data['timeline'] else 100
-                    normalization_factor = float(target.normalization_baseline) / timeframe_peak
-                    normalized_score = Decimal(str(round(value * normalization_factor, 2)))
 
-                entry = AttentionHistory(
-                    target_id=target.id,
-                    attention_score=Decimal(str(value)),
-                    normalized_score=normalized_score,
-                    timestamp=timestamp_dt,
-                    data_source=f"google_trends_{timeframe_name}",
-                    timeframe_used=timeframe_code,
-                    confidence_score=Decimal("1.0")
-                )
-                entries.append(entry)
-                stored_count += 1
+                point_timestamps.append(timestamp_dt)
+                point_scores.append(value)
+                point_normalized.append(normalized_score)
                 
             except Exception as e:
                 logger.error(f"Failed to process timestamp {timestamp_dt}: {e}")
         
-        if not entries:
+        if not point_timestamps:
             logger.error(f"No valid entries created for {target.name} ({timeframe_name})")
-            return
+            return None
         
-        # Insert in batches
-        batch_size = 1000
-        for i in range(0, len(entries), batch_size):
-            batch = entries[i:i+batch_size]
-            db.add_all(batch)
-            db.commit()
+        counts = upsert_history_points(
+            db, target.id, f"google_trends_{timeframe_name}", timeframe_code,
+            point_timestamps, point_scores, point_normalized
+        )
         
         # Show timestamp range for verification
-        first_ts = entries[0].timestamp
-        last_ts = entries[-1].timestamp
-        logger.info(f"Stored {stored_count} {timeframe_name} points: {first_ts} to {last_ts}")
+        first_ts = point_timestamps[0]
+        last_ts = point_timestamps[-1]
+        logger.info(f"Stored {timeframe_name} points for {target.name}: {counts['inserted']} new, "
+                    f"{counts['updated']} updated, {counts['skipped']} skipped ({first_ts} to {last_ts})")
         
         # Verify timestamp alignment and timezone correctness
         current_utc = datetime.now(timezone.utc)
@@ -249,9 +250,12 @@ async def store_timeframe_data_with_real_timestamps(
         if last_ts.tzinfo is None:
             logger.error(f"Stored timestamp is timezone-naive: {last_ts}")
         
+        return counts
+        
     except Exception as e:
         logger.error(f"Error storing {timeframe_name} data for {target.name}: {e}")
         db.rollback()
+        return None
 
 
 async def seed_sample_targets() -> None:
@@ -268,7 +272,7 @@ async def seed_sample_targets() -> None:
     created_count = 0
     
     try:
-        async with GoogleTrendsService(use_tor=USE_TOR) as service:
+        async with GoogleTrendsService(use_tor=USE_TOR, priority=Priority.SEEDING) as service:
             for i, target_data in enumerate(SAMPLE_TARGETS):
                 try:
                     logger.info(f"Processing target [{i+1}/{len(SAMPLE_TARGETS)}]: {target_data['name']} ({target_data['type']})")
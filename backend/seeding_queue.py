@@ -0,0 +1,307 @@
+"""
+Persistent historical seeding queue for TrendBet
+
+New targets only get 1-day and 7-day data while the user waits; the
+longer timeframes are seeded later, spread out to stay clear of Google's
+rate limits. Each (target, timeframe) is a row in seeding_jobs, so the
+work survives restarts and deploys. Workers in any process claim due
+jobs with SELECT ... FOR UPDATE SKIP LOCKED, failed jobs are retried with
+exponential backoff, and a job left running by a crashed worker is
+picked up again once its lease expires. A running job renews its lease
+every LEASE_RENEW_SECONDS, so time spent waiting on the rate limiter does
+not let another worker claim it a second time.
+
+Targets created before the queue existed are given jobs for the
+timeframes they have no history for by enqueue_unseeded_targets, which
+create_tables runs at startup.
+
+Usage:
+    enqueue_seeding(db, target.id, target.search_term)
+    asyncio.create_task(run_seeding_worker("web-1"))
+"""
+
+import asyncio
+import logging
+import os
+import socket
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional
+
+from sqlalchemy import and_, func, or_, text
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import Session
+
+from database import SessionLocal
+from google_trends_service import GoogleTrendsService
+from models import AttentionTarget, SeedingJob
+from trends_rate_limiter import Priority
+
+logger = logging.getLogger(__name__)
+
+SEEDING_WORKERS = max(0, int(os.getenv('SEEDING_WORKERS', '1')))
+
+# Minutes after enqueueing that each timeframe becomes due (the old
+# in-process schedule: 2 minutes, then 5/8/10/12/15 minute gaps)
+SEEDING_TIMEFRAMES = [
+    ("now 7-d", "7d", 7),
+    ("today 1-m", "1m", 15),
+    ("today 3-m", "3m", 25),
+    ("today 12-m", "1y", 37),
+    ("today 5-y", "5y", 52),
+]
+
+POLL_INTERVAL = 30           # Seconds an idle worker waits before looking again
+LEASE_SECONDS = 600          # A running job untouched this long is reclaimed
+LEASE_RENEW_SECONDS = LEASE_SECONDS // 3  # Heartbeat of a running job
+RETRY_BASE_SECONDS = 300     # Backoff after the first failure, doubled per attempt
+MAX_RETRY_SECONDS = 6 * 3600
+
+
+def enqueue_seeding(db: Session, target_id: int, search_term: str, start_delay_minutes: int = 0) -> int:
+    """Queue every historical timeframe for a target; timeframes already queued are kept. Returns rows added."""
+    now = datetime.now(timezone.utc)
+    rows = [{
+        "target_id": target_id,
+        "search_term": search_term,
+        "timeframe_code": timeframe_code,
+        "timeframe_name": timeframe_name,
+        "status": "pending",
+        "attempts": 0,
+        "max_attempts": 5,
+        "not_before": now + timedelta(minutes=start_delay_minutes + offset_minutes),
+        "created_at": now,
+    } for timeframe_code, timeframe_name, offset_minutes in SEEDING_TIMEFRAMES]
+
+    statement = insert(SeedingJob).values(rows).on_conflict_do_nothing(
+        constraint="uq_seeding_jobs_target_timeframe"
+    )
+    result = db.execute(statement)
+    db.commit()
+    return result.rowcount or 0
+
+
+def enqueue_unseeded_targets(engine) -> int:
+    """
+    Queue the timeframes that active targets have no stored history for and
+    no job yet (targets created before the seeding queue). Returns rows added.
+    """
+    timeframes = ", ".join(
+        f"('{timeframe_code}', '{timeframe_name}', {offset_minutes})"
+        for timeframe_code, timeframe_name, offset_minutes in SEEDING_TIMEFRAMES
+    )
+    with engine.begin() as conn:
+        added = conn.execute(text(f"""
+            INSERT INTO seeding_jobs (target_id, search_term, timeframe_code, timeframe_name, status,
+                                      attempts, max_attempts, not_before, created_at)
+            SELECT t.id, t.search_term, tf.code, tf.name, 'pending', 0, 5,
+                   now() + make_interval(mins => tf.offset_minutes), now()
+            FROM attention_targets t
+            CROSS JOIN (VALUES {timeframes}) AS tf (code, name, offset_minutes)
+            WHERE t.is_active
+              AND NOT EXISTS (
+                  SELECT 1 FROM attention_history h
+                  WHERE h.target_id = t.id AND h.data_source = 'google_trends_' || tf.name
+              )
+            ON CONFLICT ON CONSTRAINT uq_seeding_jobs_target_timeframe DO NOTHING
+        """)).rowcount or 0
+    if added:
+        logger.info(f"🌱 Queued {added} seeding jobs for existing targets")
+    return added
+
+
+def claim_next_job(worker_id: str) -> Optional[Dict]:
+    """
+    Claim the most overdue job, or None.
+
+    SKIP LOCKED lets any number of workers poll at once without blocking
+    on, or double-claiming, each other's rows.
+    """
+    db = SessionLocal()
+    try:
+        while True:
+            now = datetime.now(timezone.utc)
+            job = db.query(SeedingJob).filter(or_(
+                and_(SeedingJob.status == "pending", SeedingJob.not_before <= now),
+                and_(SeedingJob.status == "running", SeedingJob.locked_at < now - timedelta(seconds=LEASE_SECONDS)),
+            )).order_by(SeedingJob.not_before).with_for_update(skip_locked=True).first()
+
+            if job is None:
+                db.rollback()
+                return None
+
+            if job.attempts >= job.max_attempts:
+                # Its last attempt died with the worker
+                job.status = "failed"
+                job.last_error = job.last_error or "Worker lease expired"
+                db.commit()
+                continue
+
+            job.status = "running"
+            job.attempts += 1
+            job.locked_by = worker_id
+            job.locked_at = now
+            db.commit()
+            return {
+                "id": job.id,
+                "target_id": job.target_id,
+                "search_term": job.search_term,
+                "timeframe_code": job.timeframe_code,
+                "timeframe_name": job.timeframe_name,
+                "attempts": job.attempts,
+                "max_attempts": job.max_attempts,
+            }
+    finally:
+        db.close()
+
+
+def renew_lease(job_id: int, worker_id: str) -> bool:
+    """Extend a running job's lease; False if another worker has taken it over"""
+    db = SessionLocal()
+    try:
+        renewed = db.query(SeedingJob).filter(
+            SeedingJob.id == job_id,
+            SeedingJob.status == "running",
+            SeedingJob.locked_by == worker_id
+        ).update({SeedingJob.locked_at: datetime.now(timezone.utc)}, synchronize_session=False)
+        db.commit()
+        return bool(renewed)
+    finally:
+        db.close()
+
+
+async def _keep_lease(job_id: int, worker_id: str):
+    while True:
+        await asyncio.sleep(LEASE_RENEW_SECONDS)
+        try:
+            if not await asyncio.to_thread(renew_lease, job_id, worker_id):
+                logger.warning(f"Warning: Seeding job {job_id} lease was lost by {worker_id}")
+                return
+        except Exception as e:
+            logger.error(f"Failed: Renewing lease of seeding job {job_id}: {e}")
+
+
+def finish_job(job_id: int, error: Optional[str] = None, retry_after: Optional[float] = None):
+    """
+    Record a job's outcome.
+
+    Success marks it done. A failure is retried with exponential backoff
+    until max_attempts; retry_after (throttling) reschedules it without
+    using up an attempt.
+    """
+    db = SessionLocal()
+    try:
+        job = db.query(SeedingJob).filter(SeedingJob.id == job_id).first()
+        if job is None:
+            return
+        now = datetime.now(timezone.utc)
+        job.locked_by = None
+        job.locked_at = None
+
+        if error is None:
+            job.status = "done"
+            job.completed_at = now
+            job.last_error = None
+        elif retry_after is not None:
+            job.status = "pending"
+            job.attempts = max(0, job.attempts - 1)
+            job.not_before = now + timedelta(seconds=retry_after)
+            job.last_error = error
+        elif job.attempts >= job.max_attempts:
+            job.status = "failed"
+            job.last_error = error
+        else:
+            job.status = "pending"
+            delay = min(RETRY_BASE_SECONDS * 2 ** (job.attempts - 1), MAX_RETRY_SECONDS)
+            job.not_before = now + timedelta(seconds=delay)
+            job.last_error = error
+        db.commit()
+    finally:
+        db.close()
+
+
+async def _run_job(service: GoogleTrendsService, job: Dict):
+    from seed_data import store_timeframe_data_with_real_timestamps
+
+    label = f"{job['timeframe_name']} for '{job['search_term']}' (attempt {job['attempts']}/{job['max_attempts']})"
+    logger.info(f"Data: Seeding {label}...")
+    data = await service.get_google_trends_data(job['search_term'], timeframe=job['timeframe_code'])
+
+    if not (data and data.get('success') and data.get('timeline')):
+        error = data.get('error', 'No timeline data') if data else 'Request failed'
+        logger.warning(f"Warning: No data seeding {label}: {error}")
+        await asyncio.to_thread(finish_job, job['id'], error, data.get('retry_after') if data else None)
+        return
+
+    db = SessionLocal()
+    try:
+        target = db.query(AttentionTarget).filter(AttentionTarget.id == job['target_id']).first()
+        if target is None:
+            await asyncio.to_thread(finish_job, job['id'], "Target no longer exists")
+            return
+        counts = await store_timeframe_data_with_real_timestamps(
+            target, data, job['timeframe_name'], job['timeframe_code'], db
+        )
+    finally:
+        db.close()
+    if counts is None:
+        await asyncio.to_thread(finish_job, job['id'], "Storing timeline failed")
+        return
+    await asyncio.to_thread(finish_job, job['id'])
+    logger.info(f"Successfully Seeded {label}: {counts['inserted']} new, {counts['updated']} updated points")
+
+
+async def run_seeding_worker(worker_id: str, websocket_manager=None, use_tor: bool = False,
+                             stop_event: Optional[asyncio.Event] = None):
+    """Claim and run seeding jobs until stopped; safe to run in many processes"""
+    logger.info(f"🌱 Seeding worker {worker_id} started")
+    while not (stop_event and stop_event.is_set()):
+        try:
+            async with GoogleTrendsService(websocket_manager=websocket_manager, use_tor=use_tor,
+                                           priority=Priority.SEEDING) as service:
+                while not (stop_event and stop_event.is_set()):
+                    job = await asyncio.to_thread(claim_next_job, worker_id)
+                    if job is None:
+                        await asyncio.sleep(POLL_INTERVAL)
+                        continue
+                    heartbeat = asyncio.create_task(_keep_lease(job['id'], worker_id))
+                    try:
+                        await _run_job(service, job)
+                    except Exception as e:
+                        logger.error(f"Failed: Seeding job {job['id']} failed: {e}")
+                        await asyncio.to_thread(finish_job, job['id'], str(e))
+                    finally:
+                        heartbeat.cancel()
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"Failed: Seeding worker {worker_id} error: {e}")
+            await asyncio.sleep(60)
+
+
+def start_seeding_workers(websocket_manager=None, use_tor: bool = False, count: int = SEEDING_WORKERS) -> List[asyncio.Task]:
+    """Start `count` workers in this process (SEEDING_WORKERS by default)"""
+    host = socket.gethostname()
+    return [
+        asyncio.create_task(run_seeding_worker(f"{host}:{os.getpid()}:{n}", websocket_manager, use_tor))
+        for n in range(count)
+    ]
+
+
+def get_seeding_status(db: Session, limit: int = 20) -> Dict:
+    """Job counts by status, plus the most recent failures"""
+    counts = dict(db.query(SeedingJob.status, func.count(SeedingJob.id)).group_by(SeedingJob.status).all())
+    next_due = db.query(func.min(SeedingJob.not_before)).filter(SeedingJob.status == "pending").scalar()
+    failures = db.query(SeedingJob).filter(SeedingJob.status == "failed").order_by(
+        SeedingJob.id.desc()
+    ).limit(limit).all()
+    return {
+        "counts": {status: counts.get(status, 0) for status in ("pending", "running", "done", "failed")},
+        "next_due": next_due.isoformat() if next_due else None,
+        "recent_failures": [{
+            "id": job.id,
+            "target_id": job.target_id,
+            "timeframe": job.timeframe_name,
+            "attempts": job.attempts,
+            "error": job.last_error,
+        } for job in failures],
+    }
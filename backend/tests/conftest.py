@@ -0,0 +1,90 @@
+"""
+Shared fixtures for the TrendBet backend tests
+
+Most tests exercise pure logic and run anywhere. Tests marked `postgres`
+cover SQL that only PostgreSQL runs (partitions, ON CONFLICT, SKIP
+LOCKED, ...). They need a disposable database in TEST_DATABASE_URL, whose
+public schema is dropped and recreated, and are skipped without one.
+
+Needs pytest, plus httpx for the API tests (FastAPI's TestClient).
+
+Usage: TEST_DATABASE_URL=postgresql://postgres@localhost/trendbet_test pytest
+"""
+
+import os
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+TEST_DATABASE_URL = os.getenv("TEST_DATABASE_URL")
+if TEST_DATABASE_URL:
+    # database.py builds its engine from DATABASE_URL at import time
+    os.environ["DATABASE_URL"] = TEST_DATABASE_URL
+
+_TABLES = "attention_targets, attention_history, attention_rollups, seeding_jobs, portfolios"
+
+
+def pytest_collection_modifyitems(config, items):
+    if TEST_DATABASE_URL:
+        return
+    skip = pytest.mark.skip(reason="set TEST_DATABASE_URL to run PostgreSQL tests")
+    for item in items:
+        if "postgres" in item.keywords:
+            item.add_marker(skip)
+
+
+@pytest.fixture(scope="session")
+def pg_engine():
+    """The application engine on a freshly created schema"""
+    from sqlalchemy import text
+
+    from database import create_tables, engine
+
+    with engine.begin() as conn:
+        conn.execute(text("DROP SCHEMA public CASCADE"))
+        conn.execute(text("CREATE SCHEMA public"))
+    create_tables()
+    yield engine
+    engine.dispose()
+
+
+@pytest.fixture
+def db(pg_engine):
+    """A session on an empty schema; every table is truncated afterwards"""
+    from sqlalchemy import text
+
+    from database import SessionLocal
+
+    session = SessionLocal()
+    yield session
+    session.rollback()
+    session.close()
+    with pg_engine.begin() as conn:
+        conn.execute(text(f"TRUNCATE {_TABLES} RESTART IDENTITY CASCADE"))
+
+
+@pytest.fixture
+def make_target(db):
+    from models import AttentionTarget, TargetType
+
+    def make(name: str = "Test Target", **fields) -> AttentionTarget:
+        fields.setdefault("search_term", name)
+        target = AttentionTarget(name=name, type=TargetType.CRYPTO, **fields)
+        db.add(target)
+        db.commit()
+        return target
+
+    return make
+
+
+@pytest.fixture
+def client(db):
+    """TestClient on the app; startup tasks (background updates) are not run"""
+    from fastapi.testclient import TestClient
+
+    from main import app
+
+    return TestClient(app)
@@ -0,0 +1,49 @@
+import random
+from collections import Counter
+
+import pytest
+
+from alias_sampler import AliasTable, PopularityPool
+
+
+def test_alias_table_matches_the_weight_distribution():
+    weights = [1, 2, 3, 4, 0]
+    table = AliasTable(weights)
+    rng = random.Random(7)
+    draws = 100_000
+
+    counts = Counter(table.draw(rng) for _ in range(draws))
+
+    assert counts[4] == 0
+    for index, weight in enumerate(weights[:4]):
+        assert counts[index] / draws == pytest.approx(weight / sum(weights), abs=0.01)
+
+
+def test_alias_table_rejects_empty_or_zero_weights():
+    with pytest.raises(ValueError):
+        AliasTable([])
+    with pytest.raises(ValueError):
+        AliasTable([0, 0])
+
+
+def test_popularity_pool_favours_popular_rows():
+    pool = PopularityPool(1000, row_ids=[3, 500], weights=[90, 10], popular_share=0.5)
+    rng = random.Random(1)
+
+    counts = Counter(pool.draw(rng) for _ in range(20_000))
+
+    assert counts[3] / 20_000 == pytest.approx(0.45, abs=0.02)
+    assert counts[500] / 20_000 == pytest.approx(0.05, abs=0.01)
+
+
+def test_popularity_pool_samples_distinct_rows():
+    rng = random.Random(3)
+    # Nearly all draws land on one row, so the sampler must fall back to filling the rest
+    pool = PopularityPool(50, row_ids=[0], weights=[1], popular_share=0.99)
+
+    sample = pool.sample(40, rng)
+    assert len(sample) == len(set(sample)) == 40
+    assert all(0 <= row_id < 50 for row_id in sample)
+
+    assert sorted(pool.sample(80, rng)) == list(range(50))
+    assert len(set(PopularityPool(10).sample(5, rng))) == 5
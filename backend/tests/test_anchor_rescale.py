@@ -0,0 +1,25 @@
+import pytest
+
+from google_trends_service import MIN_ANCHOR_MEAN, anchor_rescale
+
+
+def test_batches_land_on_the_anchor_scale():
+    # The same term fetched in two batches must come out equal after rescaling
+    scores = anchor_rescale([
+        {"anchor_mean": 50.0, "latest": {"bitcoin": 80, "dogecoin": 10}},
+        {"anchor_mean": 20.0, "latest": {"ethereum": 100, "bitcoin (again)": 32}},
+    ])
+
+    assert scores == {"bitcoin": 160.0, "dogecoin": 20.0, "ethereum": 500.0, "bitcoin (again)": 160.0}
+
+
+def test_scores_above_the_anchor_are_not_capped():
+    assert anchor_rescale([{"anchor_mean": 2.0, "latest": {"viral": 100}}]) == {"viral": 5000.0}
+
+
+def test_batches_with_a_vanishing_anchor_are_left_out():
+    scores = anchor_rescale([
+        {"anchor_mean": MIN_ANCHOR_MEAN / 2, "latest": {"noise": 100}},
+        {"anchor_mean": 40.0, "latest": {"signal": 10}},
+    ])
+    assert scores == {"signal": pytest.approx(25.0)}
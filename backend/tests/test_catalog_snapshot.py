@@ -0,0 +1,77 @@
+import pytest
+
+from catalog_snapshot import (SnapshotError, catalog_from_arrays, compile_catalog, load_catalog,
+                              read_snapshot, write_snapshot)
+
+CATEGORIES = ["crypto", "politicians"]
+
+
+@pytest.fixture
+def data_dir(tmp_path):
+    (tmp_path / "crypto.csv").write_text("Name,Symbol\nBitcoin,BTC\nEthereum,ETH\nDogecoin,DOGE\n", encoding="utf-8")
+    (tmp_path / "politicians.csv").write_text("name,country\nJoe Biden,US\nBoris Johnson,UK\n", encoding="utf-8")
+    return tmp_path
+
+
+def test_snapshot_roundtrip_preserves_rows_and_indexes(data_dir):
+    meta, arrays, report = compile_catalog(data_dir, CATEGORIES)
+    path = data_dir / "catalog.snapshot"
+    write_snapshot(path, meta, arrays)
+
+    header, mapped = read_snapshot(path)
+    catalog = catalog_from_arrays(header, mapped, "snapshot")
+
+    assert report["crypto.csv"] == {"status": "parsed", "rows": 3, "seconds": report["crypto.csv"]["seconds"]}
+    assert list(catalog.tables["crypto"]) == [
+        {"Name": "Bitcoin", "Symbol": "BTC"}, {"Name": "Ethereum", "Symbol": "ETH"}, {"Name": "Dogecoin", "Symbol": "DOGE"}
+    ]
+    assert catalog.tables["politicians"][1] == {"name": "Boris Johnson", "country": "UK"}
+    assert catalog.indexes["crypto"].search("eth", 5) == [1]
+    assert [hit[:2] for hit in catalog.fuzzy_index.search("biden", limit=5, per_category_limit=5)] == [("politicians", 0)]
+
+
+def test_read_snapshot_rejects_truncated_and_foreign_files(data_dir):
+    meta, arrays, _report = compile_catalog(data_dir, CATEGORIES)
+    path = data_dir / "catalog.snapshot"
+    write_snapshot(path, meta, arrays)
+
+    content = path.read_bytes()
+    path.write_bytes(content[:len(content) - 8])
+    with pytest.raises(SnapshotError, match="truncated"):
+        read_snapshot(path)
+
+    path.write_bytes(b"name,symbol\n")
+    with pytest.raises(SnapshotError, match="not a catalog snapshot"):
+        read_snapshot(path)
+
+    path.write_bytes(b"")
+    with pytest.raises(SnapshotError, match="empty"):
+        read_snapshot(path)
+
+
+def test_compile_catalog_reuses_unchanged_categories(data_dir):
+    first = catalog_from_arrays(*compile_catalog(data_dir, CATEGORIES)[:2], "memory")
+    (data_dir / "politicians.csv").write_text("name,country\nJoe Biden,US\n", encoding="utf-8")
+
+    meta, _arrays, report = compile_catalog(data_dir, CATEGORIES, previous=first)
+
+    assert report["crypto.csv"]["status"] == "unchanged"
+    assert report["politicians.csv"]["status"] == "parsed"
+    assert meta["categories"]["politicians"]["rows"] == 1
+
+
+def test_load_catalog_maps_the_snapshot_until_a_csv_changes(data_dir):
+    built = load_catalog(data_dir, CATEGORIES)
+    assert built.source == "rebuilt"
+    assert len(built.tables["crypto"]) == 3
+
+    mapped = load_catalog(data_dir, CATEGORIES, previous=built)
+    assert mapped.source == "snapshot"
+    assert mapped.report["crypto.csv"]["status"] == "unchanged"
+
+    (data_dir / "crypto.csv").write_text("Name,Symbol\nSolana,SOL\n", encoding="utf-8")
+    rebuilt = load_catalog(data_dir, CATEGORIES, previous=mapped)
+    assert rebuilt.source == "rebuilt"
+    assert rebuilt.report["crypto.csv"]["status"] == "parsed"
+    assert rebuilt.report["politicians.csv"]["status"] == "unchanged"
+    assert list(rebuilt.tables["crypto"]) == [{"Name": "Solana", "Symbol": "SOL"}]
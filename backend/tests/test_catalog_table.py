@@ -0,0 +1,30 @@
+from catalog_snapshot import CatalogTable
+from search_index import StringColumn
+
+
+def make_table(columns, rows):
+    return CatalogTable(columns, [StringColumn.from_strings(row[i] for row in rows) for i in range(len(columns))])
+
+
+def test_search_result_derives_search_term_without_touching_the_table():
+    table = make_table(["Name", "Symbol"], [("Bitcoin", "BTC"), ("Ethereum", "ETH")])
+
+    result = table.search_result(1)
+    result["Symbol"] = "changed"
+
+    assert result["search_term"] == "Ethereum"
+    assert table[1] == {"Name": "Ethereum", "Symbol": "ETH"}
+    assert table.search_result(1) == {"Name": "Ethereum", "Symbol": "ETH", "search_term": "Ethereum"}
+    assert table.search_result(1) is not table.search_result(1)
+
+
+def test_search_result_keeps_an_existing_search_term_column():
+    table = make_table(["name", "search_term"], [("Joe Biden", "Biden")])
+    assert table.search_result(0) == {"name": "Joe Biden", "search_term": "Biden"}
+
+
+def test_rows_are_built_on_demand_and_sliceable():
+    table = make_table(["name"], [("a",), ("b",), ("c",)])
+    assert len(table) == 3
+    assert table[1:] == [{"name": "b"}, {"name": "c"}]
+    assert table.name(2) == "c"
@@ -0,0 +1,102 @@
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+
+import pytest
+
+import chart_cache
+from chart_cache import ChartCache, etag_matches, make_etag, time_bucket
+from history_store import upsert_history_points
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """A manual wall clock for the chart cache module"""
+    clock = SimpleNamespace(now=600.0)
+    monkeypatch.setattr(chart_cache, "time", SimpleNamespace(time=lambda: clock.now))
+    return clock
+
+
+def test_etag_changes_with_version_parameters_and_time_bucket():
+    etag = make_etag((7, 30, 200, "lttb"), 3, 10)
+    assert etag.startswith('"7-3-') and etag.endswith('"')
+    assert etag == make_etag((7, 30, 200, "lttb"), 3, 10)
+    assert etag != make_etag((7, 30, 200, "lttb"), 4, 10)
+    assert etag != make_etag((7, 30, 100, "lttb"), 3, 10)
+    assert etag != make_etag((7, 30, 200, "lttb"), 3, 11)
+
+
+def test_time_buckets_follow_the_ttl(clock):
+    assert time_bucket(60) == 10
+    clock.now += 59
+    assert time_bucket(60) == 10
+    clock.now += 1
+    assert time_bucket(60) == 11
+    assert time_bucket(0) == 660
+
+
+def test_if_none_match_uses_weak_comparison():
+    etag = make_etag((1, 7, 200, "lttb"), 0, 0)
+    assert etag_matches(etag, etag)
+    assert etag_matches(f'"other", W/{etag}', etag)
+    assert etag_matches("*", etag)
+    assert not etag_matches(None, etag)
+    assert not etag_matches('"other"', etag)
+
+
+def test_entries_are_only_served_for_their_version_and_bucket():
+    cache = ChartCache(ttl=60, max_size=2)
+    cache.put((1, 7), 5, 10, b"v5")
+
+    assert cache.get((1, 7), 5, 10) == b"v5"
+    assert cache.get((1, 7), 6, 10) is None
+    assert cache.get((1, 7), 5, 10) is None  # The stale entry is gone
+
+    cache.put((1, 7), 6, 10, b"v6")
+    assert cache.get((1, 7), 6, 11) is None
+    assert cache.stats()["stale"] == 2
+
+    for target_id in (1, 2, 3):
+        cache.put((target_id, 7), 0, 0, b"")
+    assert cache.stats()["size"] == 2
+    assert cache.get((1, 7), 0, 0) is None
+
+
+@pytest.mark.postgres
+def test_chart_endpoint_revalidates_until_the_history_changes(client, db, make_target):
+    target = make_target()
+    now = datetime.now(timezone.utc).replace(minute=0, second=0, microsecond=0)
+    upsert_history_points(db, target.id, "google_trends_7d", "now 7-d",
+                          [now - timedelta(hours=h) for h in range(5, 0, -1)], [10, 20, 30, 40, 50])
+
+    first = client.get(f"/targets/{target.id}/chart?days=7")
+    assert first.status_code == 200
+    assert first.json()["data_count"] == 5
+
+    cached = client.get(f"/targets/{target.id}/chart?days=7", headers={"If-None-Match": first.headers["etag"]})
+    assert (cached.status_code, cached.content) == (304, b"")
+
+    upsert_history_points(db, target.id, "google_trends_7d", "now 7-d", [now], [60])
+    changed = client.get(f"/targets/{target.id}/chart?days=7", headers={"If-None-Match": first.headers["etag"]})
+    assert changed.status_code == 200
+    assert changed.headers["etag"] != first.headers["etag"]
+    assert changed.json()["data_count"] == 6
+
+    assert client.get("/targets/999999/chart").status_code == 404
+
+
+@pytest.mark.postgres
+def test_chart_etags_lapse_with_the_time_bucket(client, db, make_target, clock):
+    target = make_target()
+    now = datetime.now(timezone.utc).replace(minute=0, second=0, microsecond=0)
+    upsert_history_points(db, target.id, "google_trends_7d", "now 7-d",
+                          [now - timedelta(hours=h) for h in range(3, 0, -1)], [10, 20, 30])
+
+    first = client.get(f"/targets/{target.id}/chart?days=7")
+    etag = {"If-None-Match": first.headers["etag"]}
+    assert client.get(f"/targets/{target.id}/chart?days=7", headers=etag).status_code == 304
+
+    clock.now += chart_cache.CHART_CACHE_TTL
+    expired = client.get(f"/targets/{target.id}/chart?days=7", headers=etag)
+    assert expired.status_code == 200
+    assert expired.headers["etag"] != first.headers["etag"]
+    assert expired.json()["data_count"] == 3
@@ -0,0 +1,58 @@
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from history_store import upsert_history_points
+
+pytestmark = pytest.mark.postgres
+
+
+def decode(payload, target_id):
+    """(epoch seconds, score) pairs of one series"""
+    series = payload["series"][str(target_id)]
+    return [(payload["timestamps"][i], value) for i, value in zip(series["i"], series["v"])]
+
+
+def test_batch_matches_the_single_target_charts(client, db, make_target):
+    now = datetime.now(timezone.utc).replace(minute=0, second=0, microsecond=0)
+    hours = [now - timedelta(hours=h) for h in range(48, 0, -1)]
+    first, second, empty = make_target("first"), make_target("second"), make_target("empty")
+    upsert_history_points(db, first.id, "google_trends_7d", "now 7-d", hours, [h % 24 for h in range(48)])
+    upsert_history_points(db, second.id, "google_trends_7d", "now 7-d", hours[::2], [50 + h for h in range(24)])
+
+    response = client.post("/charts/batch", json={"target_ids": [second.id, first.id, empty.id, first.id],
+                                                  "days": 7, "max_points": 20})
+    assert response.status_code == 200
+    payload = response.json()
+
+    assert payload["resolution"] == "hour"
+    assert payload["timestamps"] == sorted(set(payload["timestamps"]))
+    assert payload["series"][str(empty.id)] == {"i": [], "v": [], "total_points": 0}
+    for target in (first, second):
+        series = payload["series"][str(target.id)]
+        assert len(series["v"]) <= 20
+        assert len(series["min"]) == len(series["max"]) == len(series["v"])
+
+        chart = client.get(f"/targets/{target.id}/chart?days=7&max_points=20").json()
+        expected = [(int(datetime.fromisoformat(point["timestamp"]).timestamp()), round(point["attention_score"], 2))
+                    for point in chart["data"]]
+        assert decode(payload, target.id) == expected
+        assert series["total_points"] == chart["sampling_info"]["total_points_available"]
+
+
+def test_one_day_batches_read_raw_points(client, db, make_target):
+    now = datetime.now(timezone.utc).replace(second=0, microsecond=0)
+    target = make_target()
+    minutes = [now - timedelta(minutes=8 * i) for i in range(10, 0, -1)]
+    upsert_history_points(db, target.id, "google_trends_1d", "now 1-d", minutes, list(range(10)))
+
+    payload = client.post("/charts/batch", json={"target_ids": [target.id], "days": 1}).json()
+
+    assert payload["resolution"] == "raw"
+    assert "min" not in payload["series"][str(target.id)]
+    assert decode(payload, target.id) == [(int(minute.timestamp()), float(i)) for i, minute in enumerate(minutes)]
+
+
+def test_batch_validates_its_request(client):
+    assert client.post("/charts/batch", json={"target_ids": []}).status_code == 422
+    assert client.post("/charts/batch", json={"target_ids": [1], "algorithm": "mean"}).status_code == 422
@@ -0,0 +1,58 @@
+import pytest
+
+from csv_loader import CSVDataLoader
+
+
+def write_catalog(data_dir, crypto_names):
+    rows = "".join(f"{name},{name[:3].upper()}\n" for name in crypto_names)
+    (data_dir / "crypto.csv").write_text("Name,Symbol\n" + rows, encoding="utf-8")
+
+
+@pytest.fixture
+def loader(tmp_path):
+    """A loader reading a scratch data directory (other categories are simply missing)"""
+    write_catalog(tmp_path, ["Bitcoin", "Bitcoin Cash", "Ethereum", "Dogecoin"])
+    loader = CSVDataLoader()
+    loader.data_dir = tmp_path
+    loader.reload_data()
+    return loader
+
+
+def test_reload_swaps_the_catalog_and_drops_cached_results(loader):
+    old_catalog = loader._catalog
+    assert [row["Name"] for row in loader.search_in_category("crypto", "bit")] == ["Bitcoin", "Bitcoin Cash"]
+
+    write_catalog(loader.data_dir, ["Bitcoin SV", "Solana"])
+    report = loader.reload_data()
+
+    assert report["crypto.csv"]["status"] == "parsed"
+    assert loader._catalog is not old_catalog
+    assert [row["Name"] for row in loader.search_in_category("crypto", "bit")] == ["Bitcoin SV"]
+    assert loader.get_category_stats()["crypto"] == 2
+
+
+def test_reload_without_changes_maps_the_existing_snapshot(loader):
+    report = loader.reload_data()
+    assert report["crypto.csv"]["status"] == "unchanged"
+    assert loader._catalog.source == "snapshot"
+
+
+def test_query_cache_answers_longer_queries_from_a_complete_prefix(loader):
+    assert [row["Name"] for row in loader.search_in_category("crypto", "bi")] == ["Bitcoin", "Bitcoin Cash"]
+    assert [row["Name"] for row in loader.search_in_category("crypto", "bitcoin c")] == ["Bitcoin Cash"]
+    assert [row["Name"] for row in loader.search_in_category("crypto", "bi")] == ["Bitcoin", "Bitcoin Cash"]
+
+    stats = loader.get_search_cache_stats()
+    assert (stats["misses"], stats["prefix_hits"], stats["hits"]) == (1, 1, 1)
+
+
+def test_query_cache_ignores_results_from_a_replaced_catalog(loader):
+    stale_catalog = loader._catalog
+    write_catalog(loader.data_dir, ["Solana"])
+    loader.reload_data()
+
+    # A search that started on the old catalog finishes after the reload
+    loader._query_cache.put(stale_catalog, ("crypto", "sol", 10), (3,), True)
+
+    assert loader._query_cache.get(stale_catalog, ("crypto", "sol", 10)) is None
+    assert [row["Name"] for row in loader.search_in_category("crypto", "sol")] == ["Solana"]
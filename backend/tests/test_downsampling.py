@@ -0,0 +1,72 @@
+import numpy as np
+import pytest
+
+from downsampling import downsample, every_nth, lttb, minmax
+
+
+def reference_lttb(x, y, threshold):
+    """Straightforward per-point LTTB, as in Steinarsson's thesis"""
+    n = len(y)
+    buckets = threshold - 2
+    selected = [0]
+    a = 0
+    for i in range(threshold - 2):
+        start, end = i * (n - 2) // buckets + 1, (i + 1) * (n - 2) // buckets + 1
+        next_start, next_end = end, min((i + 2) * (n - 2) // buckets + 1, n)
+        if i == threshold - 3:
+            avg_x, avg_y = x[n - 1], y[n - 1]
+        else:
+            avg_x = sum(x[next_start:next_end]) / (next_end - next_start)
+            avg_y = sum(y[next_start:next_end]) / (next_end - next_start)
+        best, best_area = start, -1.0
+        for j in range(start, end):
+            area = abs((x[a] - avg_x) * (y[j] - y[a]) - (x[a] - x[j]) * (avg_y - y[a]))
+            if area > best_area:
+                best, best_area = j, area
+        selected.append(best)
+        a = best
+    selected.append(n - 1)
+    return selected
+
+
+@pytest.mark.parametrize("n, max_points", [(1000, 50), (261, 40), (97, 3), (500, 499), (96, 72), (110, 100)])
+def test_lttb_matches_the_reference_algorithm(n, max_points):
+    rng = np.random.default_rng(n)
+    x = 1_700_000_000 + np.cumsum(rng.integers(60, 600, n)).astype(np.float64)
+    y = rng.uniform(0, 100, n)
+
+    assert lttb(x, y, max_points).tolist() == reference_lttb(x.tolist(), y.tolist(), max_points)
+
+
+def test_lttb_keeps_an_isolated_spike():
+    y = np.full(1000, 20.0)
+    y[637] = 100.0
+    indices = lttb(np.arange(1000, dtype=np.float64), y, 30)
+    assert 637 in indices
+    assert (indices[0], indices[-1], len(indices)) == (0, 999, 30)
+
+
+def test_minmax_keeps_every_bucket_extreme():
+    rng = np.random.default_rng(5)
+    y = rng.uniform(0, 100, 1000)
+    y[[10, 500]] = [150.0, -50.0]
+
+    indices = minmax(y, 100)
+
+    assert len(indices) <= 100
+    assert {0, 10, 500, 999} <= set(indices.tolist())
+    assert np.all(np.diff(indices) > 0)
+
+
+def test_every_nth_keeps_the_last_point():
+    assert every_nth(10, 4).tolist() == [0, 4, 8, 9]
+    assert every_nth(11, 4).tolist() == [0, 4, 8, 10]
+
+
+def test_downsample_passes_short_series_through_and_rejects_unknown_algorithms():
+    assert downsample([0, 1, 2], [5, 6, 7], max_points=10).tolist() == [0, 1, 2]
+    with pytest.raises(ValueError):
+        downsample(list(range(100)), list(range(100)), max_points=10, algorithm="average")
+    for algorithm in ("lttb", "minmax", "nth"):
+        indices = downsample(list(range(100)), list(range(100)), max_points=10, algorithm=algorithm)
+        assert len(indices) <= 10 and indices[0] == 0 and indices[-1] == 99
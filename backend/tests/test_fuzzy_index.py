@@ -0,0 +1,35 @@
+from search_index import CategoryIndex, FuzzyIndex, TIER_EXACT_TOKEN, TIER_PREFIX, TIER_SIMILAR
+
+POLITICIANS = ["Joe Biden", "Barack Obama", "Michelle Obama", "Boris Johnson", "Joan Baez"]
+CRYPTO = ["Bitcoin", "Bitcoin Cash", "Ethereum", "Ethereum Classic", "Dogecoin"]
+
+
+def build():
+    return FuzzyIndex.build({"politicians": CategoryIndex.build(POLITICIANS), "crypto": CategoryIndex.build(CRYPTO)})
+
+
+def test_fuzzy_search_ranks_prefix_before_misspelling():
+    fuzzy = build()
+
+    prefix_hits = fuzzy.search("bitc", limit=5, per_category_limit=5)
+    assert prefix_hits[0][:3] == ("crypto", 0, TIER_PREFIX)
+
+    typo_hits = fuzzy.search("etherium", limit=5, per_category_limit=5)
+    assert {(category, row_id) for category, row_id, _tier, _score in typo_hits} >= {("crypto", 2), ("crypto", 3)}
+    assert all(tier == TIER_SIMILAR for _category, _row_id, tier, _score in typo_hits)
+
+
+def test_fuzzy_search_respects_per_category_limit():
+    fuzzy = FuzzyIndex.build({"people": CategoryIndex.build(["Boris Johnson", "Magic Johnson", "Johnson & Johnson"])})
+    assert len(fuzzy.search("johnson", limit=10, per_category_limit=2)) == 2
+
+
+def test_fuzzy_search_finds_exact_token_anywhere_in_the_name():
+    hits = build().search("obama", limit=5, per_category_limit=5)
+    assert [(category, row_id, tier) for category, row_id, tier, _score in hits] == [
+        ("politicians", 1, TIER_EXACT_TOKEN), ("politicians", 2, TIER_EXACT_TOKEN)
+    ]
+
+
+def test_fuzzy_search_ignores_unrelated_queries():
+    assert build().search("zzzzqq", limit=5, per_category_limit=5) == []
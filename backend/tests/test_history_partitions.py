@@ -0,0 +1,145 @@
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from sqlalchemy import text
+
+import history_partitions
+from history_partitions import (PREMAKE_DAYS, REALTIME_RETENTION_HOURS, REALTIME_SOURCE, _create_day_partition,
+                                _partition_name, convert_to_partitioned, is_partitioned, maintain_partitions)
+
+pytestmark = pytest.mark.postgres
+
+_INSERT = text("""
+    INSERT INTO attention_history (target_id, attention_score, data_source, timestamp)
+    VALUES (:target_id, :score, :source, :timestamp)
+""")
+
+
+def utc_now() -> datetime:
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+def partition_of(conn, target_id):
+    """Partition holding each of the target's points, keyed by score"""
+    return dict(conn.execute(text(
+        "SELECT attention_score::int, tableoid::regclass::text FROM attention_history WHERE target_id = :id"
+    ), {"id": target_id}).fetchall())
+
+
+def drop_partition(conn, day):
+    conn.execute(text(f"DROP TABLE IF EXISTS {_partition_name(day)}"))
+
+
+def test_convert_moves_plain_history_into_partitions(db, make_target, pg_engine):
+    from models import AttentionHistory
+
+    target = make_target()
+    now = utc_now()
+    with pg_engine.begin() as conn:
+        conn.execute(text("DROP TABLE attention_history CASCADE"))
+    AttentionHistory.__table__.create(pg_engine)
+    rows = [
+        (10, "google_trends_5y", datetime(2020, 1, 5)),
+        (20, REALTIME_SOURCE, now - timedelta(hours=1)),
+        (30, REALTIME_SOURCE, now - timedelta(hours=REALTIME_RETENTION_HOURS + 1)),
+        (40, "google_trends", datetime(2021, 1, 1)),
+        (41, None, datetime(2021, 1, 1)),  # Same point as 40 once it gets the default source
+        (50, None, datetime(2022, 1, 1)),
+        (60, "google_trends_1y", None),
+    ]
+    try:
+        with pg_engine.begin() as conn:
+            for score, source, timestamp in rows:
+                conn.execute(_INSERT, {"target_id": target.id, "score": score, "source": source, "timestamp": timestamp})
+
+        assert convert_to_partitioned()
+        assert not convert_to_partitioned()
+
+        with pg_engine.begin() as conn:
+            assert is_partitioned(conn)
+            assert partition_of(conn, target.id) == {
+                10: "attention_history_timeline",
+                20: _partition_name((now - timedelta(hours=1)).date()),
+                40: "attention_history_timeline",
+                50: "attention_history_timeline",
+            }
+            assert conn.execute(text("SELECT attention_score::int FROM attention_history_rejected")).scalars().all() == [60]
+            # New rows keep drawing ids from the carried-over sequence
+            conn.execute(_INSERT, {"target_id": target.id, "score": 70, "source": "google_trends_1y",
+                                   "timestamp": datetime(2023, 1, 1)})
+            assert conn.execute(text("SELECT max(id) FROM attention_history")).scalar() == len(rows) + 1
+    finally:
+        with pg_engine.begin() as conn:
+            conn.execute(text("DROP TABLE IF EXISTS attention_history_rejected"))
+
+
+def test_creating_a_day_moves_its_points_out_of_the_default_partition(db, make_target, pg_engine):
+    target = make_target()
+    day = utc_now().date() + timedelta(days=PREMAKE_DAYS + 5)
+    try:
+        with pg_engine.begin() as conn:
+            conn.execute(_INSERT, {"target_id": target.id, "score": 1, "source": REALTIME_SOURCE,
+                                   "timestamp": datetime.combine(day, datetime.min.time()) + timedelta(hours=3)})
+            conn.execute(_INSERT, {"target_id": target.id, "score": 2, "source": REALTIME_SOURCE,
+                                   "timestamp": datetime.combine(day, datetime.min.time()) + timedelta(days=1)})
+            assert set(partition_of(conn, target.id).values()) == {"attention_history_rt_default"}
+
+            assert _create_day_partition(conn, day)
+            assert not _create_day_partition(conn, day)
+            assert partition_of(conn, target.id) == {1: _partition_name(day), 2: "attention_history_rt_default"}
+    finally:
+        with pg_engine.begin() as conn:
+            drop_partition(conn, day)
+
+
+def test_maintenance_drops_expired_days_and_trims_the_default(db, make_target, pg_engine):
+    target = make_target()
+    now = utc_now()
+    expired_day = (now - timedelta(hours=REALTIME_RETENTION_HOURS) - timedelta(days=2)).date()
+    with pg_engine.begin() as conn:
+        _create_day_partition(conn, expired_day)
+        conn.execute(_INSERT, {"target_id": target.id, "score": 1, "source": REALTIME_SOURCE,
+                               "timestamp": datetime.combine(expired_day, datetime.min.time())})
+        # Older than any partition: lands in the default partition
+        conn.execute(_INSERT, {"target_id": target.id, "score": 2, "source": REALTIME_SOURCE,
+                               "timestamp": datetime.combine(expired_day, datetime.min.time()) - timedelta(days=30)})
+        conn.execute(_INSERT, {"target_id": target.id, "score": 3, "source": REALTIME_SOURCE,
+                               "timestamp": now - timedelta(minutes=5)})
+
+    report = maintain_partitions()
+
+    assert _partition_name(expired_day) in report["dropped"]
+    assert report["trimmed_default"] == 1
+    assert report["errors"] == []
+    with pg_engine.begin() as conn:
+        assert list(partition_of(conn, target.id)) == [3]
+
+
+def test_one_failing_day_does_not_stop_maintenance(db, pg_engine, monkeypatch):
+    today = utc_now().date()
+    failing_day = today + timedelta(days=1)
+    with pg_engine.begin() as conn:
+        for offset in range(1, PREMAKE_DAYS + 1):
+            drop_partition(conn, today + timedelta(days=offset))
+
+    create = history_partitions._create_day_partition
+
+    def create_or_fail(conn, day):
+        if day == failing_day:
+            conn.execute(text("SELECT 1 / 0"))  # Aborts the savepoint
+        return create(conn, day)
+
+    monkeypatch.setattr(history_partitions, "_create_day_partition", create_or_fail)
+    report = maintain_partitions()
+
+    assert [error["partition"] for error in report["errors"]] == [_partition_name(failing_day)]
+    assert report["created"] == [_partition_name(today + timedelta(days=offset)) for offset in range(2, PREMAKE_DAYS + 1)]
+
+    monkeypatch.setattr(history_partitions, "_create_day_partition", create)
+    assert maintain_partitions()["created"] == [_partition_name(failing_day)]
+
+
+def test_maintenance_is_skipped_while_another_process_holds_the_lock(db, pg_engine):
+    with pg_engine.begin() as conn:
+        conn.execute(text("SELECT pg_advisory_xact_lock(:id)"), {"id": history_partitions.MAINTENANCE_LOCK_ID})
+        assert maintain_partitions()["skipped"] == "another process is maintaining partitions"
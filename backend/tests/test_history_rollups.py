@@ -0,0 +1,128 @@
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import text
+
+from history_rollups import choose_resolution, rebuild_rollups
+from history_store import upsert_history_points
+from models import AttentionRollup
+
+MONDAY = datetime(2025, 1, 6)
+DAYS = [MONDAY + timedelta(days=i) for i in range(7)]
+
+
+def write(db, target_id, source, timestamps, scores):
+    upsert_history_points(db, target_id, f"google_trends_{source}", source, timestamps, scores)
+
+
+def bucket(db, target_id, resolution, start) -> AttentionRollup:
+    db.expire_all()
+    return db.query(AttentionRollup).filter_by(target_id=target_id, resolution=resolution, bucket=start).one()
+
+
+def test_choose_resolution_by_window():
+    assert [choose_resolution(days) for days in (1, 2, 14, 15, 400, 401)] == [
+        None, "hour", "hour", "day", "day", "week"
+    ]
+
+
+@pytest.mark.postgres
+def test_bucket_values_summarize_the_points(db, make_target):
+    target = make_target()
+    write(db, target.id, "7d", [MONDAY + timedelta(hours=h) for h in range(4)], [40, 10, 30, 20])
+
+    day = bucket(db, target.id, "day", MONDAY)
+    assert (day.min_score, day.max_score, day.avg_score, day.last_score, day.point_count) == (10, 40, 25, 20, 4)
+    assert day.last_timestamp == MONDAY + timedelta(hours=3)
+    assert day.coverage == pytest.approx(4 / 24)
+    assert bucket(db, target.id, "hour", MONDAY + timedelta(hours=2)).avg_score == 30
+
+
+@pytest.mark.postgres
+@pytest.mark.parametrize("order", [("1d", "7d"), ("7d", "1d")])
+def test_hour_buckets_take_the_finest_source(db, make_target, order):
+    target = make_target()
+    points = {"1d": ([MONDAY, MONDAY + timedelta(minutes=8)], [60, 62]), "7d": ([MONDAY], [10])}
+    for source in order:
+        write(db, target.id, source, *points[source])
+
+    assert bucket(db, target.id, "hour", MONDAY).data_source == "google_trends_1d"
+
+
+@pytest.mark.postgres
+@pytest.mark.parametrize("order", [("1d", "1m"), ("1m", "1d")])
+def test_day_buckets_take_the_source_covering_the_day(db, make_target, order):
+    target = make_target()
+    # Three 8-minute points do not outweigh one point standing for the whole day
+    points = {"1d": ([MONDAY + timedelta(minutes=8 * i) for i in range(3)], [90, 95, 99]), "1m": ([MONDAY], [20])}
+    for source in order:
+        write(db, target.id, source, *points[source])
+
+    day = bucket(db, target.id, "day", MONDAY)
+    assert (day.data_source, day.avg_score) == ("google_trends_1m", 20)
+    assert bucket(db, target.id, "hour", MONDAY).data_source == "google_trends_1d"
+
+
+@pytest.mark.postgres
+@pytest.mark.parametrize("order", [("1y", "1m"), ("1m", "1y")])
+def test_equal_coverage_prefers_the_finer_source(db, make_target, order):
+    target = make_target()
+    points = {"1m": (DAYS, [10, 20, 30, 40, 50, 60, 70]), "1y": ([MONDAY], [80])}
+    for source in order:
+        write(db, target.id, source, *points[source])
+
+    week = bucket(db, target.id, "week", MONDAY)
+    assert (week.data_source, week.coverage, week.avg_score) == ("google_trends_1m", 1.0, 40)
+
+
+@pytest.mark.postgres
+def test_writes_within_a_week_refresh_its_bucket_at_most_hourly(db, make_target):
+    target = make_target()
+    write(db, target.id, "1d", [MONDAY], [10])
+    write(db, target.id, "1d", [MONDAY + timedelta(minutes=8)], [20])
+    assert bucket(db, target.id, "week", MONDAY).last_timestamp == MONDAY
+    assert bucket(db, target.id, "day", MONDAY).last_score == 20
+
+    write(db, target.id, "1d", [MONDAY + timedelta(hours=1)], [30])
+    week = bucket(db, target.id, "week", MONDAY)
+    assert (week.last_timestamp, week.point_count) == (MONDAY + timedelta(hours=1), 3)
+
+
+@pytest.mark.postgres
+def test_rebuild_overwrites_buckets_and_keeps_expired_ones(db, make_target):
+    target = make_target()
+    write(db, target.id, "1m", DAYS[:2], [10, 20])
+    db.refresh(target)
+    version = target.history_version
+
+    db.execute(text("UPDATE attention_history SET normalized_score = attention_score * 2 WHERE target_id = :id"),
+               {"id": target.id})
+    # The raw points behind the first day have expired
+    db.execute(text("DELETE FROM attention_history WHERE target_id = :id AND timestamp = :day"),
+               {"id": target.id, "day": DAYS[0]})
+    rebuild_rollups(db, target.id)
+    db.commit()
+
+    assert bucket(db, target.id, "day", DAYS[0]).avg_score == 10
+    assert bucket(db, target.id, "day", DAYS[1]).avg_score == 40
+    db.refresh(target)
+    assert target.history_version == version + 1
+
+
+@pytest.mark.postgres
+def test_backfill_runs_only_while_the_rollups_are_empty(db, make_target, pg_engine):
+    from history_rollups import ensure_rollups_backfilled
+
+    target = make_target()
+    write(db, target.id, "1m", DAYS[:2], [10, 20])
+    db.execute(text("DELETE FROM attention_rollups"))
+    db.commit()
+
+    ensure_rollups_backfilled(pg_engine)
+    assert bucket(db, target.id, "day", DAYS[1]).avg_score == 20
+
+    db.execute(text("DELETE FROM attention_rollups WHERE bucket = :day"), {"day": DAYS[1]})
+    db.commit()
+    ensure_rollups_backfilled(pg_engine)
+    db.expire_all()
+    assert db.query(AttentionRollup).filter_by(target_id=target.id, resolution="day").count() == 1
@@ -0,0 +1,79 @@
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from history_store import upsert_history_points
+from models import AttentionHistory
+
+pytestmark = pytest.mark.postgres
+
+START = datetime(2025, 1, 5)
+WEEKS = [START + timedelta(weeks=i) for i in range(4)]
+
+
+def stored(db, target_id, data_source="google_trends_5y"):
+    db.expire_all()
+    return [(row.timestamp, float(row.attention_score)) for row in db.query(AttentionHistory).filter_by(
+        target_id=target_id, data_source=data_source
+    ).order_by(AttentionHistory.timestamp)]
+
+
+def test_refetched_timelines_update_only_the_revised_tail(db, make_target):
+    target = make_target()
+    first = upsert_history_points(db, target.id, "google_trends_5y", "today 5-y", WEEKS[:3], [10, 20, 30])
+    assert first == {"inserted": 3, "updated": 0, "skipped": 0}
+
+    # The next fetch overlaps: old weeks, a revised partial week and a new one
+    second = upsert_history_points(db, target.id, "google_trends_5y", "today 5-y", WEEKS, [99, 99, 35, 40])
+    assert second == {"inserted": 1, "updated": 1, "skipped": 2}
+    assert stored(db, target.id) == list(zip(WEEKS, [10.0, 20.0, 35.0, 40.0]))
+
+
+def test_unchanged_points_are_skipped_without_rewriting(db, make_target):
+    target = make_target()
+    upsert_history_points(db, target.id, "google_trends_5y", "today 5-y", WEEKS, [10, 20, 30, 40])
+
+    counts = upsert_history_points(db, target.id, "google_trends_5y", "today 5-y", WEEKS[-1:], [40])
+    assert counts == {"inserted": 0, "updated": 0, "skipped": 1}
+
+
+def test_duplicate_timestamps_in_one_timeline_keep_the_last_value(db, make_target):
+    target = make_target()
+    aware = WEEKS[0].replace(tzinfo=timezone.utc)
+    counts = upsert_history_points(db, target.id, "google_trends_5y", "today 5-y", [aware, WEEKS[0]], [10, 12])
+
+    assert counts == {"inserted": 1, "updated": 0, "skipped": 1}
+    assert stored(db, target.id) == [(WEEKS[0], 12.0)]
+
+
+def test_sources_are_stored_independently(db, make_target):
+    target = make_target()
+    upsert_history_points(db, target.id, "google_trends_5y", "today 5-y", WEEKS[:2], [10, 20])
+    counts = upsert_history_points(db, target.id, "google_trends_1y", "today 12-m", WEEKS[:2], [50, 60])
+
+    assert counts["inserted"] == 2
+    assert stored(db, target.id, "google_trends_1y") == list(zip(WEEKS[:2], [50.0, 60.0]))
+    assert stored(db, target.id) == list(zip(WEEKS[:2], [10.0, 20.0]))
+
+
+def test_without_commit_the_caller_owns_the_transaction(db, make_target):
+    target = make_target()
+    upsert_history_points(db, target.id, "google_trends_5y", "today 5-y", WEEKS, [1, 2, 3, 4], commit=False)
+    db.rollback()
+    assert stored(db, target.id) == []
+
+
+def test_write_history_rows_pages_large_batches(db, make_target, monkeypatch):
+    import history_store
+
+    monkeypatch.setattr(history_store, "VALUES_PAGE_SIZE", 100)
+    target = make_target()
+    hours = [START + timedelta(hours=i) for i in range(250)]
+    rows = [(target.id, "google_trends_7d", "now 7-d", hour, float(i % 100), None, 1.0) for i, hour in enumerate(hours)]
+
+    assert history_store.write_history_rows(db, rows) == hours
+    # Rewriting identical rows touches nothing
+    assert history_store.write_history_rows(db, rows) == []
+    assert history_store.write_history_rows(db, []) == []
+    db.commit()
+    assert len(stored(db, target.id, "google_trends_7d")) == 250
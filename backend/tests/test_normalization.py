@@ -0,0 +1,95 @@
+import asyncio
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from history_store import upsert_history_points
+from models import AttentionHistory, AttentionTarget
+from normalization import apply_normalization, normalize_target, normalize_timeline, recalculate_baselines
+from seed_data import store_timeframe_data_with_real_timestamps
+
+START = datetime(2025, 1, 6)
+
+
+def write(db, target_id, source, timeframe, scores, step=timedelta(hours=1)):
+    upsert_history_points(db, target_id, source, timeframe, [START + step * i for i in range(len(scores))], scores)
+
+
+def normalized(db, target_id, timeframe):
+    db.expire_all()
+    return [float(row.normalized_score) for row in db.query(AttentionHistory).filter_by(
+        target_id=target_id, timeframe_used=timeframe
+    ).order_by(AttentionHistory.timestamp)]
+
+
+@pytest.mark.postgres
+def test_apply_normalization_scales_each_timeframe_by_its_own_peak(db, make_target):
+    target = make_target()
+    write(db, target.id, "google_trends_7d", "now 7-d", [25, 50, 100])
+    write(db, target.id, "google_trends_5y", "today 5-y", [10, 40], step=timedelta(weeks=1))
+
+    assert apply_normalization(db, target.id, 60.0) == 5
+    db.commit()
+
+    assert normalized(db, target.id, "now 7-d") == [15.0, 30.0, 60.0]
+    assert normalized(db, target.id, "today 5-y") == [15.0, 60.0]
+    # Nothing moves on a second pass, so no row is rewritten
+    assert apply_normalization(db, target.id, 60.0) == 0
+
+
+@pytest.mark.postgres
+def test_normalize_target_uses_the_seven_day_average(db, make_target):
+    target = make_target()
+    assert normalize_target(db, target.id) is None
+
+    write(db, target.id, "google_trends_7d", "now 7-d", [20, 40, 60])
+    result = normalize_target(db, target.id)
+
+    assert result == {"baseline": 40.0, "points": 3, "updated": 3}
+    db.expire_all()
+    assert float(db.get(AttentionTarget, target.id).normalization_baseline) == 40.0
+    assert normalized(db, target.id, "now 7-d") == [13.33, 26.67, 40.0]
+
+
+@pytest.mark.postgres
+def test_recalculation_renormalizes_only_targets_whose_baseline_moved(db, make_target):
+    steady = make_target("steady", normalization_baseline=40.5)
+    moved = make_target("moved", normalization_baseline=10)
+    fresh = make_target("fresh")
+    make_target("unseeded")
+    retired = make_target("retired", is_active=False)
+    for target in (steady, moved, fresh, retired):
+        write(db, target.id, "google_trends_7d", "now 7-d", [20, 40, 60])
+
+    status = recalculate_baselines(threshold=1.0, workers=2)
+
+    assert (status["targets"], status["unchanged"], status["to_renormalize"]) == (3, 1, 2)
+    assert (status["renormalized"], status["failed"], status["running"], status["percent"]) == (2, 0, False, 100.0)
+    db.expire_all()
+    baselines = {target.name: target.normalization_baseline for target in db.query(AttentionTarget)}
+    assert {name: None if value is None else float(value) for name, value in baselines.items()} == {
+        "steady": 40.5, "moved": 40.0, "fresh": 40.0, "unseeded": None, "retired": None
+    }
+    assert db.get(AttentionTarget, steady.id).baseline_calculated_at is not None
+    assert normalized(db, moved.id, "now 7-d") == [13.33, 26.67, 40.0]
+    assert db.query(AttentionHistory).filter_by(target_id=steady.id).first().normalized_score is None
+
+
+def test_normalize_timeline_uses_one_peak_for_the_whole_array():
+    assert normalize_timeline([25, 50, 100], 40) == [10.0, 20.0, 40.0]
+    assert normalize_timeline([0, 0], 40) == [0.0, 0.0]
+    assert normalize_timeline([10, 20], None) is None
+    assert normalize_timeline([], 40) is None
+
+
+@pytest.mark.postgres
+def test_ingested_timelines_need_no_renormalization(db, make_target):
+    target = make_target(normalization_baseline=30)
+    data = {"timeline": [12, 48, 96, 60],
+            "timeline_timestamps": [(START + timedelta(days=i)).replace(tzinfo=timezone.utc) for i in range(4)]}
+
+    counts = asyncio.run(store_timeframe_data_with_real_timestamps(target, data, "1m", "today 1-m", db))
+
+    assert counts == {"inserted": 4, "updated": 0, "skipped": 0}
+    assert normalized(db, target.id, "today 1-m") == [3.75, 15.0, 30.0, 18.75]
+    assert apply_normalization(db, target.id, 30.0) == 0
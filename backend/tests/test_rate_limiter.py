@@ -0,0 +1,147 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+import trends_rate_limiter
+from trends_rate_limiter import (DECREASE_WINDOW, MIN_RATE_PER_MINUTE, PROBE_TIMEOUT, CircuitBreaker,
+                                 CircuitOpenError, PostgresTokenBucketLimiter, Priority, TokenBucketLimiter)
+
+
+def test_waiters_are_served_by_priority_then_arrival():
+    async def scenario():
+        limiter = TokenBucketLimiter(rate_per_minute=600, burst=1)
+        await limiter.acquire(Priority.BACKGROUND)  # Empties the bucket
+        order = []
+
+        async def request(name, priority):
+            await limiter.acquire(priority)
+            order.append(name)
+
+        tasks = []
+        for name, priority in [("seed", Priority.SEEDING), ("bg-1", Priority.BACKGROUND),
+                               ("user", Priority.INTERACTIVE), ("bg-2", Priority.BACKGROUND)]:
+            tasks.append(asyncio.create_task(request(name, priority)))
+            await asyncio.sleep(0)  # Queue them in this order
+        await asyncio.gather(*tasks)
+        return order, limiter.stats()
+
+    order, stats = asyncio.run(scenario())
+
+    assert order == ["user", "bg-1", "bg-2", "seed"]
+    assert stats["granted"] == {"interactive": 1, "background": 3, "seeding": 1}
+    assert stats["waiting"] == 0
+
+
+def test_cancelled_waiter_does_not_block_the_queue():
+    async def scenario():
+        limiter = TokenBucketLimiter(rate_per_minute=600, burst=1)
+        await limiter.acquire()
+        cancelled = asyncio.create_task(limiter.acquire(Priority.INTERACTIVE))
+        await asyncio.sleep(0)
+        cancelled.cancel()
+        await asyncio.wait_for(limiter.acquire(Priority.SEEDING), timeout=1)
+        return cancelled
+
+    assert asyncio.run(scenario()).cancelled()
+
+
+@pytest.mark.postgres
+def test_shared_bucket_keeps_a_reserve_for_higher_priorities(pg_engine):
+    limiter = PostgresTokenBucketLimiter(rate_per_minute=0.01, burst=2, key="test-reserve")
+
+    assert limiter._take_blocking(Priority.BACKGROUND) == 0.0
+    # One token left: background must leave it for interactive requests
+    assert limiter._take_blocking(Priority.BACKGROUND) > 0.0
+    assert limiter._take_blocking(Priority.INTERACTIVE) == 0.0
+    assert limiter._take_blocking(Priority.INTERACTIVE) > 0.0
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """A manual monotonic clock for the limiter module"""
+    clock = SimpleNamespace(now=1000.0)
+    monkeypatch.setattr(trends_rate_limiter, "time", SimpleNamespace(monotonic=lambda: clock.now))
+    return clock
+
+
+def test_breaker_opens_probes_and_closes(clock):
+    breaker = CircuitBreaker(threshold=2, cooldown=60)
+    assert breaker.on_throttled() is None
+    assert breaker.on_throttled() == CircuitBreaker.OPEN
+
+    with pytest.raises(CircuitOpenError) as error:
+        breaker.before_request()
+    assert error.value.retry_after == 60
+
+    clock.now += 60
+    assert breaker.before_request() is True  # The probe
+    with pytest.raises(CircuitOpenError):
+        breaker.before_request()  # Only one probe in flight
+
+    assert breaker.on_success() == CircuitBreaker.CLOSED
+    assert breaker.before_request() is False
+    assert breaker.trips == 1
+
+
+def test_failed_probe_doubles_the_cooldown(clock):
+    breaker = CircuitBreaker(threshold=1, cooldown=60)
+    breaker.on_throttled()
+    clock.now += 60
+    breaker.before_request()
+
+    assert breaker.on_throttled() == CircuitBreaker.OPEN
+    assert breaker.cooldown == 120
+    assert breaker.retry_after() == 120
+
+    clock.now += 120
+    breaker.before_request()
+    breaker.on_success()
+    assert breaker.cooldown == 60
+
+
+def test_lost_probe_frees_the_slot_after_a_timeout(clock):
+    breaker = CircuitBreaker(threshold=1, cooldown=60)
+    breaker.on_throttled()
+    clock.now += 60
+    breaker.before_request()
+
+    clock.now += PROBE_TIMEOUT
+    assert breaker.before_request() is True
+
+
+def test_rate_halves_once_per_window_and_recovers_additively(clock):
+    limiter = TokenBucketLimiter(rate_per_minute=12, burst=3)
+    limiter.breaker = CircuitBreaker(threshold=10)
+
+    limiter.record_throttled()
+    limiter.record_throttled()  # Same window: requests already in flight
+    assert limiter.rate * 60 == pytest.approx(6)
+
+    clock.now += DECREASE_WINDOW
+    limiter.record_throttled()
+    assert limiter.rate * 60 == pytest.approx(3)
+
+    for _ in range(20):
+        limiter.record_success()
+    assert limiter.rate * 60 == pytest.approx(12)
+    assert [event["event"] for event in limiter.history] == ["decrease", "decrease", "recovered"]
+
+
+def test_rate_never_drops_below_the_floor(clock):
+    limiter = TokenBucketLimiter(rate_per_minute=12, burst=3)
+    limiter.breaker = CircuitBreaker(threshold=100)
+    for _ in range(10):
+        clock.now += DECREASE_WINDOW
+        limiter.record_throttled()
+    assert limiter.rate * 60 == pytest.approx(MIN_RATE_PER_MINUTE)
+
+
+def test_open_breaker_rejects_acquire(clock):
+    limiter = TokenBucketLimiter(rate_per_minute=12, burst=3)
+    limiter.breaker = CircuitBreaker(threshold=1, cooldown=30)
+    limiter.record_throttled()
+
+    with pytest.raises(CircuitOpenError):
+        asyncio.run(limiter.acquire())
+    assert limiter.retry_after() == 30
@@ -0,0 +1,76 @@
+from datetime import datetime, timedelta, timezone
+from decimal import Decimal
+
+import pytest
+
+from refresh_scheduler import RETRY_AFTER_FAILURE, VOLATILITY_SOURCE, RefreshScheduler, TargetSchedule
+
+
+def make_scheduler(monkeypatch, targets, stakes=None, volatility=None, subscribers=None):
+    scheduler = RefreshScheduler(websocket_manager=type("Manager", (), {"target_subscribers": subscribers or {}})(),
+                                 min_interval=60, max_interval=1800)
+    monkeypatch.setattr(scheduler, "_load_signals", lambda: (targets, stakes or {}, volatility or {}))
+    scheduler.reload()
+    return scheduler
+
+
+def test_importance_grows_with_stake_watchers_and_volatility():
+    idle = TargetSchedule(1, "idle")
+    busy = TargetSchedule(2, "busy")
+    busy.stake, busy.subscribers, busy.volatility = 10_000.0, 100, 8.0
+
+    assert idle.importance == 1.0
+    # Watchers are capped, so a crowd cannot starve every other target
+    assert busy.importance == pytest.approx(1.0 + 4.6151 + 10.0 + 2.0, abs=1e-3)
+
+
+def test_intervals_are_clamped_and_due_targets_pop_most_overdue_first(monkeypatch):
+    now = datetime.now(timezone.utc)
+    targets = [
+        (1, "idle", now - timedelta(minutes=10)),
+        (2, "watched", now - timedelta(minutes=10)),
+        (3, "stale", now - timedelta(hours=2)),
+    ]
+    scheduler = make_scheduler(monkeypatch, targets, subscribers={2: {"a", "b", "c", "d", "e", "f"}})
+
+    assert scheduler.targets[1].interval == 1800
+    assert scheduler.targets[2].interval == pytest.approx(1800 / 11)
+    assert scheduler.next_due(budget=1) == [3]
+    assert scheduler.next_due(budget=5) == [2]
+    assert scheduler.next_due(budget=5) == []
+
+
+def test_failed_targets_wait_before_being_retried(monkeypatch):
+    updated = datetime.now(timezone.utc) - timedelta(hours=1)
+    scheduler = make_scheduler(monkeypatch, [(1, "target", updated)])
+
+    assert scheduler.next_due(budget=1) == [1]
+    scheduler.reload()  # last_updated did not move
+    scheduler.record_results([1])
+
+    assert scheduler.targets[1].failures == 1
+    assert scheduler.next_due(budget=1) == []
+    assert scheduler.seconds_until_next() == pytest.approx(RETRY_AFTER_FAILURE, abs=2)
+
+
+@pytest.mark.postgres
+def test_volatility_comes_from_the_realtime_series_only(db, make_target):
+    from models import AttentionHistory
+
+    calm, jumpy = make_target("calm"), make_target("jumpy")
+    now = datetime.now(timezone.utc).replace(tzinfo=None)
+    for minutes, (realtime, weekly) in enumerate([(10, 0), (90, 100), (10, 0), (90, 100)]):
+        timestamp = now - timedelta(minutes=minutes)
+        db.add_all([
+            AttentionHistory(target_id=jumpy.id, attention_score=Decimal(realtime), data_source=VOLATILITY_SOURCE,
+                             timestamp=timestamp),
+            # A different scale on another timeframe must not count as volatility
+            AttentionHistory(target_id=calm.id, attention_score=Decimal(weekly), data_source="google_trends_5y",
+                             timestamp=timestamp),
+        ])
+    db.commit()
+
+    volatility = RefreshScheduler()._load_volatility(db)
+
+    assert set(volatility) == {jumpy.id}
+    assert volatility[jumpy.id] == pytest.approx(46.188, abs=1e-3)
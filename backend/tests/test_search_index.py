@@ -0,0 +1,46 @@
+import random
+
+import pytest
+
+from search_index import CategoryIndex
+
+NAMES = [
+    "Joe Biden", "Joey Chestnut", "Bill Gates", "Barack Obama", "Michelle Obama",
+    "Elon Musk", "Johnson & Johnson", "Boris Johnson", "Magic Johnson", "Joan Baez",
+    "joe rogan", "Bitcoin", "Bitcoin Cash", "Ethereum", "Ethereum Classic",
+]
+
+
+def linear_search(names, query_lower, limit):
+    """The scan the index replaces: prefix hits, then substring hits, both in CSV order"""
+    lower = [name.lower() for name in names]
+    prefix = [i for i, name in enumerate(lower) if name.startswith(query_lower)]
+    contains = [i for i, name in enumerate(lower) if query_lower in name and not name.startswith(query_lower)]
+    return (prefix + contains)[:limit]
+
+
+@pytest.fixture(scope="module")
+def index():
+    return CategoryIndex.build(NAMES)
+
+
+@pytest.mark.parametrize("query", ["jo", "joe", "john", "obama", "bit", "eth", "ereum", "s", "zz", "n & j"])
+@pytest.mark.parametrize("limit", [1, 3, 10, 100])
+def test_search_matches_linear_scan(index, query, limit):
+    expected = linear_search(NAMES, query, limit) if len(query) >= 2 else []
+    assert index.search(query, limit) == expected
+
+
+def test_search_matches_linear_scan_on_random_names():
+    rng = random.Random(7)
+    names = ["".join(rng.choice("abcde ") for _ in range(rng.randint(2, 12))) for _ in range(500)]
+    index = CategoryIndex.build(names)
+    for _ in range(200):
+        query = "".join(rng.choice("abcde") for _ in range(rng.randint(2, 4)))
+        assert index.search(query, 20) == linear_search(names, query, 20)
+
+
+def test_prefix_range_covers_exactly_the_prefix_matches(index):
+    span = index.prefix_range("joe")
+    matched = sorted(index.sorted_ids[span.start:span.stop].tolist())
+    assert matched == [i for i, name in enumerate(NAMES) if name.lower().startswith("joe")]
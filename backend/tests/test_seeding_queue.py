@@ -0,0 +1,148 @@
+from datetime import datetime, timedelta, timezone
+from decimal import Decimal
+
+import pytest
+
+from models import AttentionHistory, SeedingJob
+from seeding_queue import (LEASE_SECONDS, RETRY_BASE_SECONDS, SEEDING_TIMEFRAMES, claim_next_job,
+                           enqueue_seeding, enqueue_unseeded_targets, finish_job, renew_lease)
+
+pytestmark = pytest.mark.postgres
+
+
+def make_due(db, **filters):
+    db.query(SeedingJob).filter_by(**filters).update(
+        {SeedingJob.not_before: datetime.now(timezone.utc) - timedelta(minutes=1)}, synchronize_session=False
+    )
+    db.commit()
+
+
+def job(db, job_id) -> SeedingJob:
+    db.expire_all()
+    return db.get(SeedingJob, job_id)
+
+
+def test_enqueue_keeps_existing_jobs(db, make_target):
+    target = make_target("bitcoin")
+    assert enqueue_seeding(db, target.id, target.search_term) == len(SEEDING_TIMEFRAMES)
+    assert enqueue_seeding(db, target.id, target.search_term) == 0
+
+
+def test_claim_takes_due_jobs_once_and_skips_locked_rows(db, make_target, pg_engine):
+    from database import SessionLocal
+
+    target = make_target("bitcoin")
+    enqueue_seeding(db, target.id, target.search_term)
+    assert claim_next_job("worker-1") is None  # Nothing is due yet
+
+    make_due(db, timeframe_name="7d")
+    make_due(db, timeframe_name="1m")
+
+    # Another worker is in the middle of claiming the most overdue job
+    other = SessionLocal()
+    try:
+        locked_id = other.query(SeedingJob).filter_by(timeframe_name="7d").with_for_update().one().id
+        claimed = claim_next_job("worker-1")
+        assert claimed["timeframe_name"] == "1m"
+        assert claim_next_job("worker-1") is None
+    finally:
+        other.rollback()
+        other.close()
+
+    claimed = claim_next_job("worker-2")
+    assert claimed["id"] == locked_id
+    stored = job(db, locked_id)
+    assert (stored.status, stored.attempts, stored.locked_by) == ("running", 1, "worker-2")
+
+
+def test_failures_back_off_exponentially_until_max_attempts(db, make_target):
+    target = make_target("bitcoin")
+    enqueue_seeding(db, target.id, target.search_term)
+    make_due(db, timeframe_name="7d")
+
+    claimed = claim_next_job("worker")
+    finish_job(claimed["id"], "HTTP 500")
+    first = job(db, claimed["id"])
+    delay = first.not_before - datetime.now(timezone.utc)
+    assert first.status == "pending" and first.locked_by is None
+    assert timedelta(seconds=RETRY_BASE_SECONDS - 5) < delay <= timedelta(seconds=RETRY_BASE_SECONDS)
+
+    make_due(db, id=claimed["id"])
+    claim_next_job("worker")
+    finish_job(claimed["id"], "HTTP 500")
+    delay = job(db, claimed["id"]).not_before - datetime.now(timezone.utc)
+    assert timedelta(seconds=2 * RETRY_BASE_SECONDS - 5) < delay <= timedelta(seconds=2 * RETRY_BASE_SECONDS)
+
+    db.query(SeedingJob).filter_by(id=claimed["id"]).update({SeedingJob.attempts: 4})
+    db.commit()
+    make_due(db, id=claimed["id"])
+    assert claim_next_job("worker")["attempts"] == 5
+    finish_job(claimed["id"], "HTTP 500")
+    assert (job(db, claimed["id"]).status, job(db, claimed["id"]).last_error) == ("failed", "HTTP 500")
+
+
+def test_throttled_jobs_are_rescheduled_without_using_an_attempt(db, make_target):
+    target = make_target("bitcoin")
+    enqueue_seeding(db, target.id, target.search_term)
+    make_due(db, timeframe_name="7d")
+
+    claimed = claim_next_job("worker")
+    finish_job(claimed["id"], "Circuit breaker open", retry_after=90)
+
+    stored = job(db, claimed["id"])
+    assert (stored.status, stored.attempts) == ("pending", 0)
+    assert stored.not_before - datetime.now(timezone.utc) <= timedelta(seconds=90)
+
+    make_due(db, id=claimed["id"])
+    claim_next_job("worker")
+    finish_job(claimed["id"])
+    stored = job(db, claimed["id"])
+    assert (stored.status, stored.last_error) == ("done", None)
+    assert stored.completed_at is not None
+
+
+def test_expired_leases_are_reclaimed_and_renewals_keep_them(db, make_target):
+    target = make_target("bitcoin")
+    enqueue_seeding(db, target.id, target.search_term)
+    make_due(db, timeframe_name="7d")
+    claimed = claim_next_job("crashed")
+
+    assert renew_lease(claimed["id"], "crashed")
+    assert not renew_lease(claimed["id"], "someone-else")
+    assert claim_next_job("worker") is None  # The lease is still fresh
+
+    db.query(SeedingJob).filter_by(id=claimed["id"]).update(
+        {SeedingJob.locked_at: datetime.now(timezone.utc) - timedelta(seconds=LEASE_SECONDS + 1)}
+    )
+    db.commit()
+    reclaimed = claim_next_job("worker")
+    assert (reclaimed["id"], reclaimed["attempts"]) == (claimed["id"], 2)
+    assert not renew_lease(claimed["id"], "crashed")
+
+
+def test_expired_lease_on_the_last_attempt_fails_the_job(db, make_target):
+    target = make_target("bitcoin")
+    enqueue_seeding(db, target.id, target.search_term)
+    db.query(SeedingJob).filter_by(timeframe_name="7d").update({
+        SeedingJob.status: "running",
+        SeedingJob.attempts: 5,
+        SeedingJob.locked_at: datetime.now(timezone.utc) - timedelta(seconds=LEASE_SECONDS + 1),
+    })
+    db.commit()
+
+    assert claim_next_job("worker") is None
+    stored = db.query(SeedingJob).filter_by(timeframe_name="7d").one()
+    assert (stored.status, stored.last_error) == ("failed", "Worker lease expired")
+
+
+def test_existing_targets_are_queued_for_missing_timeframes_only(db, make_target, pg_engine):
+    seeded = make_target("bitcoin")
+    make_target("retired", is_active=False)
+    db.add(AttentionHistory(target_id=seeded.id, attention_score=Decimal("50"), data_source="google_trends_1m",
+                            timestamp=datetime(2025, 1, 1)))
+    db.commit()
+
+    assert enqueue_unseeded_targets(pg_engine) == len(SEEDING_TIMEFRAMES) - 1
+    assert enqueue_unseeded_targets(pg_engine) == 0
+    queued = {name for (name,) in db.query(SeedingJob.timeframe_name).filter_by(target_id=seeded.id)}
+    assert queued == {name for _code, name, _offset in SEEDING_TIMEFRAMES} - {"1m"}
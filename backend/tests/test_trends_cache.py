@@ -0,0 +1,181 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+import google_trends_service
+import trends_cache
+from google_trends_service import GoogleTrendsService, SharedFetchServices
+from trends_cache import ExploreTokenCache, TrendsResponseCache, token_ttl
+from trends_rate_limiter import Priority
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """A manual monotonic clock for the cache module"""
+    clock = SimpleNamespace(now=1000.0)
+    monkeypatch.setattr(trends_cache, "time", SimpleNamespace(monotonic=lambda: clock.now))
+    return clock
+
+
+def test_token_ttl_follows_the_timeframe_resolution():
+    assert token_ttl("now 1-H") == 60
+    assert token_ttl("now 1-d") == 480
+    assert token_ttl("today 5-y") == trends_cache.TRENDS_TOKEN_TTL
+    assert token_ttl(["now 1-d", "now 7-d"]) == 60
+
+
+def test_explore_tokens_expire_after_their_ttl(clock):
+    cache = ExploreTokenCache()
+    key = (None, '{"comparisonItem": "bitcoin"}')
+    widgets = [{"id": "TIMESERIES", "token": "abc"}]
+    cache.put(key, widgets, ttl=60)
+
+    clock.now += 59
+    assert cache.get(key) == widgets
+    clock.now += 1
+    assert cache.get(key) is None
+    assert cache.stats() == {"size": 0, "hits": 1, "misses": 1, "rejections": 0, "hit_rate": 0.5}
+
+
+def test_rejected_tokens_are_dropped(clock):
+    cache = ExploreTokenCache()
+    cache.put(("proxy", "request"), [{"token": "old"}], ttl=3600)
+    cache.reject(("proxy", "request"))
+    cache.reject(("proxy", "request"))
+
+    assert cache.get(("proxy", "request")) is None
+    assert cache.stats()["rejections"] == 1
+
+
+def test_full_cache_purges_expired_then_oldest_entries(clock):
+    cache = ExploreTokenCache(max_size=2)
+    cache.put("short", [], ttl=10)
+    cache.put("long", [], ttl=100)
+    clock.now += 20
+    cache.put("new", [], ttl=100)
+    assert set(cache._entries) == {"long", "new"}
+
+    cache.put("newest", [], ttl=100)
+    assert set(cache._entries) == {"new", "newest"}
+
+
+def test_concurrent_identical_fetches_share_one_request():
+    cache = TrendsResponseCache(ttl=60)
+    calls = []
+
+    async def fetcher(priority):
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        return {"success": True, "timeline": [1, 2, 3]}
+
+    async def scenario():
+        key = cache.key(" bitcoin ", "now 1-d", ["US"])
+        results = await asyncio.gather(*(cache.fetch(key, fetcher) for _ in range(5)))
+        results[0]["timeline"].append(4)  # Callers get their own copy
+        return results, await cache.fetch(key, fetcher)
+
+    results, cached = asyncio.run(scenario())
+
+    assert len(calls) == 1
+    assert all(result["timeline"] == [1, 2, 3] for result in results[1:])
+    assert cached["timeline"] == [1, 2, 3]
+    stats = cache.stats()
+    assert (stats["fetches"], stats["coalesced"], stats["hits"], stats["in_flight"]) == (1, 4, 1, 0)
+
+
+def test_a_cancelled_caller_does_not_cancel_the_shared_fetch():
+    cache = TrendsResponseCache(ttl=60)
+
+    async def fetcher(priority):
+        await asyncio.sleep(0.02)
+        return {"success": True}
+
+    async def scenario():
+        impatient = asyncio.create_task(cache.fetch(("term", "now 1-d", ""), fetcher))
+        patient = asyncio.create_task(cache.fetch(("term", "now 1-d", ""), fetcher))
+        await asyncio.sleep(0.005)
+        impatient.cancel()
+        return await patient
+
+    assert asyncio.run(scenario()) == {"success": True}
+    assert cache.stats()["fetches"] == 1
+
+
+def test_failures_are_shared_but_not_cached():
+    cache = TrendsResponseCache(ttl=60)
+    calls = []
+
+    async def fetcher(priority):
+        calls.append(1)
+        return {"success": False, "error": "429"}
+
+    async def scenario():
+        await asyncio.gather(cache.fetch(("t", "x", ""), fetcher), cache.fetch(("t", "x", ""), fetcher))
+        return await cache.fetch(("t", "x", ""), fetcher)
+
+    assert asyncio.run(scenario())["success"] is False
+    assert len(calls) == 2
+
+
+def test_only_callers_at_the_flight_priority_or_lower_join_it():
+    cache = TrendsResponseCache(ttl=60)
+    started = []
+
+    async def fetcher(priority):
+        started.append(priority)
+        await asyncio.sleep(0.01)
+        return {"success": True, "priority": priority}
+
+    async def scenario():
+        key = ("term", "now 1-d", "")
+        background = asyncio.create_task(cache.fetch(key, fetcher, Priority.BACKGROUND))
+        await asyncio.sleep(0)
+        interactive = asyncio.create_task(cache.fetch(key, fetcher, Priority.INTERACTIVE))
+        await asyncio.sleep(0)
+        seeding = asyncio.create_task(cache.fetch(key, fetcher, Priority.SEEDING))
+        return await asyncio.gather(background, interactive, seeding)
+
+    background, interactive, seeding = asyncio.run(scenario())
+
+    assert started == [Priority.BACKGROUND, Priority.INTERACTIVE]
+    assert background["priority"] == Priority.BACKGROUND
+    assert interactive["priority"] == Priority.INTERACTIVE
+    assert seeding["priority"] == Priority.INTERACTIVE  # Joined the most urgent flight
+    assert cache.stats()["in_flight"] == 0
+
+
+def test_the_shared_fetch_survives_the_caller_that_started_it(monkeypatch):
+    monkeypatch.setattr(google_trends_service, "trends_response_cache", TrendsResponseCache(ttl=60))
+    shared = SharedFetchServices()
+    monkeypatch.setattr(google_trends_service, "shared_fetch_services", shared)
+    fetched_on = []
+
+    async def get_trend_score(self, search_term, timeframe="now 7-d", geo=""):
+        fetched_on.append(self)
+        await asyncio.sleep(0.02)
+        return {"success": True, "score": 42, "closed": self.session is False}
+
+    async def close(self):
+        self.session = False
+
+    monkeypatch.setattr(GoogleTrendsService, "get_trend_score", get_trend_score)
+    monkeypatch.setattr(GoogleTrendsService, "close", close)
+
+    async def scenario():
+        first = GoogleTrendsService()
+        second = GoogleTrendsService()
+        starter = asyncio.create_task(first.get_google_trends_data("bitcoin"))
+        await asyncio.sleep(0.005)
+        waiter = asyncio.create_task(second.get_google_trends_data("bitcoin"))
+        await asyncio.sleep(0.005)
+        await first.close()
+        starter.cancel()
+        return first, second, await waiter
+
+    first, second, result = asyncio.run(scenario())
+
+    assert result["success"] is True and result["score"] == 42
+    assert result["closed"] is False
+    assert len(fetched_on) == 1 and fetched_on[0] not in (first, second)
+    assert shared._idle[(False, None)] == fetched_on  # Returned for reuse
@@ -0,0 +1,46 @@
+import asyncio
+from contextlib import asynccontextmanager
+
+import trends_pool
+from trends_pool import EVICT_AFTER_FAILURES, SessionHealth, TrendsFetchPool
+
+
+def test_session_health_counts_consecutive_failed_items():
+    health = SessionHealth(0, None)
+    for _ in range(EVICT_AFTER_FAILURES - 1):
+        health.record(0, 2)
+    assert health.healthy
+
+    health.record(1, 2)  # A partial success resets the streak
+    assert (health.successes, health.failures, health.consecutive_failures) == (1, 2 * (EVICT_AFTER_FAILURES - 1) + 1, 0)
+
+    for _ in range(EVICT_AFTER_FAILURES):
+        health.record(0, 1)
+    assert not health.healthy
+
+
+def test_failed_items_are_retried_on_another_session(monkeypatch):
+    monkeypatch.setattr(trends_pool, "TRENDS_BATCH_MODE", False)
+    pool = TrendsFetchPool(size=2, proxies=[])
+    processed = []
+
+    @asynccontextmanager
+    async def fake_service(health):
+        health.generation += 1
+        yield health.slot
+
+    async def fake_process(slot, target_ids):
+        await asyncio.sleep(0.01)
+        processed.append((slot, target_ids[0]))
+        return 0 if slot == 0 else len(target_ids)
+
+    monkeypatch.setattr(pool, "_new_service", fake_service)
+    monkeypatch.setattr(pool, "_process", fake_process)
+
+    summary = asyncio.run(pool.run_cycle([1, 2, 3, 4]))
+
+    assert summary["updated"] == 4
+    assert summary["dropped"] == 0
+    assert sorted(target for slot, target in processed if slot == 1) == [1, 2, 3, 4]
+    assert pool.health[0].successes == 0
+    assert pool.health[1].successes == 4
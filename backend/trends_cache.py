@@ -0,0 +1,196 @@
+"""
+Google Trends request caches for TrendBet
+
+ExploreTokenCache keeps the widgets (and their tokens) returned by
+/api/explore, so repeated fetches of the same keywords and timeframe
+skip straight to the multiline request. A widget describes a fixed time
+window, so entries for short timeframes expire after roughly one data
+point's resolution; tokens the multiline endpoint rejects are dropped
+and fetched again.
+
+TrendsResponseCache coalesces concurrent fetches of the same
+(term, timeframe, geo) into one upstream request and keeps successful
+results for a short TTL, so a burst of identical searches costs one
+Trends call. A caller only joins a fetch queued at its own priority or
+a more urgent one, so a user never waits behind a background or seeding
+fetch's place in the rate limiter queue. The shared fetch runs on a
+session the caller does not own (see google_trends_service), so it
+survives the caller that started it.
+"""
+
+import asyncio
+import copy
+import os
+import time
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+
+from trends_rate_limiter import Priority
+
+TRENDS_TOKEN_TTL = int(os.getenv('TRENDS_TOKEN_TTL', '3600'))
+TRENDS_RESPONSE_TTL = int(os.getenv('TRENDS_RESPONSE_TTL', '60'))
+TOKEN_CACHE_SIZE = 2048
+RESPONSE_CACHE_SIZE = 1024
+
+# Widget windows end at the time the token was issued, so a cached token
+# must not outlive the timeframe's resolution by much
+TOKEN_TTL_BY_TIMEFRAME = {
+    'now 1-H': 60,       # 1-minute points
+    'now 4-H': 60,       # 1-minute points
+    'now 1-d': 480,      # 8-minute points
+    'now 7-d': 3600,     # Hourly points
+}
+
+
+def token_ttl(timeframe) -> int:
+    if not isinstance(timeframe, str):
+        return min(TRENDS_TOKEN_TTL, 60)
+    return min(TRENDS_TOKEN_TTL, TOKEN_TTL_BY_TIMEFRAME.get(timeframe, TRENDS_TOKEN_TTL))
+
+
+class ExploreTokenCache:
+    """
+    Explore widgets keyed by (egress proxy, explore request).
+
+    The explore request string already encodes the keywords, timeframe,
+    geo, category and property, so it identifies the widgets exactly.
+    """
+
+    def __init__(self, max_size: int = TOKEN_CACHE_SIZE):
+        self.max_size = max_size
+        self._entries: Dict[Tuple, Tuple[float, List[Dict]]] = {}
+        self.hits = 0
+        self.misses = 0
+        self.rejections = 0
+
+    def get(self, key: Tuple) -> Optional[List[Dict]]:
+        entry = self._entries.get(key)
+        if entry is not None and entry[0] > time.monotonic():
+            self.hits += 1
+            return entry[1]
+        if entry is not None:
+            del self._entries[key]
+        self.misses += 1
+        return None
+
+    def put(self, key: Tuple, widgets: List[Dict], ttl: int):
+        if ttl <= 0:
+            return
+        if len(self._entries) >= self.max_size:
+            self._purge()
+        self._entries[key] = (time.monotonic() + ttl, widgets)
+
+    def reject(self, key: Tuple):
+        """The multiline endpoint refused a cached token"""
+        if self._entries.pop(key, None) is not None:
+            self.rejections += 1
+
+    def _purge(self):
+        now = time.monotonic()
+        for key in [key for key, (expires, _widgets) in self._entries.items() if expires <= now]:
+            del self._entries[key]
+        # Still full: drop the oldest insertions (dicts keep insertion order)
+        while len(self._entries) >= self.max_size:
+            del self._entries[next(iter(self._entries))]
+
+    def stats(self) -> Dict:
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "rejections": self.rejections,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+        }
+
+
+explore_token_cache = ExploreTokenCache()
+
+
+class TrendsResponseCache:
+    """
+    Single-flight fetches plus a short-TTL cache of successful results.
+
+    The first caller for a key starts the fetch; everyone who asks for the
+    same key at the same or a lower priority while it is in flight awaits
+    the same task. A more urgent caller starts its own fetch at its own
+    priority, which later callers join instead. Each caller gets its own
+    copy of the result, since callers add fields to it.
+    """
+
+    def __init__(self, ttl: int = TRENDS_RESPONSE_TTL, max_size: int = RESPONSE_CACHE_SIZE):
+        self.ttl = ttl
+        self.max_size = max_size
+        self._results: Dict[Tuple, Tuple[float, Dict]] = {}
+        self._in_flight: Dict[Tuple, Tuple[Priority, asyncio.Task]] = {}
+        self.hits = 0
+        self.coalesced = 0
+        self.fetches = 0
+
+    @staticmethod
+    def key(search_term: str, timeframe: str, geo) -> Tuple:
+        if isinstance(geo, list):
+            geo = ','.join(geo)
+        return (search_term.strip(), timeframe, geo or '')
+
+    def get(self, key: Tuple) -> Optional[Dict]:
+        entry = self._results.get(key)
+        if entry is None:
+            return None
+        if entry[0] <= time.monotonic():
+            del self._results[key]
+            return None
+        return copy.deepcopy(entry[1])
+
+    def put(self, key: Tuple, result: Dict):
+        if self.ttl <= 0 or not result.get('success'):
+            return
+        if len(self._results) >= self.max_size:
+            now = time.monotonic()
+            for stale in [k for k, (expires, _result) in self._results.items() if expires <= now]:
+                del self._results[stale]
+            while len(self._results) >= self.max_size:
+                del self._results[next(iter(self._results))]
+        self._results[key] = (time.monotonic() + self.ttl, copy.deepcopy(result))
+
+    async def fetch(self, key: Tuple, fetcher: Callable[[Priority], Awaitable[Dict]],
+                    priority: Priority = Priority.BACKGROUND) -> Dict:
+        """Result for key; fetcher(priority) must not depend on the calling service's lifetime"""
+        cached = self.get(key)
+        if cached is not None:
+            self.hits += 1
+            return cached
+
+        flight = self._in_flight.get(key)
+        if flight is not None and flight[0] <= priority:
+            self.coalesced += 1
+            task = flight[1]
+        else:
+            self.fetches += 1
+            task = asyncio.ensure_future(fetcher(priority))
+            self._in_flight[key] = (priority, task)
+            task.add_done_callback(lambda done: self._finish(key, done))
+        # Shielded so one caller giving up does not cancel the fetch for the others
+        result = await asyncio.shield(task)
+        return copy.deepcopy(result)
+
+    def _finish(self, key: Tuple, task: asyncio.Task):
+        # A more urgent fetch may have taken the key over meanwhile
+        flight = self._in_flight.get(key)
+        if flight is not None and flight[1] is task:
+            del self._in_flight[key]
+        if not task.cancelled() and task.exception() is None:
+            self.put(key, task.result())
+
+    def stats(self) -> Dict:
+        requests = self.hits + self.coalesced + self.fetches
+        return {
+            "size": len(self._results),
+            "in_flight": len(self._in_flight),
+            "hits": self.hits,
+            "coalesced": self.coalesced,
+            "fetches": self.fetches,
+            "saved_rate": round((self.hits + self.coalesced) / requests, 3) if requests else 0.0,
+        }
+
+
+trends_response_cache = TrendsResponseCache()
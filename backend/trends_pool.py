@@ -0,0 +1,229 @@
+"""
+Concurrent Google Trends fetch pool for TrendBet
+
+Runs N independent GoogleTrendsService sessions, each with its own
+cookie jar, user agent and (optionally) proxy / Tor circuit. Sessions
+behind the same egress IP draw from one shared rate limiter bucket.
+Sessions pull work from a shared asyncio queue, so cycle time shrinks
+with the session count instead of growing linearly with the number of
+targets. Each session's health is tracked, and sessions that
+keep failing (usually because Google blocked them) are evicted and
+replaced with a fresh one after a cooldown.
+"""
+
+import asyncio
+import logging
+import os
+import time
+from datetime import datetime, timezone
+from typing import Dict, List, Optional
+
+from database import SessionLocal
+from google_trends_service import TRENDS_BATCH_MODE, TRENDS_BATCH_SIZE, GoogleTrendsService
+from models import AttentionTarget
+from trends_rate_limiter import Priority, get_rate_limiter
+
+logger = logging.getLogger(__name__)
+
+TRENDS_POOL_SIZE = max(1, int(os.getenv('TRENDS_POOL_SIZE', '1')))
+# Comma-separated HTTP proxies assigned to sessions round-robin, e.g. several
+# Tor HTTPTunnelPorts (or one with IsolateSOCKSAuth) for separate circuits
+TRENDS_POOL_PROXIES = [p.strip() for p in os.getenv('TRENDS_POOL_PROXIES', '').split(',') if p.strip()]
+
+EVICT_AFTER_FAILURES = 3     # Consecutive failed work items before a session is evicted
+EVICTION_COOLDOWN = 120      # Seconds before an evicted slot opens a new session
+MAX_ITEM_ATTEMPTS = 2        # Work items are retried once on another session
+
+
+class SessionHealth:
+    """Success/failure counters for one pool slot"""
+
+    def __init__(self, slot: int, proxy: Optional[str]):
+        self.slot = slot
+        self.proxy = proxy
+        self.generation = 0          # Incremented every time the slot opens a new session
+        self.successes = 0
+        self.failures = 0
+        self.consecutive_failures = 0
+        self.evictions = 0
+        self.evicted_until = 0.0
+        self.last_error: Optional[str] = None
+        self.last_success: Optional[datetime] = None
+
+    @property
+    def healthy(self) -> bool:
+        return self.consecutive_failures < EVICT_AFTER_FAILURES
+
+    def record(self, updated: int, attempted: int):
+        if updated > 0:
+            self.successes += updated
+            self.consecutive_failures = 0
+            self.last_success = datetime.now(timezone.utc)
+        if updated < attempted:
+            self.failures += attempted - updated
+            if updated == 0:
+                self.consecutive_failures += 1
+
+    def to_dict(self) -> Dict:
+        return {
+            "slot": self.slot,
+            "session": self.generation,
+            "proxy": bool(self.proxy),
+            "status": "evicted" if time.monotonic() < self.evicted_until else "active",
+            "successes": self.successes,
+            "failures": self.failures,
+            "consecutive_failures": self.consecutive_failures,
+            "evictions": self.evictions,
+            "last_error": self.last_error,
+            "last_success": self.last_success.isoformat() if self.last_success else None,
+        }
+
+
+class TrendsFetchPool:
+    """
+    Pool of independent Trends sessions sharing one work queue.
+
+    Usage:
+        pool = TrendsFetchPool(size=4, websocket_manager=manager)
+        summary = await pool.run_cycle()
+    """
+
+    def __init__(self, size: int = TRENDS_POOL_SIZE, websocket_manager=None, use_tor: bool = False,
+                 proxies: Optional[List[str]] = None):
+        self.size = size
+        self.websocket_manager = websocket_manager
+        self.use_tor = use_tor
+        proxies = TRENDS_POOL_PROXIES if proxies is None else proxies
+        self.health = [
+            SessionHealth(slot, proxies[slot % len(proxies)] if proxies else None)
+            for slot in range(size)
+        ]
+
+    def _new_service(self, health: SessionHealth) -> GoogleTrendsService:
+        health.generation += 1
+        return GoogleTrendsService(
+            websocket_manager=self.websocket_manager,
+            use_tor=self.use_tor,
+            proxy=health.proxy,
+            # Spread user agents across slots and change them on every new session
+            browser_index=health.slot + health.generation,
+            priority=Priority.BACKGROUND,
+        )
+
+    @staticmethod
+    def _load_active_target_ids() -> List[int]:
+        db = SessionLocal()
+        try:
+            rows = db.query(AttentionTarget.id).filter(AttentionTarget.is_active == True).all()
+            return [row.id for row in rows]
+        finally:
+            db.close()
+
+    async def run_cycle(self, target_ids: Optional[List[int]] = None) -> Dict:
+        """Update every active target (or `target_ids`) once; returns a cycle summary"""
+        start = time.monotonic()
+        if target_ids is None:
+            target_ids = await asyncio.to_thread(self._load_active_target_ids)
+        if not target_ids:
+            logger.warning("No active targets")
+            return {"targets": 0, "updated": 0, "seconds": 0.0, "sessions": self.status()}
+
+        chunk_size = TRENDS_BATCH_SIZE if TRENDS_BATCH_MODE else 1
+        queue: asyncio.Queue = asyncio.Queue()
+        for i in range(0, len(target_ids), chunk_size):
+            queue.put_nowait((target_ids[i:i + chunk_size], 1, frozenset()))
+
+        totals = {"updated": 0, "dropped": 0}
+        workers = [asyncio.create_task(self._worker(health, queue, totals)) for health in self.health]
+        try:
+            await queue.join()
+        finally:
+            for worker in workers:
+                worker.cancel()
+            await asyncio.gather(*workers, return_exceptions=True)
+
+        summary = {
+            "targets": len(target_ids),
+            "updated": totals["updated"],
+            "dropped": totals["dropped"],
+            "seconds": round(time.monotonic() - start, 1),
+            "sessions": self.status(),
+        }
+        logger.info(f"Pool cycle: {summary['updated']}/{summary['targets']} targets updated "
+                    f"in {summary['seconds']}s with {self.size} sessions")
+        return summary
+
+    async def _worker(self, health: SessionHealth, queue: asyncio.Queue, totals: Dict):
+        """One session: pull target ids, update them, and evict itself when blocked"""
+        while True:
+            # An evicted slot waits out its cooldown before opening a new session
+            cooldown = health.evicted_until - time.monotonic()
+            if cooldown > 0:
+                await asyncio.sleep(cooldown)
+
+            try:
+                async with self._new_service(health) as service:
+                    while health.healthy:
+                        target_ids, attempt, failed_slots = await queue.get()
+                        if health.slot in failed_slots and self._has_other_active_slot(failed_slots):
+                            # Leave retries to a session that has not failed this item
+                            queue.put_nowait((target_ids, attempt, failed_slots))
+                            queue.task_done()
+                            await asyncio.sleep(0.1)
+                            continue
+
+                        try:
+                            updated = await self._process(service, target_ids)
+                        except Exception as e:
+                            health.last_error = str(e)
+                            updated = 0
+                        retry_after = get_rate_limiter(health.proxy).retry_after()
+                        if updated == 0 and retry_after > 0:
+                            # Google is throttling the whole route, not this session: wait it out
+                            queue.put_nowait((target_ids, attempt, failed_slots))
+                            queue.task_done()
+                            await asyncio.sleep(retry_after)
+                            continue
+                        health.record(updated, len(target_ids))
+                        totals["updated"] += updated
+
+                        if updated == 0 and attempt < MAX_ITEM_ATTEMPTS:
+                            queue.put_nowait((target_ids, attempt + 1, failed_slots | {health.slot}))
+                        elif updated < len(target_ids):
+                            totals["dropped"] += len(target_ids) - updated
+                        queue.task_done()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                # Session creation failed (e.g. cookie request blocked)
+                health.last_error = str(e)
+                health.consecutive_failures = EVICT_AFTER_FAILURES
+
+            health.evictions += 1
+            health.consecutive_failures = 0
+            health.evicted_until = time.monotonic() + EVICTION_COOLDOWN
+            logger.warning(f"🚫 Trends session {health.slot} evicted after repeated failures "
+                           f"- replacing in {EVICTION_COOLDOWN}s")
+
+    def _has_other_active_slot(self, excluded) -> bool:
+        now = time.monotonic()
+        return any(h.slot not in excluded and h.evicted_until <= now for h in self.health)
+
+    @staticmethod
+    async def _process(service: GoogleTrendsService, target_ids: List[int]) -> int:
+        """Update one work item with its own database session; returns targets updated"""
+        db = SessionLocal()
+        try:
+            targets = db.query(AttentionTarget).filter(AttentionTarget.id.in_(target_ids)).all()
+            if len(targets) > 1:
+                return await service.update_targets_batched(targets, db)
+            updated = 0
+            for target in targets:
+                if await service.update_target_data(target, db):
+                    updated += 1
+            return updated
+        finally:
+            db.close()
+
+    def status(self) -> List[Dict]:
+        return [health.to_dict() for health in self.health]
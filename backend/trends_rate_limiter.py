@@ -0,0 +1,389 @@
+"""
+Shared Google Trends rate limiter for TrendBet
+
+Every GoogleTrendsService in the process (background updates, /api/search,
+historical seeding, admin force-updates) draws from the same token
+bucket, so together they stay under Google's limits instead of each
+pacing itself in isolation. Waiters are served by priority: interactive
+requests jump ahead of background updates, which jump ahead of bulk
+seeding.
+
+With TRENDS_RATE_LIMIT_BACKEND=postgres the bucket lives in the
+rate_limit_buckets table and is shared by every worker process.
+Lower priorities must then leave a small token reserve, so interactive
+requests in other processes still find a token.
+
+The refill rate adapts to Google's answers (AIMD): every 429 halves it,
+every successful request adds a little back, up to
+TRENDS_RATE_PER_MINUTE. A circuit breaker stops all requests after
+repeated 429s (open), lets a single probe through after a cooldown
+(half-open), and closes again when the probe succeeds. Both adapt per
+process; the postgres bucket only shares the token count.
+"""
+
+import asyncio
+import heapq
+import itertools
+import logging
+import os
+import time
+from collections import deque
+from datetime import datetime, timezone
+from enum import IntEnum
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import text
+
+logger = logging.getLogger(__name__)
+
+TRENDS_RATE_PER_MINUTE = float(os.getenv('TRENDS_RATE_PER_MINUTE', '12'))  # One request per 5 seconds
+TRENDS_BURST = float(os.getenv('TRENDS_BURST', '3'))
+TRENDS_RATE_LIMIT_BACKEND = os.getenv('TRENDS_RATE_LIMIT_BACKEND', 'memory').lower()
+TRENDS_BREAKER_THRESHOLD = int(os.getenv('TRENDS_BREAKER_THRESHOLD', '3'))
+TRENDS_BREAKER_COOLDOWN = int(os.getenv('TRENDS_BREAKER_COOLDOWN', '60'))
+
+# AIMD tuning (requests per minute)
+MIN_RATE_PER_MINUTE = 1.0
+ADDITIVE_INCREASE = 0.5          # Added back per successful request
+MULTIPLICATIVE_DECREASE = 0.5    # Rate factor applied on a 429
+DECREASE_WINDOW = 10.0           # Seconds: 429s from requests already in flight count once
+MAX_BREAKER_COOLDOWN = 1800      # Cooldown doubles on every failed probe, up to this
+PROBE_TIMEOUT = 120.0            # A probe that never reports back frees the slot after this
+HISTORY_SIZE = 200
+
+
+class Priority(IntEnum):
+    """Lower value is served first"""
+    INTERACTIVE = 0   # A user is waiting on the response
+    BACKGROUND = 1    # Periodic score updates
+    SEEDING = 2       # Bulk historical backfill
+
+
+# Tokens each priority must leave in a shared (postgres) bucket for higher priorities
+PRIORITY_RESERVE = {Priority.INTERACTIVE: 0.0, Priority.BACKGROUND: 1.0, Priority.SEEDING: 2.0}
+
+
+class CircuitOpenError(Exception):
+    """Google is throttling this route; no requests until the breaker lets a probe through"""
+
+    def __init__(self, retry_after: float):
+        self.retry_after = retry_after
+        super().__init__(f"Circuit breaker open - Trends requests paused for {retry_after:.0f}s")
+
+
+class CircuitBreaker:
+    """closed -> (repeated 429s) -> open -> (cooldown) -> half-open -> (probe) -> closed/open"""
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, threshold: int = TRENDS_BREAKER_THRESHOLD, cooldown: float = TRENDS_BREAKER_COOLDOWN):
+        self.threshold = max(1, threshold)
+        self.base_cooldown = cooldown
+        self.cooldown = cooldown
+        self.state = self.CLOSED
+        self.consecutive_throttles = 0
+        self.opened_until = 0.0
+        self.probe_started: Optional[float] = None
+        self.trips = 0
+
+    def retry_after(self) -> float:
+        if self.state == self.OPEN:
+            return max(0.0, self.opened_until - time.monotonic())
+        if self.state == self.HALF_OPEN and self.probe_started is not None:
+            return max(0.0, self.probe_started + PROBE_TIMEOUT - time.monotonic())
+        return 0.0
+
+    def before_request(self) -> bool:
+        """Raise CircuitOpenError if no request may go out; True if this request is the probe"""
+        now = time.monotonic()
+        if self.state == self.OPEN:
+            if now < self.opened_until:
+                raise CircuitOpenError(self.opened_until - now)
+            self.state = self.HALF_OPEN
+            self.probe_started = now
+            return True
+        if self.state == self.HALF_OPEN:
+            if self.probe_started is not None and now - self.probe_started < PROBE_TIMEOUT:
+                raise CircuitOpenError(self.probe_started + PROBE_TIMEOUT - now)
+            self.probe_started = now  # Previous probe never reported back
+            return True
+        return False
+
+    def on_success(self) -> Optional[str]:
+        self.consecutive_throttles = 0
+        if self.state != self.CLOSED:
+            self.state = self.CLOSED
+            self.cooldown = self.base_cooldown
+            self.probe_started = None
+            return self.CLOSED
+        return None
+
+    def on_throttled(self) -> Optional[str]:
+        self.consecutive_throttles += 1
+        if self.state == self.HALF_OPEN:
+            self.cooldown = min(self.cooldown * 2, MAX_BREAKER_COOLDOWN)
+        elif self.state == self.OPEN or self.consecutive_throttles < self.threshold:
+            return None
+        self.state = self.OPEN
+        self.opened_until = time.monotonic() + self.cooldown
+        self.probe_started = None
+        self.trips += 1
+        return self.OPEN
+
+
+class TokenBucketLimiter:
+    """
+    Async token bucket with a priority queue of waiters.
+
+    Bookkeeping is O(1) per request (a token count and a refill timestamp);
+    waiting requests sit in a heap ordered by (priority, arrival). Callers
+    report each response with record_success / record_throttled, which
+    drive the AIMD rate and the circuit breaker.
+    """
+
+    def __init__(self, rate_per_minute: float = TRENDS_RATE_PER_MINUTE, burst: float = TRENDS_BURST,
+                 key: str = "default"):
+        self.key = key
+        self.max_rate = rate_per_minute / 60.0
+        self.min_rate = min(self.max_rate, MIN_RATE_PER_MINUTE / 60.0)
+        self.rate = self.max_rate
+        self.capacity = max(1.0, burst)
+        self.tokens = self.capacity
+        self.updated_at = time.monotonic()
+        self._waiters: List[Tuple[int, int, asyncio.Future]] = []
+        self._sequence = itertools.count()
+        self._dispatcher: Optional[asyncio.Task] = None
+        self.granted: Dict[str, int] = {priority.name.lower(): 0 for priority in Priority}
+        self.total_wait = 0.0
+        self.breaker = CircuitBreaker()
+        self.successes = 0
+        self.throttled = 0
+        self.last_decrease = 0.0
+        self.history = deque(maxlen=HISTORY_SIZE)
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+        self.updated_at = now
+
+    async def _take(self, priority: Priority) -> float:
+        """Take one token if available; returns 0, or seconds until one might be"""
+        self._refill()
+        if self.tokens >= 1.0:
+            self.tokens -= 1.0
+            return 0.0
+        return (1.0 - self.tokens) / self.rate
+
+    async def acquire(self, priority: Priority = Priority.BACKGROUND):
+        """
+        Wait for a token; higher priorities are served first.
+        
+        Raises CircuitOpenError while the breaker is open, or half-open with
+        its probe already in flight.
+        """
+        start = time.monotonic()
+        is_probe = self._check_breaker()
+        if not self._waiters and await self._take(priority) == 0.0:
+            self._record(priority, start)
+            return
+
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._waiters, (int(priority), next(self._sequence), future))
+        if self._dispatcher is None or self._dispatcher.done():
+            self._dispatcher = asyncio.create_task(self._dispatch())
+        try:
+            await future
+        except asyncio.CancelledError:
+            # Give the token back if it was granted as we were cancelled
+            if future.done() and not future.cancelled():
+                self.tokens = min(self.capacity, self.tokens + 1.0)
+            raise
+        # The breaker may have opened while we queued; only the probe goes out then
+        if self.breaker.state != CircuitBreaker.CLOSED and not is_probe:
+            raise CircuitOpenError(self.breaker.retry_after())
+        self._record(priority, start)
+
+    def _check_breaker(self) -> bool:
+        if not self.breaker.before_request():
+            return False
+        self._log_event(CircuitBreaker.HALF_OPEN)
+        logger.info(f"🔌 Trends circuit half-open - sending a probe request ({self.key})")
+        return True
+
+    def retry_after(self) -> float:
+        """Seconds until the breaker lets requests through again (0 when closed)"""
+        return self.breaker.retry_after()
+
+    @property
+    def circuit_open(self) -> bool:
+        return self.breaker.state != CircuitBreaker.CLOSED
+
+    def record_success(self):
+        """A request got a normal answer: close the breaker and add back rate"""
+        self.successes += 1
+        if self.breaker.on_success():
+            self._log_event(CircuitBreaker.CLOSED)
+            logger.info(f"✅ Trends circuit closed - Google stopped throttling ({self.key})")
+        if self.rate < self.max_rate:
+            self._set_rate(min(self.max_rate, self.rate + ADDITIVE_INCREASE / 60.0))
+            if self.rate == self.max_rate:
+                self._log_event("recovered")
+
+    def record_throttled(self):
+        """A request got a 429: halve the rate (once per window) and maybe open the breaker"""
+        self.throttled += 1
+        now = time.monotonic()
+        if now - self.last_decrease >= DECREASE_WINDOW:
+            self.last_decrease = now
+            self._set_rate(max(self.min_rate, self.rate * MULTIPLICATIVE_DECREASE))
+            self._log_event("decrease")
+            logger.warning(f"🐢 Trends rate lowered to {self.rate * 60:.1f}/min after a 429 ({self.key})")
+        if self.breaker.on_throttled():
+            self._log_event(CircuitBreaker.OPEN)
+            logger.warning(f"🚫 Trends circuit open for {self.breaker.cooldown:.0f}s "
+                           f"after repeated 429s ({self.key})")
+
+    def _set_rate(self, rate: float):
+        self._refill()  # Settle tokens earned at the old rate first
+        self.rate = rate
+
+    def _log_event(self, event: str):
+        self.history.append({
+            "time": datetime.now(timezone.utc).isoformat(),
+            "event": event,
+            "state": self.breaker.state,
+            "rate_per_minute": round(self.rate * 60, 2),
+        })
+
+    async def _dispatch(self):
+        """Hand tokens to waiters in priority order as the bucket refills"""
+        while self._waiters:
+            priority, _sequence, future = self._waiters[0]
+            if future.done():  # Cancelled while waiting
+                heapq.heappop(self._waiters)
+                continue
+            wait = await self._take(Priority(priority))
+            if wait == 0.0:
+                heapq.heappop(self._waiters)
+                future.set_result(None)
+            else:
+                await asyncio.sleep(wait)
+
+    def _record(self, priority: Priority, start: float):
+        waited = time.monotonic() - start
+        self.granted[priority.name.lower()] += 1
+        self.total_wait += waited
+        if waited > 1:
+            logger.info(f"Rate limiting: {priority.name.lower()} request waited {waited:.1f}s")
+
+    def stats(self) -> Dict:
+        self._refill()
+        granted = sum(self.granted.values())
+        return {
+            "key": self.key,
+            "backend": "memory",
+            "rate_per_minute": round(self.rate * 60, 2),
+            "max_rate_per_minute": round(self.max_rate * 60, 2),
+            "burst": self.capacity,
+            "tokens": round(self.tokens, 2),
+            "waiting": len(self._waiters),
+            "granted": dict(self.granted),
+            "average_wait_seconds": round(self.total_wait / granted, 3) if granted else 0.0,
+            "successes": self.successes,
+            "throttled": self.throttled,
+            "circuit": {
+                "state": self.breaker.state,
+                "retry_after_seconds": round(self.breaker.retry_after(), 1),
+                "consecutive_throttles": self.breaker.consecutive_throttles,
+                "cooldown_seconds": self.breaker.cooldown,
+                "trips": self.breaker.trips,
+            },
+        }
+
+
+class PostgresTokenBucketLimiter(TokenBucketLimiter):
+    """
+    Token bucket stored in Postgres so every worker process shares it.
+
+    Refill and take happen in one atomic UPDATE, so concurrent processes
+    can never overdraw the bucket.
+    """
+
+    _TAKE_SQL = text("""
+        UPDATE rate_limit_buckets
+        SET tokens = LEAST(:capacity, tokens + EXTRACT(EPOCH FROM (now() - updated_at)) * :rate) - 1,
+            updated_at = now()
+        WHERE key = :key
+          AND LEAST(:capacity, tokens + EXTRACT(EPOCH FROM (now() - updated_at)) * :rate) >= 1 + :reserve
+        RETURNING tokens
+    """)
+    _PEEK_SQL = text("""
+        SELECT LEAST(:capacity, tokens + EXTRACT(EPOCH FROM (now() - updated_at)) * :rate)
+        FROM rate_limit_buckets WHERE key = :key
+    """)
+    _CREATE_SQL = text("""
+        INSERT INTO rate_limit_buckets (key, tokens, updated_at)
+        VALUES (:key, :capacity, now())
+        ON CONFLICT (key) DO NOTHING
+    """)
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._bucket_created = False
+
+    def _take_blocking(self, priority: Priority) -> float:
+        from database import engine
+
+        params = {"key": self.key, "capacity": self.capacity, "rate": self.rate,
+                  "reserve": PRIORITY_RESERVE[priority]}
+        with engine.begin() as connection:
+            if not self._bucket_created:
+                connection.execute(self._CREATE_SQL, params)
+                self._bucket_created = True
+            if connection.execute(self._TAKE_SQL, params).first() is not None:
+                return 0.0
+            available = connection.execute(self._PEEK_SQL, params).scalar() or 0.0
+        return max(0.05, (1.0 + PRIORITY_RESERVE[priority] - float(available)) / self.rate)
+
+    async def _take(self, priority: Priority) -> float:
+        try:
+            return await asyncio.to_thread(self._take_blocking, priority)
+        except Exception as e:
+            # Never block Trends traffic on a database hiccup: fall back to the local bucket
+            logger.warning(f"Shared rate limiter unavailable, using local bucket: {e}")
+            return await super()._take(priority)
+
+    def stats(self) -> Dict:
+        stats = super().stats()
+        stats["backend"] = "postgres"
+        return stats
+
+
+_limiters: Dict[str, TokenBucketLimiter] = {}
+
+
+def get_rate_limiter(key: Optional[str] = None) -> TokenBucketLimiter:
+    """
+    Process-wide limiter for one egress route.
+
+    Requests through the same IP share a bucket; sessions using their own
+    proxy (see trends_pool) get a bucket per proxy.
+    """
+    key = key or "default"
+    limiter = _limiters.get(key)
+    if limiter is None:
+        limiter_class = PostgresTokenBucketLimiter if TRENDS_RATE_LIMIT_BACKEND == "postgres" else TokenBucketLimiter
+        limiter = _limiters[key] = limiter_class(key=key)
+    return limiter
+
+
+def get_rate_limiter_stats(include_history: bool = False) -> List[Dict]:
+    stats = []
+    for limiter in _limiters.values():
+        entry = limiter.stats()
+        if include_history:
+            entry["history"] = list(limiter.history)
+        stats.append(entry)
+    return stats
@@ -155,6 +155,42 @@ export async function getChartData(targetId, days = 30) {
   }
 }
 
+// Charts for many targets in one request (e.g. every dashboard card).
+// Returns { [targetId]: points } in the same shape as getChartData's `data`
+// (used by the browse page's featured-target sparklines).
+export async function getChartsBatch(targetIds, days = 30, { maxPoints = 200, algorithm = 'lttb' } = {}) {
+  try {
+    const payload = await apiFetch('/charts/batch', {
+      method: 'POST',
+      body: JSON.stringify({
+        target_ids: targetIds,
+        days,
+        max_points: maxPoints,
+        algorithm
+      })
+    });
+    return decodeChartBatch(payload);
+  } catch (error) {
+    console.error('Batch chart fetch failed:', error);
+    throw new Error(`Failed to load charts: ${error.message}`);
+  }
+}
+
+// Expand the columnar batch payload: each series indexes into the shared
+// epoch-second `timestamps` array
+export function decodeChartBatch(payload) {
+  const times = payload.timestamps.map((seconds) => new Date(seconds * 1000).toISOString());
+  const charts = {};
+  for (const [targetId, series] of Object.entries(payload.series)) {
+    charts[targetId] = series.i.map((index, n) => ({
+      timestamp: times[index],
+      attention_score: series.v[n],
+      ...(series.min && { min_score: series.min[n], max_score: series.max[n] })
+    }));
+  }
+  return charts;
+}
+
 export async function getTargets(targetType = null, limit = 50) {
   try {
     const params = new URLSearchParams();